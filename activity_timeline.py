@@ -0,0 +1,124 @@
+"""
+Level-of-detail data for the activity timeline on the details page.
+
+Every event has a suspicion level (1-4). High-suspicion events (level 4)
+are always plotted exactly. The others are too, as long as a view holds
+at most `max_events` of them; above that they are counted per level in
+at most `max_bins` time bins of a round width (1s, 5s, 1min, ...), so the
+plot is bounded by its width in pixels rather than by the log length.
+A zoomed view only selects and bins the events inside its time range.
+"""
+import numpy as np
+
+from events import MISSING_SECONDS
+
+# Suspicion level per activity; anything else is level 1
+ACTIVITY_LEVELS = {
+    # High Suspicion (Level 4)
+    "Cell phone detected": 4,
+    "Browser window swapped": 4,
+    "Copy": 4,
+    "Cut": 4,
+    "Paste": 4,
+    "Laptop detected": 4,
+    "No face detected": 4,
+    "Tab change detected": 4,
+    "Window change detected": 4,
+
+    # Medium-High Suspicion (Level 3)
+    "Display change detected": 3,
+
+    # Medium Suspicion (Level 2)
+    "Window focus changed": 2,
+    "Candidate looking left": 2,
+
+    # Low Suspicion (Level 1)
+    "Candidate looking right": 1,
+    "Candidate looking down": 1,
+    "Candidate looking up": 1,
+    "Candidate iris looking left": 1,
+    "Candidate iris looking right": 1,
+}
+
+EXACT_LEVEL = 4
+
+LOD_THRESHOLD = 500  # lower-level events plotted one by one in a view
+MAX_BINS = 300       # bins across the view above that; ~3 px each on the 12in figure
+
+# Candidate bin widths in seconds
+BIN_WIDTHS = [1, 2, 5, 10, 15, 30, 60, 120, 300, 600, 900, 1800, 3600, 7200]
+
+
+def event_levels(features):
+    """Suspicion level of every event of a CandidateFeatures"""
+    levels_by_code = np.array([ACTIVITY_LEVELS.get(activity, 1) for activity in features.activities], dtype=np.int8)
+    return levels_by_code[features.activity] if len(features.activity) else np.empty(0, dtype=np.int8)
+
+
+def time_range(features):
+    """(first, last) valid event second, or None if no event has a timestamp"""
+    seconds = features.seconds[features.seconds != MISSING_SECONDS]
+    if len(seconds) == 0:
+        return None
+    return int(seconds.min()), int(seconds.max())
+
+
+def bin_width(start, end, max_bins=MAX_BINS):
+    """Smallest round width that covers [start, end] in at most `max_bins` bins"""
+    span = max(end - start, 1)
+    for width in BIN_WIDTHS:
+        if span / width <= max_bins:
+            return width
+    return int(np.ceil(span / max_bins))
+
+
+def timeline_view(features, start=None, end=None, max_events=LOD_THRESHOLD, max_bins=MAX_BINS):
+    """
+    What to draw for the events between `start` and `end` seconds (inclusive).
+
+    Returns:
+        Dict with
+        - "exact": {level: sorted event seconds} for levels drawn one by one
+        - "binned": {level: (bin start seconds, event counts)} for aggregated levels
+        - "bin_seconds": bin width, or None when nothing is binned
+        - "events": number of events in the view
+    """
+    seconds = features.seconds
+    levels = event_levels(features)
+    mask = seconds != MISSING_SECONDS
+    if start is not None:
+        mask &= seconds >= start
+    if end is not None:
+        mask &= seconds <= end
+    seconds = seconds[mask]
+    levels = levels[mask]
+
+    # Stable, so events at the same second keep their log order
+    order = np.argsort(seconds, kind="stable")
+    seconds = seconds[order]
+    levels = levels[order]
+
+    view = {"exact": {}, "binned": {}, "bin_seconds": None, "events": len(seconds)}
+    lower = levels != EXACT_LEVEL
+    view["exact"][EXACT_LEVEL] = seconds[~lower]
+
+    if lower.sum() <= max_events:
+        for level in range(EXACT_LEVEL - 1, 0, -1):
+            view["exact"][level] = seconds[levels == level]
+        return view
+
+    first = int(seconds[0]) if start is None else start
+    last = int(seconds[-1]) if end is None else end
+    width = bin_width(first, last, max_bins)
+    first -= first % width
+    n_bins = (last - first) // width + 1
+
+    bins = (seconds[lower].astype(np.int64) - first) // width
+    counts = np.bincount(
+        (levels[lower].astype(np.int64) - 1) * n_bins + bins, minlength=(EXACT_LEVEL - 1) * n_bins
+    ).reshape(EXACT_LEVEL - 1, n_bins)
+    for level in range(EXACT_LEVEL - 1, 0, -1):
+        nonzero = np.flatnonzero(counts[level - 1])
+        view["binned"][level] = (first + nonzero * width, counts[level - 1][nonzero])
+    view["bin_seconds"] = width
+    return view
@@ -1,5 +1,11 @@
 import numpy as np
 
+from events import MISSING_SECONDS, event_seconds, normalize_events, parse_seconds
+from feature_store import CandidateFeatures
+
+# Bump when the weights or scoring rules change so stored scores are recomputed
+ALGORITHM_VERSION = "1"
+
 # -----------------------------------------------------------------------------
 # 1. Define activity levels for each distinct activity description.
 #    (Higher numbers indicate higher suspicion.)
@@ -34,88 +40,226 @@ activity_levels = {
 # -----------------------------------------------------------------------------
 # 2. Helper function: Convert timestamp "HH:MM:SS" to seconds.
 #    If the timestamp contains "NaN", return np.nan.
+#    Logs are parsed with events.normalize_events; this is the same rule
+#    for a single string.
 # -----------------------------------------------------------------------------
 def to_seconds(ts):
-    if "NaN" in ts:
-        return np.nan
-    try:
-        h, m, s = map(int, ts.split(":"))
-        return h * 3600 + m * 60 + s
-    except Exception:
-        return np.nan
+    sec = parse_seconds(ts)
+    return np.nan if sec == MISSING_SECONDS else sec
+
+NO_EVENTS_RESULT = {
+    "score": 0,
+    "factor1": " NA",
+    "factor2": " NA",
+    "factor3": " NA"
+}
+
+def score_event_columns(seconds, activity, count, offsets, activities, scale=70):
+    """
+    Score many candidates at once from flat event columns.
+
+    Candidate i owns rows offsets[i]:offsets[i+1]; `activity` holds codes into
+    `activities`. The result for each candidate is identical to feeding its
+    log through the per-event loop of `StreamingAlgorithmScorer`.
+    """
+    offsets = np.asarray(offsets, dtype=np.int64)
+    n_candidates = len(offsets) - 1
+    n_events = int(offsets[-1] - offsets[0])
+    if n_candidates <= 0:
+        return []
+    if n_events == 0:
+        return [dict(NO_EVENTS_RESULT) for _ in range(n_candidates)]
+
+    # Interned activity codes -> stripped names (two raw spellings may share one)
+    names = []
+    name_index = {}
+    code_to_name = np.empty(len(activities), dtype=np.int64)
+    for code, name in enumerate(activities):
+        name = name.strip()
+        if name not in name_index:
+            name_index[name] = len(names)
+            names.append(name)
+        code_to_name[code] = name_index[name]
+    n_names = len(names)
+    levels = np.array([activity_levels.get(name, 0) for name in names], dtype=np.float64)
+
+    rows = slice(int(offsets[0]), int(offsets[-1]))
+    name_codes = code_to_name[np.asarray(activity[rows], dtype=np.int64)]
+    secs = np.asarray(seconds[rows])
+    lengths = np.diff(offsets)
+    group = np.repeat(np.arange(n_candidates), lengths)
+
+    # Weight lookup and first-300-second multiplier for every event at once
+    multiplier = np.where((secs != MISSING_SECONDS) & (secs < 300), 1.5, 1.0)
+    contribution = levels[name_codes] * np.asarray(count[rows]) * multiplier
+    raw_totals = np.bincount(group, weights=contribution, minlength=n_candidates)
+
+    # Grouped per-(candidate, activity) breakdown and first appearance for ties
+    cell = group * n_names + name_codes
+    totals = np.bincount(cell, weights=contribution, minlength=n_candidates * n_names)
+    first_seen = np.full(n_candidates * n_names, n_events, dtype=np.int64)
+    seen_cells, first_rows = np.unique(cell, return_index=True)
+    first_seen[seen_cells] = first_rows
+    present = (first_seen < n_events) & np.tile(levels > 0, n_candidates)
+
+    # Rank activities within each candidate: highest total first, then first seen
+    rank_key = np.where(present, -totals, np.inf)
+    order = np.lexsort((first_seen, rank_key, np.repeat(np.arange(n_candidates), n_names)))
+    top = order.reshape(n_candidates, n_names)[:, :3] % n_names
+    top_present = present.reshape(n_candidates, n_names)[np.arange(n_candidates)[:, None], top]
+    top_totals = totals.reshape(n_candidates, n_names)[np.arange(n_candidates)[:, None], top]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        final_scores = 100 * (raw_totals / (raw_totals + scale))
+
+    results = []
+    for i in range(n_candidates):
+        if lengths[i] == 0:
+            results.append(dict(NO_EVENTS_RESULT))
+            continue
+        final_score = float(final_scores[i]) if raw_totals[i] + scale != 0 else 0
+        top3 = [
+            f"{names[top[i, j]]}:{float(top_totals[i, j])}" if j < n_names and top_present[i, j] else "NA"
+            for j in range(3)
+        ]
+        results.append({
+            "score": round(final_score, 1),
+            "factor1": top3[0],
+            "factor2": top3[1],
+            "factor3": top3[2]
+        })
+    return results
+
+def analyze_algorithm_cohort(logs, scale=70):
+    """
+    Vectorized `analyze_algorithm_based_proctoring` for a whole cohort.
+
+    Only the scoring is vectorized. Each event dict still has its fields
+    read in Python (as a per-event loop would), so this is only about 1.3x
+    faster than scoring the logs one event at a time. For the large speedup,
+    score columnar data with `analyze_event_store`.
+
+    Args:
+        logs: List of activity logs (lists of event dicts)
+        scale: Hyperbolic transform constant, as in the per-candidate function
+
+    Returns:
+        List of result dictionaries in the same order as `logs`
+    """
+    lengths = [len(log) for log in logs]
+    events = normalize_events([event for log in logs for event in log])
+    offsets = np.concatenate([[0], np.cumsum(lengths, dtype=np.int64)])
+    return score_event_columns(
+        events.seconds, events.activity, events.count,
+        offsets, events.activities, scale
+    )
+
+def analyze_event_store(store, scale=70):
+    """Score every candidate in an EventStore straight from its mapped columns"""
+    scores = score_event_columns(
+        store.columns["seconds"], store.columns["activity"], store.columns["count"],
+        store.offsets, store.activities, scale
+    )
+    index_to_id = {entry["index"]: candidate_id for candidate_id, entry in store.candidates.items()}
+    return {int(index_to_id[i]): result for i, result in enumerate(scores)}
 
 def analyze_algorithm_based_proctoring(log_data, scale=70):
-    events = log_data
-    if not events:
-        return {
-            "score": 0,
-            "factor1": " NA",
-            "factor2": " NA",
-            "factor3": " NA"
-        }
-    
-    weighted_scores = []
-    timestamps = []
-    breakdown = {}
-    
-    for event in events:
+    """Score one log: event dicts, CandidateEvents or CandidateFeatures"""
+    if not isinstance(log_data, CandidateFeatures):
+        log_data = normalize_events(log_data)
+    return score_event_columns(
+        log_data.seconds, log_data.activity, log_data.count,
+        [0, len(log_data)], log_data.activities, scale
+    )[0]
+
+
+class StreamingAlgorithmScorer:
+    """
+    Incremental version of `analyze_algorithm_based_proctoring` for live exams.
+
+    Events are fed one at a time (or in small batches) as they arrive and the
+    scorer keeps O(1) running state: the raw weighted total, the per-activity
+    breakdown, the last valid timestamp and the min/max/count needed for the
+    mean inter-event gap. `result()` at any point equals running the batch
+    function on every event seen so far.
+    """
+
+    def __init__(self, scale=70):
+        self.scale = scale
+        self.raw_total = 0
+        self.breakdown = {}
+        self.n_events = 0
+        self.last_timestamp = None
+        self._last_valid = 0
+        self._min_timestamp = None
+        self._max_timestamp = None
+
+    def update(self, event):
+        """Add one event dict"""
         desc = event.get("activityDescription", "").strip()
         count = event.get("count", 1)
         level = activity_levels.get(desc, 0)
-        
-        # Determine time multiplier: if event occurs in first 300 sec, multiply by 1.5
-        ts = event.get("timeStampInVideo", event.get("timestampInVideo", "00:00:00"))
-        sec = to_seconds(ts)
-        timestamps.append(sec)
-        multiplier = 1.5 if (sec is not None and not np.isnan(sec) and sec < 300) else 1.0
-        
+
+        sec = event_seconds(event)
+        missing = sec == MISSING_SECONDS
+        multiplier = 1.5 if (not missing and sec < 300) else 1.0
+
         contribution = level * count * multiplier
-        weighted_scores.append(contribution)
-        
+        self.raw_total += contribution
         if level > 0:
-            breakdown[desc] = breakdown.get(desc, 0) + contribution
-
-    # Forward-fill any NaN timestamps with the last valid timestamp.
-    clean_timestamps = []
-    last_valid = 0
-    for t in timestamps:
-        if np.isnan(t):
-            clean_timestamps.append(last_valid)
-        else:
-            clean_timestamps.append(t)
-            last_valid = t
+            self.breakdown[desc] = self.breakdown.get(desc, 0) + contribution
 
-    raw_total = sum(weighted_scores)
-    
-    # Compute average time between events (in minutes)
-    if len(clean_timestamps) > 1:
-        diffs = np.diff(sorted(clean_timestamps))
-        avg_diff = np.mean(diffs) / 60.0
-    else:
-        avg_diff = -1
-
-    # Compute final score using hyperbolic transformation.
-    try:
-        final_score = 100 * (raw_total / (raw_total + scale))
-    except Exception:
-        final_score = 0
-
-    # Determine top 3 contributing activities (using full activity names)
-    sorted_breakdown = sorted(breakdown.items(), key=lambda x: x[1], reverse=True)
-    top3 = []
-    for i in range(3):
-        if i < len(sorted_breakdown):
-            act, score_val = sorted_breakdown[i]
-            top3.append(f"{act}:{score_val}")
+        # Forward-fill NaN timestamps with the last valid one, as the batch scorer does
+        if missing:
+            sec = self._last_valid
         else:
-            top3.append("NA")
-    
-    return {
-        "score": round(final_score, 1),
-        "factor1": top3[0],
-        "factor2": top3[1],
-        "factor3": top3[2]
-    }
+            self._last_valid = sec
+            self.last_timestamp = sec
+        self._min_timestamp = sec if self._min_timestamp is None else min(self._min_timestamp, sec)
+        self._max_timestamp = sec if self._max_timestamp is None else max(self._max_timestamp, sec)
+        self.n_events += 1
+        return self
+
+    def update_many(self, events):
+        """Add a batch of event dicts"""
+        for event in events:
+            self.update(event)
+        return self
+
+    @property
+    def mean_gap(self):
+        """Average minutes between events (mean of the sorted diffs), -1 if fewer than two"""
+        if self.n_events < 2:
+            return -1
+        return (self._max_timestamp - self._min_timestamp) / (self.n_events - 1) / 60.0
+
+    @property
+    def score(self):
+        if not self.n_events:
+            return 0
+        try:
+            final_score = 100 * (self.raw_total / (self.raw_total + self.scale))
+        except Exception:
+            final_score = 0
+        return round(final_score, 1)
+
+    def top_factors(self, n=3):
+        """Top contributing activities as "activity:score" strings, padded with "NA" """
+        if not self.n_events:
+            return [" NA"] * n
+        sorted_breakdown = sorted(self.breakdown.items(), key=lambda x: x[1], reverse=True)
+        factors = [f"{act}:{score_val}" for act, score_val in sorted_breakdown[:n]]
+        return factors + ["NA"] * (n - len(factors))
+
+    def result(self):
+        """Current score in the same shape as `analyze_algorithm_based_proctoring`"""
+        top3 = self.top_factors(3)
+        return {
+            "score": self.score,
+            "factor1": top3[0],
+            "factor2": top3[1],
+            "factor3": top3[2]
+        }
 
 
 # if __name__ == "__main__":
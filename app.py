@@ -1,10 +1,23 @@
+import hashlib
+import io
+import json
+import os
+import threading
+
 import streamlit as st
 import pandas as pd
 import numpy as np
 import matplotlib.pyplot as plt
+from PIL import Image
 
-from main import load_activity_log, load_candidates
-from util import get_score_color
+from activity_timeline import time_range, timeline_view
+from candidate_index import SORT_ORDERS, CandidateIndex
+from cohort_summary import STATUSES, build_summary, load_summary, summary_path
+from events import MISSING_SECONDS
+from feature_store import candidate_features
+from log_viewer import LOG_PAGE_SIZES, LogView
+from main import load_candidates, load_events
+from util import activity_log_path, get_score_color
 
 # Set page configuration
 st.set_page_config(
@@ -94,15 +107,78 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+PROCESSED_CANDIDATES_FILE = os.getenv('PROCESSED_CANDIDATES_FILE', 'processed_candidates.json')
+PAGE_SIZES = [24, 48, 96]
+
+# Process-wide caches shared by every session. Entries are keyed by the source
+# file's mtime and size, so a rewritten file is picked up on the next rerun.
+# Cached objects are shared, not copied: treat them as read-only.
+def file_signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_candidates(signature):
+    return load_candidates(PROCESSED_CANDIDATES_FILE)
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_candidate_index(signature):
+    return CandidateIndex(_cached_candidates(signature))
+
+@st.cache_resource(show_spinner=False, max_entries=2)
+def _cached_cohort_summary(signature):
+    try:
+        with open(PROCESSED_CANDIDATES_FILE, 'rb') as file:
+            raw = file.read()
+    except OSError:
+        return build_summary([])
+    summary = load_summary(summary_path(PROCESSED_CANDIDATES_FILE), hashlib.sha256(raw).hexdigest())
+    if summary is None:
+        # Results written by an older run (or edited by hand); aggregate them here
+        print(f"No up-to-date cohort summary for {PROCESSED_CANDIDATES_FILE}, rebuilding it")
+        try:
+            summary = build_summary(json.loads(raw))
+        except Exception as e:
+            print(f"Error summarizing {PROCESSED_CANDIDATES_FILE}: {e}")
+            summary = build_summary([])
+    return summary
+
+@st.cache_resource(show_spinner=False, max_entries=64)
+def _cached_candidate_log(candidate_id, signature):
+    events = load_events(candidate_id)
+    features = candidate_features(events)
+    return LogView(events, features), features
+
+def get_candidates():
+    """Candidate summaries from processed_candidates.json"""
+    return _cached_candidates(file_signature(PROCESSED_CANDIDATES_FILE))
+
+def get_candidate_index():
+    """Status, name and score indexes over the candidate summaries"""
+    return _cached_candidate_index(file_signature(PROCESSED_CANDIDATES_FILE))
+
+def get_cohort_summary():
+    """Status counts, score histograms and per-exam/date breakdowns of the cohort"""
+    return _cached_cohort_summary(file_signature(PROCESSED_CANDIDATES_FILE))
+
+def get_candidate_log(candidate_id):
+    """(LogView of the activity log, its CandidateFeatures) for one candidate"""
+    return _cached_candidate_log(candidate_id, file_signature(activity_log_path(candidate_id)))
+
 # Initialize session state
 if 'page' not in st.session_state:
     st.session_state.page = 'main'
 if 'selected_candidate' not in st.session_state:
     st.session_state.selected_candidate = None
-if 'candidates' not in st.session_state:
-    st.session_state.candidates = load_candidates() 
 if 'filter_status' not in st.session_state:
     st.session_state.filter_status = 'All'
+if 'grid_page' not in st.session_state:
+    st.session_state.grid_page = 1
+if 'log_page' not in st.session_state:
+    st.session_state.log_page = 1
 
 # Navigation functions
 def navigate_to_details(candidate_id):
@@ -112,13 +188,19 @@ def navigate_to_details(candidate_id):
 def navigate_to_main():
     st.session_state.page = 'main'
 
+def change_grid_page(step):
+    st.session_state.grid_page += step
+
+def change_log_page(step):
+    st.session_state.log_page += step
+
 # Main page with candidate overview
 def show_main_page():
     st.title("📊 Proctoring Analysis Dashboard")
     st.write("Monitor student activity during online examinations")
     
     # Filtering options
-    col1, col2 = st.columns(2)
+    col1, col2, col3, col4 = st.columns([2, 2, 2, 1])
     with col1:
         filter_status = st.selectbox(
             "Filter by Risk Level",
@@ -126,41 +208,57 @@ def show_main_page():
         )
     with col2:
         search_term = st.text_input("Search by Name", "")
+    with col3:
+        sort_label = st.selectbox("Sort by", list(SORT_ORDERS))
+    with col4:
+        page_size = st.selectbox("Per page", PAGE_SIZES)
     
-    # Apply filters
-    filtered_candidates = st.session_state.candidates
-    if filter_status != 'All':
-        filtered_candidates = [c for c in filtered_candidates if c['status'] == filter_status]
-    if search_term:
-        filtered_candidates = [c for c in filtered_candidates if search_term.lower() in c['name'].lower()]
+    # Apply filters through the prebuilt indexes; only one page is materialized
+    index = get_candidate_index()
+    filters = (filter_status, search_term, sort_label, page_size)
+    if st.session_state.get('grid_filters') != filters:
+        st.session_state.grid_filters = filters
+        st.session_state.grid_page = 1
+    total, page, page_candidates = index.query(
+        filter_status, search_term, SORT_ORDERS[sort_label], st.session_state.grid_page, page_size
+    )
+    st.session_state.grid_page = page
     
-    if len(filtered_candidates) == 0:
+    if total == 0:
         st.warning("No candidates match your filter criteria")
     else:
-        # Dashboard metrics
+        # Dashboard metrics, read from the precomputed cohort summary
         st.subheader("Risk Overview")
         metric_cols = st.columns(4)
         
-        high_risk = len([c for c in st.session_state.candidates if c['status'] == 'High Risk'])
-        medium_risk = len([c for c in st.session_state.candidates if c['status'] == 'Medium Risk'])
-        low_risk = len([c for c in st.session_state.candidates if c['status'] == 'Low Risk'])
-        no_risk = len([c for c in st.session_state.candidates if c['status'] == 'No Risk'])
+        summary = get_cohort_summary()
+        cohort_size = max(summary['candidates'], 1)
+        for metric_col, status in zip(metric_cols, STATUSES):
+            count = summary['status_counts'][status]
+            metric_col.metric(status, count, f"{count/cohort_size*100:.1f}%")
         
-        metric_cols[0].metric("High Risk", high_risk, f"{high_risk/len(st.session_state.candidates)*100:.1f}%")
-        metric_cols[1].metric("Medium Risk", medium_risk, f"{medium_risk/len(st.session_state.candidates)*100:.1f}%")
-        metric_cols[2].metric("Low Risk", low_risk, f"{low_risk/len(st.session_state.candidates)*100:.1f}%")
-        metric_cols[3].metric("No Risk", no_risk, f"{no_risk/len(st.session_state.candidates)*100:.1f}%")
+        if st.checkbox("Show cohort breakdown"):
+            show_cohort_breakdown(summary)
         
         # Display candidates
-        st.subheader(f"Candidates ({len(filtered_candidates)})")
+        st.subheader(f"Candidates ({total})")
+        
+        pages = -(-total // page_size)
+        if pages > 1:
+            nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+            nav_prev.button("← Previous", on_click=change_grid_page, args=(-1,), disabled=page <= 1)
+            nav_info.markdown(
+                f"<div style='text-align: center;'>Page {page} of {pages}</div>", unsafe_allow_html=True
+            )
+            nav_next.button("Next →", on_click=change_grid_page, args=(1,), disabled=page >= pages)
         
-        if not filtered_candidates:
+        if not page_candidates:
             st.info("No candidates match your filter criteria.")
         else:
             # Create grid layout with 4 columns
             cols = st.columns(4)
             
-            for i, candidate in enumerate(filtered_candidates):
+            for i, candidate in enumerate(page_candidates):
                 with cols[i % 4]:
                     # Create clickable candidate box
                     st.markdown(
@@ -177,10 +275,279 @@ def show_main_page():
                     if st.button(f"View Details", key=f"btn_{candidate['id']}"):
                         navigate_to_details(candidate['id'])
 
+def show_cohort_breakdown(summary):
+    bins = summary['score_bins']
+    labels = [f"{low}-{high}" for low, high in zip(bins[:-1], bins[1:])]
+    
+    chart_col, table_col = st.columns(2)
+    with chart_col:
+        st.write("Score distribution per analyzer")
+        histograms = pd.DataFrame(
+            {name: stats['histogram'] for name, stats in summary['scores'].items()},
+            index=labels
+        )
+        st.bar_chart(histograms)
+    with table_col:
+        st.write("Per exam")
+        exams = pd.DataFrame([
+            {
+                "Exam": exam,
+                "Candidates": group['candidates'],
+                "Mean score": round(group['score_sum'] / group['candidates'], 2),
+                **group['status_counts']
+            }
+            for exam, group in summary['exams'].items()
+        ])
+        st.dataframe(exams, hide_index=True, use_container_width=True)
+
+# Figures of the details page. Each is rendered to PNG once per candidate,
+# log content and chart type, and the matplotlib figure is closed right away,
+# so reopening a candidate costs nothing and the server holds only bytes.
+FIGURE_CACHE_SIZE = int(os.getenv('FIGURE_CACHE_SIZE', '192'))  # rendered charts kept in memory
+
+# Streamlit scales wider images down to this on every display; cache them pre-scaled
+FIGURE_MAX_WIDTH = 1460
+
+# pyplot's figure registry is global and sessions render from different threads
+_figure_lock = threading.Lock()
+
+def timeline_figure(features, start=None, end=None):
+    # Events of the view: exact per level, or per-bin counts for long logs
+    view = timeline_view(features, start, end)
+    
+    # Create plot - IMPROVED: removed first/last 5 min markers
+    fig, ax = plt.subplots(figsize=(12, 6))
+    
+    # Plot activities by suspicion level, one fixed color per level
+    for level in range(4, 0, -1):
+        if level in view['binned']:
+            bin_starts, counts = view['binned'][level]
+            if len(counts):
+                # One marker per bin, sized by how many events it holds
+                ax.scatter((bin_starts + view['bin_seconds'] / 2) / 60, [level] * len(counts),
+                        s=12 + 120 * counts / counts.max(),
+                        marker='s',
+                        color=f"C{4 - level}",
+                        alpha=0.7,
+                        label=f"Level {level} Activities ({counts.sum()}, per {view['bin_seconds']}s)")
+            continue
+        
+        minutes = view['exact'].get(level, [])
+        if len(minutes):
+            minutes = minutes / 60
+            
+            # Create continuous line for each suspicion level
+            if len(minutes) > 1:
+                ax.plot(minutes, [level] * len(minutes), 
+                    marker='o',
+                    linestyle='-',
+                    linewidth=2,
+                    color=f"C{4 - level}",
+                    label=f"Level {level} Activities",
+                    alpha=0.7)
+            else:
+                ax.scatter(minutes, [level] * len(minutes),
+                        color=f"C{4 - level}",
+                        label=f"Level {level} Activities")
+    
+    # Customize plot
+    ax.set_xlabel('Time (minutes)')
+    ax.set_ylabel('Suspicion Level')
+    ax.set_yticks([1, 2, 3, 4])
+    ax.set_yticklabels(['Low', 'Medium', 'Medium-High', 'High'])
+    
+    # IMPROVED: removed first/last 5 min markers
+    
+    # Ensure time doesn't go negative; a zoomed view shows exactly its range
+    if start is not None and end is not None:
+        ax.set_xlim(start / 60, max(end, start + 1) / 60)
+    else:
+        ax.set_xlim(left=0)  # Start from 0
+    
+    # Enhance grid and legend
+    ax.grid(True, alpha=0.3)
+    if ax.get_legend_handles_labels()[0]:
+        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    
+    # Add title and adjust layout
+    ax.set_title('Activity Timeline by Suspicion Level')
+    fig.tight_layout()
+    
+    return fig
+
+def activity_pie_figure(features):
+    activity_counts = features.activity_counts()
+    fig1, ax1 = plt.subplots(figsize=(8, 8))
+    labels = list(activity_counts.keys())
+    sizes = list(activity_counts.values())
+    
+    # Custom colors based on suspicion level
+    colors = []
+    for label in labels:
+        if label in ["Browser window swapped", "Window change detected"]:
+            colors.append("#FF5252")  # Red for high risk
+        elif label in ["Window focus changed"]:
+            colors.append("#FFA726")  # Orange for medium risk
+        else:
+            colors.append("#4CAF50")  # Green for low risk
+    
+    ax1.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
+    ax1.axis('equal')
+    
+    return fig1
+
+def period_heatmap_figure(features):
+    valid = features.seconds != MISSING_SECONDS
+    
+    # Convert timestamps to minutes for the heatmap
+    time_bins = {
+        "0-5min": 0,
+        "5-15min": 0,
+        "15-30min": 0, 
+        "30min+": 0
+    }
+    
+    high_risk_bins = time_bins.copy()
+    med_risk_bins = time_bins.copy()
+    low_risk_bins = time_bins.copy()
+    
+    for seconds, code in zip(features.seconds[valid].tolist(), features.activity[valid].tolist()):
+        minutes = seconds // 60
+    
+        # Determine which bin this activity belongs to
+        if minutes < 5:
+            time_period = "0-5min"
+        elif minutes < 15:
+            time_period = "5-15min"
+        elif minutes < 30:
+            time_period = "15-30min"
+        else:
+            time_period = "30min+"
+    
+        # Determine risk level based on activity type
+        activity = features.activities[code]
+        if activity in ["Browser window swapped", "Window change detected"]:
+            high_risk_bins[time_period] += 1
+        elif activity in ["Window focus changed"]:
+            med_risk_bins[time_period] += 1
+        else:
+            low_risk_bins[time_period] += 1
+    
+    # Create heatmap data
+    time_periods = list(time_bins.keys())
+    risk_levels = ["High Risk", "Medium Risk", "Low Risk"]
+    
+    data = np.array([
+        list(high_risk_bins.values()),
+        list(med_risk_bins.values()),
+        list(low_risk_bins.values())
+    ])
+    
+    fig2, ax2 = plt.subplots(figsize=(8, 6))
+    im = ax2.imshow(data, cmap="YlOrRd")
+    
+    # Show all ticks and label them
+    ax2.set_xticks(np.arange(len(time_periods)))
+    ax2.set_yticks(np.arange(len(risk_levels)))
+    ax2.set_xticklabels(time_periods)
+    ax2.set_yticklabels(risk_levels)
+    
+    # Rotate the tick labels and align them
+    plt.setp(ax2.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
+    
+    # Loop over data dimensions and create text annotations
+    for i in range(len(risk_levels)):
+        for j in range(len(time_periods)):
+            ax2.text(j, i, data[i, j], ha="center", va="center", color="black")
+    
+    ax2.set_title("Activity Intensity by Time Period")
+    fig2.tight_layout()
+    
+    # Add colorbar
+    cbar = fig2.colorbar(im)
+    cbar.set_label("Number of Activities")
+    
+    return fig2
+
+FIGURE_BUILDERS = {
+    "timeline": timeline_figure,
+    "activity_pie": activity_pie_figure,
+    "period_heatmap": period_heatmap_figure
+}
+
+@st.cache_resource(show_spinner=False, max_entries=FIGURE_CACHE_SIZE)
+def _cached_figure(chart, candidate_id, sha256, view, _features):
+    with _figure_lock:
+        fig = FIGURE_BUILDERS[chart](_features, *view)
+        try:
+            image = io.BytesIO()
+            # Same output as st.pyplot
+            fig.savefig(image, format="png", bbox_inches="tight", dpi=200)
+        finally:
+            plt.close(fig)
+    
+    png = Image.open(image)
+    if png.width > FIGURE_MAX_WIDTH:
+        png = png.resize((FIGURE_MAX_WIDTH, int(png.height * FIGURE_MAX_WIDTH / png.width)), resample=Image.BILINEAR)
+        image = io.BytesIO()
+        png.save(image, format="PNG")
+    return image.getvalue()
+
+def show_figure(chart, candidate_id, features, view=()):
+    """Display a details-page chart from the render cache; `view` holds extra builder arguments"""
+    st.image(_cached_figure(chart, candidate_id, features.sha256, tuple(view), features), use_container_width=True)
+
+def show_log_viewer(candidate_id, log_view):
+    """Filters plus one page of the raw log; only that page is sent to the browser"""
+    filter_cols = st.columns([3, 2, 2, 1])
+    with filter_cols[0]:
+        activities = st.multiselect("Activity", log_view.activities, placeholder="All activities",
+                                    key=f"log_activities_{candidate_id}")
+    with filter_cols[1]:
+        sources = st.multiselect("Source", log_view.sources, placeholder="All sources",
+                                 key=f"log_sources_{candidate_id}")
+    with filter_cols[2]:
+        time_range = log_view.time_range()
+        start = end = None
+        if time_range and time_range[1] // 60 + 1 - time_range[0] // 60 > 1:
+            first_minute, last_minute = time_range[0] // 60, time_range[1] // 60 + 1
+            minutes = st.slider("Time (minutes)", first_minute, last_minute, (first_minute, last_minute),
+                                key=f"log_minutes_{candidate_id}")
+            if minutes != (first_minute, last_minute):
+                start, end = minutes[0] * 60, minutes[1] * 60
+    with filter_cols[3]:
+        page_size = st.selectbox("Rows", LOG_PAGE_SIZES, key=f"log_page_size_{candidate_id}")
+    
+    filters = (candidate_id, tuple(activities), tuple(sources), start, end, page_size)
+    if st.session_state.get('log_filters') != filters:
+        st.session_state.log_filters = filters
+        st.session_state.log_page = 1
+    total, page, frame, records = log_view.query(
+        activities or None, sources or None, start, end, st.session_state.log_page, page_size
+    )
+    st.session_state.log_page = page
+    
+    st.dataframe(frame, height=300, use_container_width=True)
+    
+    pages = max(1, -(-total // page_size))
+    nav_prev, nav_info, nav_next = st.columns([1, 3, 1])
+    nav_prev.button("← Previous", key="log_prev", on_click=change_log_page, args=(-1,), disabled=page <= 1)
+    offset = (page - 1) * page_size
+    nav_info.markdown(
+        f"<div style='text-align: center;'>Rows {offset + 1 if total else 0}-{offset + len(records)} "
+        f"of {total} ({len(log_view)} in log), page {page} of {pages}</div>",
+        unsafe_allow_html=True
+    )
+    nav_next.button("Next →", key="log_next", on_click=change_log_page, args=(1,), disabled=page >= pages)
+    
+    # JSON view of the same page
+    with st.expander("View Raw Activity Log"):
+        st.json(records)
+
 # Detailed candidate analysis page
 def show_details_page():
     candidate_id = st.session_state.selected_candidate
-    candidate = next((c for c in st.session_state.candidates if c['id'] == candidate_id), None)
+    candidate = get_candidate_index().get(candidate_id)
     
     if not candidate:
         st.error("Candidate not found")
@@ -222,109 +589,32 @@ def show_details_page():
     st.markdown(f"**Status:** {candidate['status']}")
     st.markdown(f"**Analysis:** {candidate['overall_analysis']}")
     
-    activity_log = load_activity_log(candidate_id)
+    log_view, features = get_candidate_log(candidate_id)
     
-    # Activity log table
+    # Activity log table and JSON view, filtered and paged on the server
     st.subheader("Activity Log")
-    df = pd.DataFrame(activity_log)
-    st.dataframe(df, height=300, use_container_width=True)
-    
-    # JSON view
-    with st.expander("View Raw Activity Log"):
-        st.json(activity_log)
+    show_log_viewer(candidate_id, log_view)
         
     # Activity timeline visualization - with improvements
     st.subheader("Activity Timeline")
-    valid_logs = [log for log in activity_log if log['timeStampInVideo'] != "NaN:NaN:NaN"]
-    
-    if valid_logs:
-        # Define suspicion levels for activities
-        activity_levels = {
-            # High Suspicion (Level 4)
-            "Cell phone detected": 4,
-            "Browser window swapped": 4,
-            "Copy": 4,
-            "Cut": 4,
-            "Paste": 4,
-            "Laptop detected": 4,
-            "No face detected": 4,
-            "Tab change detected": 4,
-            "Window change detected": 4,
-            
-            # Medium-High Suspicion (Level 3)
-            "Display change detected": 3,
-            
-            # Medium Suspicion (Level 2)
-            "Window focus changed": 2,
-            "Candidate looking left": 2,
-            
-            # Low Suspicion (Level 1)
-            "Candidate looking right": 1,
-            "Candidate looking down": 1,
-            "Candidate looking up": 1,
-            "Candidate iris looking left": 1,
-            "Candidate iris looking right": 1,
-        }
-        
-        # Convert timestamps to minutes
-        timeline_data = []
-        for log in valid_logs:
-            ts = log['timeStampInVideo']
-            parts = ts.split(':')
-            minutes = int(parts[0]) * 60 + int(parts[1]) + int(parts[2])/60
-            activity = log['activityDescription']
-            level = activity_levels.get(activity, 1)  # Default to level 1 if not found
-            timeline_data.append({
-                'minutes': minutes,
-                'activity': activity,
-                'level': level
-            })
-        
-        # Sort by time
-        timeline_data.sort(key=lambda x: x['minutes'])
-        
-        # Create plot - IMPROVED: removed first/last 5 min markers
-        fig, ax = plt.subplots(figsize=(12, 6))
-        
-        # Plot activities by suspicion level
-        for level in range(4, 0, -1):
-            level_data = [item for item in timeline_data if item['level'] == level]
-            if level_data:
-                minutes = [item['minutes'] for item in level_data]
-                activities = [item['activity'] for item in level_data]
-                
-                # Create continuous line for each suspicion level
-                if len(minutes) > 1:
-                    ax.plot(minutes, [level] * len(minutes), 
-                        marker='o',
-                        linestyle='-',
-                        linewidth=2,
-                        label=f"Level {level} Activities",
-                        alpha=0.7)
-                else:
-                    ax.scatter(minutes, [level] * len(minutes),
-                            label=f"Level {level} Activities")
-        
-        # Customize plot
-        ax.set_xlabel('Time (minutes)')
-        ax.set_ylabel('Suspicion Level')
-        ax.set_yticks([1, 2, 3, 4])
-        ax.set_yticklabels(['Low', 'Medium', 'Medium-High', 'High'])
-        
-        # IMPROVED: removed first/last 5 min markers
-        
-        # Ensure time doesn't go negative
-        ax.set_xlim(left=0)  # Start from 0
-        
-        # Enhance grid and legend
-        ax.grid(True, alpha=0.3)
-        ax.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-        
-        # Add title and adjust layout
-        plt.title('Activity Timeline by Suspicion Level')
-        plt.tight_layout()
+    valid = features.seconds != MISSING_SECONDS
+    
+    if valid.any():
+        first, last = time_range(features)
+        first_minute, last_minute = first // 60, last // 60 + 1
+        if last_minute - first_minute > 1:
+            zoom = st.slider(
+                "Zoom (minutes)", first_minute, last_minute, (first_minute, last_minute),
+                key=f"timeline_zoom_{candidate_id}"
+            )
+        else:
+            zoom = (first_minute, last_minute)
         
-        st.pyplot(fig)
+        if zoom == (first_minute, last_minute):
+            show_figure("timeline", candidate_id, features)
+        else:
+            # Only the selected range is re-binned, at the same level of detail
+            show_figure("timeline", candidate_id, features, view=(zoom[0] * 60, zoom[1] * 60))
         
         st.info("""
         Activity Suspicion Levels:
@@ -450,115 +740,19 @@ def show_details_page():
         st.markdown("#### Activity Type Distribution")
         
         # Count activities by type
-        activity_counts = {}
-        for event in activity_log:
-            desc = event.get("activityDescription", "")
-            count = event.get("count", 1)
-            if desc in activity_counts:
-                activity_counts[desc] += count
-            else:
-                activity_counts[desc] = count
+        activity_counts = features.activity_counts()
         
         # Create pie chart of activity types
         if activity_counts:
-            fig1, ax1 = plt.subplots(figsize=(8, 8))
-            labels = list(activity_counts.keys())
-            sizes = list(activity_counts.values())
-            
-            # Custom colors based on suspicion level
-            colors = []
-            for label in labels:
-                if label in ["Browser window swapped", "Window change detected"]:
-                    colors.append("#FF5252")  # Red for high risk
-                elif label in ["Window focus changed"]:
-                    colors.append("#FFA726")  # Orange for medium risk
-                else:
-                    colors.append("#4CAF50")  # Green for low risk
-            
-            ax1.pie(sizes, labels=labels, autopct='%1.1f%%', startangle=90, colors=colors)
-            ax1.axis('equal')
-            
-            st.pyplot(fig1)
+            show_figure("activity_pie", candidate_id, features)
             st.caption("Distribution of activity types, colored by risk level")
 
     with col2:
         st.markdown("#### Activity Heatmap by Exam Period")
         
         # Create heatmap of activity intensity across exam time
-        valid_logs = [log for log in activity_log if log.get("timeStampInVideo") != "NaN:NaN:NaN"]
-        
-        if valid_logs:
-            # Convert timestamps to minutes for the heatmap
-            time_bins = {
-                "0-5min": 0,
-                "5-15min": 0,
-                "15-30min": 0, 
-                "30min+": 0
-            }
-            
-            high_risk_bins = time_bins.copy()
-            med_risk_bins = time_bins.copy()
-            low_risk_bins = time_bins.copy()
-            
-            for log in valid_logs:
-                ts = log.get("timeStampInVideo", "00:00:00")
-                parts = ts.split(':')
-                minutes = int(parts[0]) * 60 + int(parts[1])
-                
-                # Determine which bin this activity belongs to
-                if minutes < 5:
-                    time_period = "0-5min"
-                elif minutes < 15:
-                    time_period = "5-15min"
-                elif minutes < 30:
-                    time_period = "15-30min"
-                else:
-                    time_period = "30min+"
-                
-                # Determine risk level based on activity type
-                activity = log.get("activityDescription", "")
-                if activity in ["Browser window swapped", "Window change detected"]:
-                    high_risk_bins[time_period] += 1
-                elif activity in ["Window focus changed"]:
-                    med_risk_bins[time_period] += 1
-                else:
-                    low_risk_bins[time_period] += 1
-            
-            # Create heatmap data
-            time_periods = list(time_bins.keys())
-            risk_levels = ["High Risk", "Medium Risk", "Low Risk"]
-            
-            data = np.array([
-                list(high_risk_bins.values()),
-                list(med_risk_bins.values()),
-                list(low_risk_bins.values())
-            ])
-            
-            fig2, ax2 = plt.subplots(figsize=(8, 6))
-            im = ax2.imshow(data, cmap="YlOrRd")
-            
-            # Show all ticks and label them
-            ax2.set_xticks(np.arange(len(time_periods)))
-            ax2.set_yticks(np.arange(len(risk_levels)))
-            ax2.set_xticklabels(time_periods)
-            ax2.set_yticklabels(risk_levels)
-            
-            # Rotate the tick labels and align them
-            plt.setp(ax2.get_xticklabels(), rotation=45, ha="right", rotation_mode="anchor")
-            
-            # Loop over data dimensions and create text annotations
-            for i in range(len(risk_levels)):
-                for j in range(len(time_periods)):
-                    ax2.text(j, i, data[i, j], ha="center", va="center", color="black")
-            
-            ax2.set_title("Activity Intensity by Time Period")
-            fig2.tight_layout()
-            
-            # Add colorbar
-            cbar = fig2.colorbar(im)
-            cbar.set_label("Number of Activities")
-            
-            st.pyplot(fig2)
+        if valid.any():
+            show_figure("period_heatmap", candidate_id, features)
             st.caption("Activity frequency by risk level and exam period")
 
 
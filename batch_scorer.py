@@ -0,0 +1,116 @@
+import asyncio
+import time
+
+from feature_store import FEATURE_STORE
+from llm_cache import LLM_CACHE
+from llm_analyzer import BATCH_STATS, analyze_proctoring_logs_batched, plan_llm_batches, synthesis_stats
+from llm_tool import close_clients
+from main import load_events, main_output_async
+
+async def _report_progress(queue, stats, interval):
+    """Periodically print throughput and queue depth until cancelled"""
+    while True:
+        await asyncio.sleep(interval)
+        elapsed = time.monotonic() - stats["started"]
+        rate = stats["done"] / (elapsed / 60.0) if elapsed > 0 else 0.0
+        print(
+            f"[progress] done={stats['done']} failed={stats['failed']} "
+            f"in_flight={stats['in_flight']} queued={queue.qsize()} "
+            f"rate={rate:.1f} candidates/min"
+        )
+
+async def score_candidates(candidates, ml_scores=None, concurrency=8, report_interval=10.0, batch_size=1):
+    """
+    Runs `main_output_async` for many candidates at once on the current loop.
+
+    Throughput is bounded by `concurrency` and by the per-provider rate
+    limiters in llm_tool, not by a fixed sleep between candidates.
+
+    Args:
+        candidates: List of candidate dicts from candidates.json
+        ml_scores: Optional mapping of candidate id to precomputed ML score
+        concurrency: Number of candidates processed at the same time
+        report_interval: Seconds between progress reports (0 disables them)
+        batch_size: Most candidates packed into one LLM request (1 disables batching)
+
+    Returns:
+        List of result dictionaries in the same order as `candidates`
+    """
+    ml_scores = ml_scores or {}
+    queue = asyncio.Queue()
+    if batch_size > 1:
+        # Logs are loaded up front so short ones can share LLM requests
+        logs = {index: load_events(candidate['id']) for index, candidate in enumerate(candidates)}
+        for batch in plan_llm_batches(logs, batch_size):
+            queue.put_nowait([(index, candidates[index], logs[index]) for index in batch])
+    else:
+        for index, candidate in enumerate(candidates):
+            queue.put_nowait([(index, candidate, None)])
+
+    results = [None] * len(candidates)
+    stats = {"done": 0, "failed": 0, "degraded": 0, "in_flight": 0, "started": time.monotonic()}
+
+    async def worker():
+        while True:
+            try:
+                batch = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            stats["in_flight"] += len(batch)
+
+            # One shared LLM request for the batch; a failure falls back to per-candidate calls
+            ai_results = {}
+            if len(batch) > 1:
+                try:
+                    ai_results = await analyze_proctoring_logs_batched(
+                        {candidate['id']: log for _, candidate, log in batch}
+                    )
+                except Exception as e:
+                    print(f"Error in batched LLM request, scoring candidates one by one: {e}")
+
+            for index, candidate, activity_log in batch:
+                try:
+                    candidate_id = candidate['id']
+                    if activity_log is None:
+                        activity_log = load_events(candidate_id)
+
+                    # Process candidate data through main_output
+                    result = await main_output_async(candidate, activity_log, ai_results.get(candidate_id))
+
+                    if candidate_id in ml_scores:
+                        result["ml_based_proctoring"]["score"] = ml_scores[candidate_id]
+
+                    results[index] = result
+                    stats["done"] += 1
+                    if result.get("degraded"):
+                        stats["degraded"] += 1
+                    print(f"Processed candidate {candidate_id}: {candidate.get('name', 'Unknown')}")
+                except Exception as e:
+                    stats["failed"] += 1
+                    print(f"Error processing candidate {candidate.get('id')}: {e}")
+                finally:
+                    stats["in_flight"] -= 1
+
+    reporter = None
+    if report_interval:
+        reporter = asyncio.create_task(_report_progress(queue, stats, report_interval))
+
+    try:
+        await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    finally:
+        if reporter:
+            reporter.cancel()
+        await close_clients()
+
+    elapsed = time.monotonic() - stats["started"]
+    rate = stats["done"] / (elapsed / 60.0) if elapsed > 0 else 0.0
+    print(
+        f"Scored {stats['done']} candidates ({stats['failed']} failed, {stats['degraded']} degraded) "
+        f"in {elapsed:.1f}s ({rate:.1f} candidates/min)"
+    )
+    print(f"LLM cache: {LLM_CACHE.stats()}")
+    print(f"Feature store: {FEATURE_STORE.stats()}")
+    print(f"LLM synthesis: {synthesis_stats()}")
+    if batch_size > 1:
+        print(f"LLM batches: {BATCH_STATS}")
+    return [result for result in results if result is not None]
@@ -0,0 +1,86 @@
+"""
+Per-event loop vs. vectorized cohort scoring in algorithm_analyzer.
+
+Builds a synthetic cohort (100k events by default), checks that the
+vectorized paths match the per-event loop (StreamingAlgorithmScorer fed
+each whole log) exactly, and reports the speedup for two inputs:
+
+- lists of event dicts (analyze_algorithm_cohort); extracting fields from
+  the dicts is per-event Python work, which bounds this path
+- the columnar event store (analyze_event_store), where no per-event
+  Python code runs at all
+
+Run from the repository root:
+    python -m benchmarks.algorithm_cohort [--events 100000] [--candidates 500]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from algorithm_analyzer import (
+    StreamingAlgorithmScorer,
+    activity_levels,
+    analyze_algorithm_cohort,
+    analyze_event_store
+)
+from event_store import EventStore, build_event_store
+
+SOURCES = ["Video Proctoring", "Extension Proctoring", "Agent Proctoring"]
+
+
+def synthetic_cohort(n_events, n_candidates, seed=7):
+    rng = random.Random(seed)
+    activities = list(activity_levels) + ["Unknown activity", " Candidate looking right "]
+    logs = [[] for _ in range(n_candidates)]
+    for i in range(n_events):
+        log = logs[i % n_candidates]
+        sec = len(log) * rng.randint(1, 30)
+        ts = "NaN:NaN:NaN" if rng.random() < 0.01 else f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+        log.append({
+            "type": rng.choice(SOURCES),
+            "timeStampInVideo": ts,
+            "activityDescription": rng.choice(activities),
+            "count": rng.randint(1, 3)
+        })
+    return logs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--candidates", type=int, default=500)
+    args = parser.parse_args()
+
+    logs = synthetic_cohort(args.events, args.candidates)
+
+    start = time.perf_counter()
+    expected = [StreamingAlgorithmScorer().update_many(log).result() for log in logs]
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = analyze_algorithm_cohort(logs)
+    cohort_time = time.perf_counter() - start
+
+    # Same cohort through the columnar store (ingestion is not timed)
+    tmp = tempfile.mkdtemp()
+    data_dir = os.path.join(tmp, "data")
+    os.makedirs(data_dir)
+    for i, log in enumerate(logs, start=1):
+        with open(os.path.join(data_dir, f"candidate{i}.json"), "w") as file:
+            json.dump({"activityLog": log}, file)
+    build_event_store(data_dir, os.path.join(tmp, "event_store"))
+    store = EventStore(os.path.join(tmp, "event_store"))
+
+    start = time.perf_counter()
+    from_store = analyze_event_store(store)
+    store_time = time.perf_counter() - start
+
+    mismatches = sum(1 for a, b in zip(expected, actual) if a != b)
+    mismatches += sum(1 for i, result in enumerate(expected, start=1) if from_store[i] != result)
+    print(f"{args.events} events, {args.candidates} candidates, mismatches={mismatches}")
+    print(f"per-event loop:             {loop_time:.3f}s")
+    print(f"cohort from dicts:          {cohort_time:.3f}s ({loop_time / cohort_time:.1f}x)")
+    print(f"cohort from event store:    {store_time:.3f}s ({loop_time / store_time:.1f}x)")
@@ -0,0 +1,76 @@
+"""
+Main-page render time of the dashboard for a large synthetic cohort.
+
+Writes --candidates summaries to a temporary processed_candidates.json and
+drives app.py with Streamlit's AppTest: the first run (cache and index
+build), then reruns that change the status filter, the name search, the
+sort order and the page.
+
+Run from the repository root:
+    python -m benchmarks.dashboard_grid [--candidates 10000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+
+from util import get_score_color, get_score_status
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--candidates", type=int, default=10000)
+args = parser.parse_args()
+
+FIRST_NAMES = ["Aarav", "Priya", "Rohan", "Sneha", "Vikram", "Ananya", "Kabir", "Isha", "Arjun", "Meera"]
+LAST_NAMES = ["Sharma", "Patel", "Iyer", "Reddy", "Gupta", "Nair", "Khan", "Das", "Mehta", "Rao"]
+
+
+def synthetic_candidates(n):
+    rng = random.Random(5)
+    candidates = []
+    for i in range(1, n + 1):
+        score = round(rng.uniform(0, 100), 2)
+        candidates.append({
+            "id": i,
+            "name": f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} {i}",
+            "overall_score": score,
+            "status": get_score_status(score),
+            "color": get_score_color(score),
+            "overall_analysis": "Synthetic candidate.",
+            "exam_name": "exam1",
+            "exam_date": "2025-03-09"
+        })
+    return candidates
+
+
+if __name__ == "__main__":
+    fd, path = tempfile.mkstemp(suffix=".json")
+    with os.fdopen(fd, "w") as file:
+        json.dump(synthetic_candidates(args.candidates), file)
+    os.environ["PROCESSED_CANDIDATES_FILE"] = path
+
+    from streamlit.testing.v1 import AppTest
+
+    try:
+        at = AppTest.from_file(os.path.abspath("app.py"), default_timeout=600)
+
+        def timed(label, action=None):
+            if action:
+                action()
+            start = time.perf_counter()
+            at.run()
+            elapsed = time.perf_counter() - start
+            assert not at.exception, at.exception
+            print(f"  {label:<24} {elapsed * 1000:7.1f} ms  ({len(at.button)} buttons)")
+
+        print(f"{args.candidates} candidates")
+        timed("first run (build)")
+        timed("rerun")
+        timed("status filter", lambda: at.selectbox[0].select("High Risk"))
+        timed("search 'pat'", lambda: at.text_input[0].input("pat"))
+        timed("sort by score", lambda: at.selectbox[1].select("Score (high to low)"))
+        timed("next page", lambda: next(b for b in at.button if b.label == "Next →").click())
+        timed("search 'patel 12'", lambda: at.text_input[0].input("patel 12"))
+    finally:
+        os.remove(path)
@@ -0,0 +1,56 @@
+"""
+Details-page render time and open matplotlib figures over repeated visits.
+
+Drives app.py with Streamlit's AppTest: opens the details page of each
+bundled candidate (first visit), then visits them all again --rounds
+times, printing render times, the number of figures pyplot still holds
+and the process RSS.
+
+Run from the repository root:
+    python -m benchmarks.detail_figures [--candidates 20] [--rounds 3]
+"""
+import argparse
+import os
+import statistics
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--candidates", type=int, default=20)
+parser.add_argument("--rounds", type=int, default=3)
+parser.add_argument("--app", default="app.py", help="Dashboard script to drive")
+args = parser.parse_args()
+
+
+def rss_mb():
+    with open("/proc/self/statm") as file:
+        return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+
+
+if __name__ == "__main__":
+    import matplotlib.pyplot as plt
+    from streamlit.testing.v1 import AppTest
+
+    from main import load_candidates
+
+    candidate_ids = [candidate["id"] for candidate in load_candidates()][:args.candidates]
+    at = AppTest.from_file(os.path.abspath(args.app), default_timeout=600)
+    at.run()
+
+    def visit_all():
+        times = []
+        for candidate_id in candidate_ids:
+            at.session_state["page"] = "details"
+            at.session_state["selected_candidate"] = candidate_id
+            start = time.perf_counter()
+            at.run()
+            times.append(time.perf_counter() - start)
+            assert not at.exception, at.exception
+        return times
+
+    for label in ["first visit"] + [f"revisit {i}" for i in range(1, args.rounds + 1)]:
+        times = visit_all()
+        print(
+            f"  {label:<12} median {statistics.median(times) * 1000:7.1f} ms  "
+            f"max {max(times) * 1000:7.1f} ms  "
+            f"open figures {len(plt.get_fignums()):4d}  rss {rss_mb():6.1f} MB"
+        )
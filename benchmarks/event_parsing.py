@@ -0,0 +1,78 @@
+"""
+Timestamp parsing and memory per event: per-event dicts vs. normalize_events.
+
+For synthetic logs of growing length (1% NaN timestamps), compares parsing
+every timestamp with `parse_seconds` one by one against the vectorized
+`parse_timestamps`, times `normalize_events` (all four fields into the
+compact EVENT_DTYPE record), and measures the memory held per event by dicts
+and by the record.
+
+Run from the repository root:
+    python -m benchmarks.event_parsing [--events 1000 100000 1000000]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+import numpy as np
+
+from events import normalize_events, parse_seconds, parse_timestamps
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--events", type=int, nargs="+", default=[1000, 100_000, 1_000_000])
+args = parser.parse_args()
+
+ACTIVITIES = ["Candidate looking right", "Candidate iris looking left", "Window focus changed", "Browser window swapped"]
+SOURCES = ["Video Proctoring", "Extension Proctoring", "Agent Proctoring"]
+
+
+def synthetic_log(n, duration=3 * 3600):
+    rng = random.Random(n)
+    return [
+        {
+            "type": rng.choice(SOURCES),
+            "timeStampInVideo": "NaN:NaN:NaN" if rng.random() < 0.01 else f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}",
+            "activityDescription": rng.choice(ACTIVITIES),
+            "count": rng.randint(1, 3)
+        }
+        for s in sorted(rng.randrange(duration) for _ in range(n))
+    ]
+
+
+def held_bytes(build):
+    """Bytes still allocated by `build()`'s result"""
+    tracemalloc.start()
+    result = build()
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del result
+    return size
+
+
+if __name__ == "__main__":
+    for n in args.events:
+        log = synthetic_log(n)
+        # Dict containers only; the strings they point to are shared with `log`
+        dict_bytes = held_bytes(lambda: [dict(entry) for entry in log])
+        events_bytes = held_bytes(lambda: normalize_events(log))
+
+        start = time.perf_counter()
+        scalar = np.array([parse_seconds(entry["timeStampInVideo"]) for entry in log], dtype=np.int32)
+        scalar_time = time.perf_counter() - start
+
+        timestamps = [entry["timeStampInVideo"] for entry in log]
+        start = time.perf_counter()
+        vectorized = parse_timestamps(timestamps)
+        vectorized_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        events = normalize_events(log)
+        events_time = time.perf_counter() - start
+
+        assert np.array_equal(scalar, vectorized) and np.array_equal(scalar, events.seconds)
+        print(
+            f"  {n:>8} events  parse per event {scalar_time * 1000:7.1f} ms  vectorized {vectorized_time * 1000:6.1f} ms  "
+            f"normalize_events {events_time * 1000:7.1f} ms  "
+            f"memory dicts {dict_bytes / n:6.0f} B/event  events {events_bytes / n:5.1f} B/event"
+        )
@@ -0,0 +1,65 @@
+"""
+Load time and memory per event: JSON + dicts vs. the columnar event store.
+
+Run from the repository root (builds the store under a temp directory):
+    python -m benchmarks.event_store
+"""
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+
+from event_store import EventStore, build_event_store
+from util import activity_log_path
+
+REPEATS = 20
+
+
+def load_json_log(candidate_id):
+    """What load_activity_log does without the store"""
+    with open(activity_log_path(candidate_id), 'r') as file:
+        data = json.load(file)
+    return [
+        {
+            "type": log.get("type", "Extension Proctoring"),
+            "timeStampInVideo": log.get("timeStampInVideo", "00:00:00"),
+            "activityDescription": log.get("activityDescription", "Unknown"),
+            "count": log.get("count", 1)
+        }
+        for log in data.get('activityLog', [])
+    ]
+
+
+if __name__ == "__main__":
+    directory = os.path.join(tempfile.mkdtemp(), "event_store")
+    n_candidates, n_events = build_event_store(directory=directory)
+    store = EventStore(directory)
+    candidate_ids = [int(key) for key in store.candidates]
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for candidate_id in candidate_ids:
+            load_json_log(candidate_id)
+    json_time = (time.perf_counter() - start) / (REPEATS * len(candidate_ids))
+
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        for candidate_id in candidate_ids:
+            store.events(candidate_id)
+    store_time = (time.perf_counter() - start) / (REPEATS * len(candidate_ids))
+
+    tracemalloc.start()
+    logs = [load_json_log(candidate_id) for candidate_id in candidate_ids]
+    dict_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del logs
+
+    column_bytes = sum(column.nbytes for column in store.columns.values()) + store.offsets.nbytes
+
+    print(f"{n_events} events, {n_candidates} candidates")
+    print(f"load per candidate: json={json_time * 1e3:.3f}ms store={store_time * 1e6:.1f}us "
+          f"({json_time / store_time:.0f}x faster)")
+    print(f"bytes per event: dicts={dict_bytes / n_events:.0f} columns={column_bytes / n_events:.1f}")
+    print(f"10M events: dicts~{dict_bytes / n_events * 1e7 / 2**30:.1f} GiB "
+          f"columns~{column_bytes / n_events * 1e7 / 2**20:.0f} MiB (memory-mapped, paged on demand)")
@@ -0,0 +1,108 @@
+"""
+Local OpenAI-compatible fake endpoint used by the benchmarks.
+
+Each provider is served under its own path prefix (e.g. /google/v1) with its
+own simulated latency (a number of seconds, or a callable taking the request
+body), so fan-out behaviour can be measured without network access or API
+keys.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class FakeLLMServer(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # the default 5 drops connections when many calls start at once
+
+    def __init__(self, latencies=None, per_token_latency=0.0, score=42, response_builder=None):
+        super().__init__(("127.0.0.1", 0), _FakeLLMHandler)
+        self.latencies = latencies or {}
+        self.per_token_latency = per_token_latency
+        self.score = score
+        self.response_builder = response_builder
+        self.requests = 0
+        self.connections = 0
+        self.prompt_chars = 0
+        self._lock = threading.Lock()
+
+    def base_url(self, provider):
+        return f"http://127.0.0.1:{self.server_address[1]}/{provider}/v1"
+
+    def start(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+class _FakeLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so connection reuse is observable
+
+    def setup(self):
+        super().setup()
+        with self.server._lock:
+            self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        provider = self.path.strip("/").split("/")[0]
+        prompt = "".join(m.get("content", "") for m in body.get("messages", []))
+
+        with self.server._lock:
+            self.server.requests += 1
+            self.server.prompt_chars += len(prompt)
+
+        delay = self.server.latencies.get(provider, 0.0)
+        if callable(delay):
+            delay = delay(body)
+        delay += self.server.per_token_latency * (len(prompt) // 4)
+        time.sleep(delay)
+
+        if self.server.response_builder:
+            content = self.server.response_builder(body)
+        else:
+            content = json.dumps({"score": self.server.score, "analysis": f"Fake analysis from {provider}."})
+        payload = json.dumps({
+            "id": "chatcmpl-fake",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "fake"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "stop",
+                "message": {"role": "assistant", "content": content}
+            }],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 20, "total_tokens": len(prompt) // 4 + 20}
+        }).encode()
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        try:
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the client cancelled the request (deadline or hedge won)
+
+
+def configure_environment(server):
+    """Point llm_tool at the fake server; must run before llm_tool is imported"""
+    import os
+
+    for provider in ("google", "groq", "mistral"):
+        prefix = provider.upper()
+        os.environ[f"{prefix}_BASE_URL"] = server.base_url(provider)
+        os.environ[f"{prefix}_API_KEY"] = "fake-key"
+        os.environ[f"{prefix}_RPM"] = "1000000"
+        os.environ[f"{prefix}_TPM"] = "1000000000"
+    # Every request should reach the server, not the on-disk cache
+    os.environ["LLM_CACHE_BYPASS"] = "1"
@@ -0,0 +1,68 @@
+"""
+Local (non-LLM) work per scoring run: per-analyzer parsing vs. shared features.
+
+"separate" is the old flow, where format_activity_log, the algorithm scorer
+and the ML feature builder each parse the raw log on their own. "shared"
+parses once into CandidateFeatures and hands them to all three. "warm"
+reruns with a fresh process-level store that reads the .npz cache.
+
+Run from the repository root:
+    python -m benchmarks.feature_store [--repeat 5]
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+from algorithm_analyzer import analyze_algorithm_based_proctoring
+from feature_store import FeatureStore, compute_features
+from llm_analyzer import format_activity_log
+from main import load_activity_log
+from ml_analyzer import create_features
+from util import activity_log_path
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--repeat", type=int, default=5)
+args = parser.parse_args()
+
+
+def timed(label, function):
+    best = float("inf")
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    print(f"  {label:<10} {best * 1000:.1f} ms")
+    return best
+
+
+if __name__ == "__main__":
+    logs = [
+        load_activity_log(candidate_id)
+        for candidate_id in range(1, 1000) if os.path.exists(activity_log_path(candidate_id))
+    ]
+    print(f"{len(logs)} candidates, {sum(map(len, logs))} events, best of {args.repeat}")
+
+    def separate():
+        for log in logs:
+            format_activity_log(log, compute_features(log))
+            analyze_algorithm_based_proctoring(log)
+            create_features(log)
+
+    def shared(store):
+        for log in logs:
+            features = store.get(log)
+            format_activity_log(log, features)
+            analyze_algorithm_based_proctoring(features)
+            create_features(features)
+
+    directory = tempfile.mkdtemp()
+    try:
+        baseline = timed("separate", separate)
+        cold = timed("shared", lambda: shared(FeatureStore(directory=None)))
+        shared(FeatureStore(directory=directory))
+        warm = timed("warm", lambda: shared(FeatureStore(directory=directory)))
+    finally:
+        shutil.rmtree(directory)
+    print(f"  speedup: {baseline / cold:.1f}x shared, {baseline / warm:.1f}x from the disk cache")
@@ -0,0 +1,91 @@
+"""
+Request count and prompt volume with multi-candidate LLM requests.
+
+Scores a synthetic cohort of short logs (the first few minutes of each
+bundled log) through `score_candidates`, once with one request per
+candidate and once with `--batch-size` candidates per request, against a
+local fake endpoint that answers batched prompts with a keyed JSON object.
+A fraction of batched answers omit a candidate to exercise the
+single-candidate fallback.
+
+Run from the repository root:
+    python -m benchmarks.llm_batching [--batch-size 8] [--drop 0.05]
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import re
+
+from benchmarks.fake_llm_server import FakeLLMServer, configure_environment
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--batch-size", type=int, default=8)
+parser.add_argument("--cohort", type=int, default=200)
+parser.add_argument("--events", type=int, default=15, help="Events kept per synthetic short log")
+parser.add_argument("--drop", type=float, default=0.05,
+                    help="Share of candidates the fake model leaves out of a batched answer")
+args = parser.parse_args()
+
+rng = random.Random(7)
+
+
+def answer(body):
+    prompt = body["messages"][-1]["content"]
+    ids = re.findall(r"^=== Candidate (\S+) ===$", prompt, flags=re.MULTILINE)
+    if not ids:
+        return json.dumps({"score": 40, "analysis": "Fake single-candidate analysis."})
+    return json.dumps({
+        candidate_id: {"score": 40, "analysis": f"Fake analysis of candidate {candidate_id}."}
+        for candidate_id in ids if rng.random() >= args.drop
+    })
+
+
+server = FakeLLMServer(latencies={"google": 0.05, "mistral": 0.05}, response_builder=answer).start()
+configure_environment(server)
+os.environ["LLM_PROMPT_MODE"] = "compact"
+
+import batch_scorer  # noqa: E402
+import llm_analyzer  # noqa: E402
+from main import load_activity_log  # noqa: E402
+from util import activity_log_path  # noqa: E402
+
+
+def short_logs():
+    sources = [
+        load_activity_log(candidate_id)[:args.events]
+        for candidate_id in range(1, 1000) if os.path.exists(activity_log_path(candidate_id))
+    ]
+    return {f"s{i}": sources[i % len(sources)] for i in range(args.cohort)}
+
+
+def run(batch_size, logs):
+    candidates = [{"id": candidate_id, "name": candidate_id} for candidate_id in logs]
+    original = batch_scorer.load_events
+    batch_scorer.load_events = logs.get
+    requests_before, chars_before = server.requests, server.prompt_chars
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            results = asyncio.run(batch_scorer.score_candidates(
+                candidates, concurrency=8, report_interval=0, batch_size=batch_size
+            ))
+    finally:
+        batch_scorer.load_events = original
+    return len(results), server.requests - requests_before, server.prompt_chars - chars_before
+
+
+if __name__ == "__main__":
+    logs = short_logs()
+    scored, single_requests, single_chars = run(1, logs)
+    print(f"{scored} candidates, {args.events} events each, compact prompts")
+    print(f"  one per request:   requests={single_requests} prompt_chars={single_chars}")
+
+    scored, batched_requests, batched_chars = run(args.batch_size, logs)
+    print(f"  {f'batch of {args.batch_size}:':<19}requests={batched_requests} prompt_chars={batched_chars} "
+          f"({llm_analyzer.BATCH_STATS['single_fallbacks']} single-candidate fallbacks)")
+    print(f"  reduction: {single_requests / batched_requests:.1f}x requests, "
+          f"{single_chars / batched_chars:.1f}x prompt volume")
+    server.stop()
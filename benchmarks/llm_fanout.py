@@ -0,0 +1,89 @@
+"""
+Fan-out latency of analyze_proctoring_log against a local fake endpoint.
+
+Compares the old pattern (a fresh synchronous OpenAI client and a blocking
+`.create()` inside each coroutine) with the pooled AsyncOpenAI clients in
+llm_tool. With real async clients the fan-out costs max(latencies) instead
+of sum(latencies), and repeated calls reuse kept-alive connections.
+
+Run from the repository root:
+    python -m benchmarks.llm_fanout
+"""
+import asyncio
+import json
+import time
+
+from benchmarks.fake_llm_server import FakeLLMServer, configure_environment
+
+LATENCIES = {"google": 0.6, "mistral": 0.4}
+ROUNDS = 5
+
+server = FakeLLMServer(latencies=LATENCIES).start()
+configure_environment(server)
+
+from openai import OpenAI  # noqa: E402
+
+import llm_tool  # noqa: E402
+from llm_analyzer import analyze_proctoring_log  # noqa: E402
+from main import load_activity_log  # noqa: E402
+
+
+async def blocking_completion(provider, input, system_prompt):
+    """The pre-pooling implementation: new sync client, blocking create()"""
+    client = OpenAI(base_url=server.base_url(provider), api_key="fake-key")
+    response = client.chat.completions.create(
+        model="fake",
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": input}
+        ],
+        response_format={"type": "json_object"}
+    )
+    return response.choices[0].message.content
+
+
+async def blocking_fanout():
+    return await asyncio.gather(*(
+        blocking_completion(provider, "log", "system") for provider in LATENCIES
+    ))
+
+
+async def pooled_fanout():
+    return await asyncio.gather(
+        llm_tool.google_chat_completions("log", "system"),
+        llm_tool.mistral_chat_completions("log", "system")
+    )
+
+
+def measure(label, factory):
+    async def run():
+        timings = []
+        for _ in range(ROUNDS):
+            start = time.perf_counter()
+            await factory()
+            timings.append(time.perf_counter() - start)
+        await llm_tool.close_clients()
+        return timings
+
+    connections_before = server.connections
+    timings = asyncio.run(run())
+    print(
+        f"{label:<28} mean={sum(timings) / len(timings):.3f}s "
+        f"min={min(timings):.3f}s connections_opened={server.connections - connections_before}"
+    )
+    return timings
+
+
+if __name__ == "__main__":
+    print(f"Simulated provider latency: {LATENCIES} "
+          f"(sum={sum(LATENCIES.values()):.2f}s, max={max(LATENCIES.values()):.2f}s)")
+    blocking = measure("blocking sync clients", blocking_fanout)
+    pooled = measure("pooled async clients", pooled_fanout)
+
+    activity_log = load_activity_log(1)
+    candidate = measure("analyze_proctoring_log", lambda: analyze_proctoring_log(activity_log))
+
+    speedup = (sum(blocking) / len(blocking)) / (sum(pooled) / len(pooled))
+    print(f"Fan-out speedup: {speedup:.2f}x")
+    print(json.dumps({"requests_served": server.requests, "connections_opened": server.connections}))
+    server.stop()
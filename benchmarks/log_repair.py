@@ -0,0 +1,78 @@
+"""
+Bulk repair throughput of valid_data.fix_json_files.
+
+Writes a synthetic upload of candidateN.json files, a fraction of them
+damaged the way real uploads are (bare activityLog key, missing closing
+brackets, trailing comma), then repairs copies of it with one worker and
+with the whole pool, and runs once more over the repaired files, where
+every file takes the quick-check path and is skipped.
+
+Run from the repository root:
+    python -m benchmarks.log_repair [--files 2000] [--events 500] [--broken 0.2]
+"""
+import argparse
+import json
+import os
+import random
+import shutil
+import tempfile
+
+from valid_data import fix_json_files
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--files", type=int, default=2000)
+parser.add_argument("--events", type=int, default=500, help="Events per file")
+parser.add_argument("--broken", type=float, default=0.2, help="Fraction of damaged files")
+parser.add_argument("--workers", type=int, default=None)
+args = parser.parse_args()
+
+DAMAGE = [
+    lambda text: text[1:-1].strip(),                     # no braces, quoted key
+    lambda text: text[1:-1].strip().lstrip('"').replace('"', "", 1),  # bare key
+    lambda text: text.rstrip("}").rstrip().rstrip("]"),  # missing closers
+    lambda text: text[:-1].rstrip() + ",\n}",            # trailing comma
+]
+
+
+def write_upload(directory, n_files, n_events, broken, seed=3):
+    rng = random.Random(seed)
+    os.makedirs(directory)
+    for i in range(1, n_files + 1):
+        log = [
+            {
+                "type": "Extension Proctoring",
+                "timeStampInVideo": f"00:{j // 60 % 60:02d}:{j % 60:02d}",
+                "activityDescription": "Window focus changed",
+                "count": 1
+            }
+            for j in range(n_events)
+        ]
+        text = json.dumps({"activityLog": log}, indent=4)
+        if rng.random() < broken:
+            text = rng.choice(DAMAGE)(text)
+        with open(os.path.join(directory, f"candidate{i}.json"), "w") as file:
+            file.write(text)
+
+
+def show(label, report):
+    print(
+        f"  {label:<24} {report['seconds']:6.2f}s  {report['files_per_second']:8.1f} files/s  "
+        f"{report['mib_per_second']:6.1f} MiB/s  valid={report['clean']} fixed={report['fixed']} failed={report['failed']}"
+    )
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    upload = os.path.join(tmp, "upload")
+    write_upload(upload, args.files, args.events, args.broken)
+    print(f"{args.files} files, {args.events} events each, {args.broken:.0%} damaged, {os.cpu_count()} CPUs")
+
+    serial_dir = os.path.join(tmp, "serial")
+    shutil.copytree(upload, serial_dir)
+    show("1 worker", fix_json_files(serial_dir, workers=1))
+
+    pool_dir = os.path.join(tmp, "pool")
+    shutil.copytree(upload, pool_dir)
+    show(f"pool, {args.workers or os.cpu_count()} worker(s)", fix_json_files(pool_dir, workers=args.workers))
+    show("re-run, all valid", fix_json_files(pool_dir, workers=args.workers))
+    shutil.rmtree(tmp)
@@ -0,0 +1,95 @@
+"""
+Peak memory and time to read one oversized activity log: whole-file
+json.load vs. the streaming reader in log_reader.py.
+
+Writes a synthetic candidateN.json (indent=4, like the repaired data files)
+and reads it five ways:
+
+- json.load + a normalized list of dicts (what load_activity_log did)
+- list(iter_activity_log(...)), for callers that still want the dicts
+- normalize_events(iter_activity_log(...)), the compact columns
+- StreamingAlgorithmScorer over the stream, nothing kept per event
+- build_event_store ingesting the file into the columnar store
+
+Peak memory comes from tracemalloc in a separate pass from the timing.
+
+Run from the repository root:
+    python -m benchmarks.log_streaming [--events 100000 1000000]
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+import time
+import tracemalloc
+
+from algorithm_analyzer import StreamingAlgorithmScorer
+from event_store import build_event_store
+from events import normalize_entry, normalize_events
+from log_reader import iter_activity_log
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--events", type=int, nargs="+", default=[100_000, 1_000_000])
+args = parser.parse_args()
+
+ACTIVITIES = ["Candidate looking right", "Candidate iris looking left", "Window focus changed", "Browser window swapped"]
+SOURCES = ["Video Proctoring", "Extension Proctoring", "Agent Proctoring"]
+
+
+def write_log(path, n, duration=6 * 3600):
+    rng = random.Random(n)
+    step = duration / n
+    with open(path, "w") as file:
+        file.write('{\n    "activityLog": [')
+        for i in range(n):
+            s = int(i * step)
+            event = {
+                "type": rng.choice(SOURCES),
+                "timeStampInVideo": f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}",
+                "activityDescription": rng.choice(ACTIVITIES),
+                "count": 1
+            }
+            file.write(("\n" if i == 0 else ",\n") + "        " + json.dumps(event, indent=4).replace("\n", "\n        "))
+        file.write("\n    ]\n}")
+
+
+def whole_file(path):
+    with open(path, "r") as file:
+        data = json.load(file)
+    return [normalize_entry(entry) for entry in data.get("activityLog", [])]
+
+
+def measure(read):
+    start = time.perf_counter()
+    read()
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    result = read()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return elapsed, peak
+
+
+if __name__ == "__main__":
+    tmp = tempfile.mkdtemp()
+    data_dir = os.path.join(tmp, "data")
+    os.makedirs(data_dir)
+    path = os.path.join(data_dir, "candidate1.json")
+
+    readers = [
+        ("json.load + dicts", lambda: whole_file(path)),
+        ("streamed dicts", lambda: list(iter_activity_log(path))),
+        ("streamed columns", lambda: normalize_events(iter_activity_log(path))),
+        ("streamed scoring", lambda: StreamingAlgorithmScorer().update_many(iter_activity_log(path)).result()),
+        ("event store ingest", lambda: build_event_store(data_dir, os.path.join(tmp, "event_store"))),
+    ]
+    for n in args.events:
+        write_log(path, n)
+        size = os.path.getsize(path)
+        print(f"{n} events, file {size / 2**20:.1f} MiB")
+        for name, read in readers:
+            elapsed, peak = measure(read)
+            print(f"  {name:<20} {elapsed:6.2f} s  peak {peak / 2**20:8.1f} MiB ({peak / size:5.2f}x file)")
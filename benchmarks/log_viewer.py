@@ -0,0 +1,67 @@
+"""
+Raw-log payload per details-page rerun: whole log vs. one filtered page.
+
+For synthetic logs of growing length, compares what the old page sent on
+every rerun (the full log as an Arrow table for st.dataframe plus the full
+log as JSON for st.json) with one LogView page, and times the LogView
+build and a filtered page query.
+
+Run from the repository root:
+    python -m benchmarks.log_viewer [--events 1000 10000 100000]
+"""
+import argparse
+import json
+import random
+import time
+
+import pandas as pd
+from streamlit.dataframe_util import convert_pandas_df_to_arrow_bytes
+
+from feature_store import compute_features
+from log_viewer import LogView
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--events", type=int, nargs="+", default=[1000, 10000, 100000])
+parser.add_argument("--page-size", type=int, default=100)
+args = parser.parse_args()
+
+ACTIVITIES = ["Candidate looking right", "Candidate iris looking left", "Window focus changed", "Browser window swapped"]
+SOURCES = ["Video Proctoring", "Extension Proctoring", "Agent Proctoring"]
+
+
+def synthetic_log(n, duration=3 * 3600):
+    rng = random.Random(n)
+    return [
+        {
+            "type": rng.choice(SOURCES),
+            "timeStampInVideo": f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}",
+            "activityDescription": rng.choice(ACTIVITIES),
+            "count": 1
+        }
+        for s in sorted(rng.randrange(duration) for _ in range(n))
+    ]
+
+
+def payload(frame, records):
+    return len(convert_pandas_df_to_arrow_bytes(frame)) + len(json.dumps(records))
+
+
+if __name__ == "__main__":
+    for n in args.events:
+        log = synthetic_log(n)
+        features = compute_features(log)
+        old = payload(pd.DataFrame(log), log)
+
+        start = time.perf_counter()
+        view = LogView(log, features)
+        build = time.perf_counter() - start
+
+        start = time.perf_counter()
+        _, _, frame, records = view.query(["Browser window swapped"], ["Extension Proctoring"], 1800, 5400, 2, args.page_size)
+        query = time.perf_counter() - start
+        new = payload(frame, records)
+
+        print(
+            f"  {n:>7} events  full log {old / 1024:9.1f} KiB  page {new / 1024:6.1f} KiB  "
+            f"build {build * 1000:6.1f} ms (once)  filtered page {query * 1000:5.2f} ms"
+        )
@@ -0,0 +1,64 @@
+"""
+Feature extraction throughput of ml_training.py on a large synthetic cohort.
+
+Copies the bundled logs into a temporary directory until it holds
+--files logs, then times the notebook's approach (parse each file in turn,
+np.vstack a growing list) against the process-pool extraction with 1 and
+--workers processes.
+
+Run from the repository root:
+    python -m benchmarks.ml_training [--files 3000] [--workers 4]
+"""
+import argparse
+import json
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+
+from ml_analyzer import create_features
+from ml_training import extract_features, training_files
+from util import DATA_DIR
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--files", type=int, default=3000)
+parser.add_argument("--workers", type=int, default=os.cpu_count())
+args = parser.parse_args()
+
+
+def notebook_extraction(files):
+    all_features = []
+    for _, path in files:
+        with open(path, "r") as f:
+            features = create_features(json.load(f).get("activityLog", []))
+        if features.size:
+            all_features.append(features)
+    return np.vstack(all_features)
+
+
+def timed(label, function):
+    start = time.perf_counter()
+    result = function()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<28} {elapsed:.2f}s")
+    return result
+
+
+if __name__ == "__main__":
+    sources = [path for _, path in training_files(DATA_DIR)]
+    directory = tempfile.mkdtemp()
+    try:
+        for i in range(args.files):
+            shutil.copyfile(sources[i % len(sources)], os.path.join(directory, f"candidate{i + 1}.json"))
+        files = training_files(directory)
+        print(f"{len(files)} logs, {os.cpu_count()} CPUs")
+
+        expected = timed("sequential + np.vstack", lambda: notebook_extraction(files))
+        single, _ = timed("process pool, 1 worker", lambda: extract_features(files, workers=1))
+        pooled, _ = timed(f"process pool, {args.workers} workers", lambda: extract_features(files, workers=args.workers))
+        assert np.array_equal(expected, single) and np.array_equal(expected, pooled)
+        print(f"  {len(pooled)} feature rows, identical in all runs")
+    finally:
+        shutil.rmtree(directory)
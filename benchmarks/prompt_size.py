@@ -0,0 +1,84 @@
+"""
+Prompt size and end-to-end latency: full vs. compact prompt encoding.
+
+Reports estimated prompt tokens per candidate for both encodings, then
+runs analyze_proctoring_log against a local fake endpoint whose latency
+grows with prompt size (simulated prefill cost per token).
+
+Run from the repository root:
+    python -m benchmarks.prompt_size [--per-token-ms 0.02]
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+from benchmarks.fake_llm_server import FakeLLMServer, configure_environment
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--per-token-ms", type=float, default=0.02,
+                    help="Simulated server latency per prompt token")
+parser.add_argument("--base-latency", type=float, default=0.2)
+parser.add_argument("--candidates", type=int, default=10,
+                    help="Largest N logs to run end to end")
+args = parser.parse_args()
+
+server = FakeLLMServer(
+    latencies={"google": args.base_latency, "mistral": args.base_latency},
+    per_token_latency=args.per_token_ms / 1000.0
+).start()
+configure_environment(server)
+
+from llm_analyzer import analyze_proctoring_log, create_input_prompt, format_activity_log  # noqa: E402
+from llm_tool import close_clients, estimate_tokens  # noqa: E402
+from main import load_activity_log  # noqa: E402
+from util import activity_log_path  # noqa: E402
+
+
+def candidate_logs():
+    import os
+    logs = {}
+    for candidate_id in range(1, 1000):
+        if os.path.exists(activity_log_path(candidate_id)):
+            logs[candidate_id] = load_activity_log(candidate_id)
+    return logs
+
+
+async def timed(activity_log, compact):
+    start = time.perf_counter()
+    await analyze_proctoring_log(activity_log, compact=compact)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    logs = candidate_logs()
+    sizes = []
+    for candidate_id, activity_log in logs.items():
+        formatted = format_activity_log(activity_log)
+        full = estimate_tokens(create_input_prompt(formatted, compact=False))
+        compact = estimate_tokens(create_input_prompt(formatted, compact=True))
+        sizes.append((full, compact, candidate_id))
+
+    total_full = sum(full for full, _, _ in sizes)
+    total_compact = sum(compact for _, compact, _ in sizes)
+    largest = max(sizes)
+    print(f"{len(sizes)} candidates, estimated input tokens")
+    print(f"  full:    total={total_full} mean={total_full / len(sizes):.0f} max={largest[0]}")
+    print(f"  compact: total={total_compact} mean={total_compact / len(sizes):.0f}")
+    print(f"  reduction: {total_full / total_compact:.1f}x overall, "
+          f"{largest[0] / largest[1]:.1f}x on the largest log (candidate {largest[2]})")
+
+    biggest = [candidate_id for _, _, candidate_id in sorted(sizes, reverse=True)[:args.candidates]]
+
+    async def run(compact):
+        timings = [await timed(logs[candidate_id], compact) for candidate_id in biggest]
+        await close_clients()
+        return timings
+
+    full_latency = asyncio.run(run(False))
+    compact_latency = asyncio.run(run(True))
+    print(f"end-to-end latency on the {len(biggest)} largest logs "
+          f"(fake server: {args.base_latency}s + {args.per_token_ms}ms/token)")
+    print(f"  full:    mean={statistics.mean(full_latency):.3f}s max={max(full_latency):.3f}s")
+    print(f"  compact: mean={statistics.mean(compact_latency):.3f}s max={max(compact_latency):.3f}s")
+    server.stop()
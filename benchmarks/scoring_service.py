@@ -0,0 +1,166 @@
+"""
+End-to-end load test of scoring_service.py against the local fake LLM endpoint.
+
+Starts the fake OpenAI-compatible server and the scoring service (uvicorn,
+with its worker pool) on local ports, then sends real HTTP requests:
+
+1. one request, checked against `main_output` run in-process on the same log
+2. a burst where many clients ask for the same few logs at once, counting
+   the LLM calls that reach the fake server (one set per distinct log when
+   coalescing works)
+3. a burst of distinct logs well beyond --max-active + --max-queue, showing
+   that the excess is rejected with 503 instead of queueing, so accepted
+   requests keep a bounded latency
+4. one --large-events log, polling /health meanwhile: parsing, hashing and
+   prompt building run in the worker pool, so the event loop keeps answering
+
+Run from the repository root:
+    python -m benchmarks.scoring_service [--workers 2] [--max-active 4] [--max-queue 8]
+"""
+import argparse
+import json
+import os
+import random
+import socket
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.fake_llm_server import FakeLLMServer, configure_environment
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--workers", type=int, default=2)
+parser.add_argument("--max-active", type=int, default=4)
+parser.add_argument("--max-queue", type=int, default=8)
+parser.add_argument("--llm-latency", type=float, default=0.3, help="Seconds per fake LLM call")
+parser.add_argument("--events", type=int, default=2000, help="Events per synthetic log")
+parser.add_argument("--clients", type=int, default=48)
+parser.add_argument("--large-events", type=int, default=30000, help="Events in the log scored while polling /health")
+args = parser.parse_args()
+
+fake_llm = FakeLLMServer(latencies={"google": args.llm_latency, "mistral": args.llm_latency}).start()
+configure_environment(fake_llm)
+os.environ["SERVICE_WORKERS"] = str(args.workers)
+os.environ["SERVICE_MAX_ACTIVE"] = str(args.max_active)
+os.environ["SERVICE_MAX_QUEUE"] = str(args.max_queue)
+
+import uvicorn  # noqa: E402
+
+import scoring_service  # noqa: E402
+from main import main_output  # noqa: E402
+
+ACTIVITIES = ["Candidate looking right", "Candidate iris looking left", "Window focus changed", "Browser window swapped", "Tab change detected"]
+SOURCES = ["Video Proctoring", "Extension Proctoring", "Agent Proctoring"]
+
+
+def synthetic_log(seed, n):
+    rng = random.Random(seed)
+    return [
+        {
+            "type": rng.choice(SOURCES),
+            "timeStampInVideo": f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}",
+            "activityDescription": rng.choice(ACTIVITIES),
+            "count": rng.randint(1, 3)
+        }
+        for s in sorted(rng.randrange(2 * 3600) for _ in range(n))
+    ]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def post(url, payload):
+    """(status, seconds, body) of one POST"""
+    request = urllib.request.Request(url, data=json.dumps(payload).encode(), headers={"Content-Type": "application/json"})
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=300) as response:
+            return response.status, time.perf_counter() - start, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, time.perf_counter() - start, None
+
+
+def get_seconds(url):
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=300) as response:
+        response.read()
+    return time.perf_counter() - start
+
+
+def burst(url, payloads):
+    with ThreadPoolExecutor(max_workers=args.clients) as clients:
+        return list(clients.map(lambda payload: post(url, payload), payloads))
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))] if values else float("nan")
+
+
+def show(label, results, llm_calls):
+    ok = [seconds for status, seconds, _ in results if status == 200]
+    rejected = [seconds for status, seconds, _ in results if status == 503]
+    print(
+        f"  {label:<34} 200={len(ok):<3} 503={len(rejected):<3} "
+        f"p50={percentile(ok, 0.5):5.2f}s p99={percentile(ok, 0.99):5.2f}s "
+        f"rejected p99={percentile(rejected, 0.99):5.3f}s  LLM calls={llm_calls}"
+    )
+
+
+if __name__ == "__main__":
+    # Reference result first: llm_tool's pooled clients belong to one event loop at a time
+    candidate = {"id": 1, "name": "Candidate 1", "exam_name": "Benchmark", "exam_date": "2025-03-09"}
+    log = synthetic_log(0, args.events)
+    expected = main_output(candidate, log)
+
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(scoring_service.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    url = f"http://127.0.0.1:{port}/score"
+    print(f"{args.workers} workers, max active {args.max_active}, max queue {args.max_queue}, "
+          f"{args.events} events per log, fake LLM {args.llm_latency}s per call")
+
+    # 1. Same fused result as main_output in-process
+    before = fake_llm.requests
+    status, seconds, body = post(url, {"candidate": candidate, "activityLog": log})
+    calls_per_log = fake_llm.requests - before
+    print(f"  single request                     {status} in {seconds:.2f}s, matches main_output: {body == expected}")
+
+    # 2. Many clients, few distinct logs
+    logs = [synthetic_log(seed, args.events) for seed in range(1, 5)]
+    payloads = [{"candidate": {"id": i}, "activityLog": logs[i % len(logs)]} for i in range(args.clients)]
+    before = fake_llm.requests
+    results = burst(url, payloads)
+    show(f"{len(payloads)} requests, {len(logs)} distinct logs", results, fake_llm.requests - before)
+    print(f"    without coalescing: {len(payloads) * calls_per_log} LLM calls")
+
+    # 3. Distinct logs beyond what the service admits
+    payloads = [{"candidate": {"id": i}, "activityLog": synthetic_log(100 + i, args.events)} for i in range(args.clients)]
+    before = fake_llm.requests
+    results = burst(url, payloads)
+    show(f"{len(payloads)} requests, all distinct", results, fake_llm.requests - before)
+
+    # 4. Event loop responsiveness while a large log is scored
+    health_url = f"http://127.0.0.1:{port}/health"
+    large = {"candidate": {"id": 0}, "activityLog": synthetic_log(999, args.large_events)}
+    with ThreadPoolExecutor(max_workers=1) as client:
+        pending = client.submit(post, url, large)
+        polls = []
+        while not pending.done():
+            polls.append(get_seconds(health_url))
+            time.sleep(0.02)
+        status, seconds, _ = pending.result()
+    print(f"  {args.large_events}-event log              {status} in {seconds:.2f}s, "
+          f"/health during it: {len(polls)} polls, max {max(polls, default=float('nan')):.3f}s")
+
+    with urllib.request.urlopen(health_url) as response:
+        print(f"  health: {json.loads(response.read())}")
+    server.should_exit = True
+    fake_llm.stop()
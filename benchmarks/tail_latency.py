@@ -0,0 +1,80 @@
+"""
+Per-candidate LLM latency percentiles with a heavy-tailed provider.
+
+The fake Mistral endpoint is usually fast but answers very slowly on a
+fraction of requests. The run is repeated with hedging/early exit disabled
+(wait for everything, like a bare asyncio.gather) and enabled, and p50/p99
+per-candidate latency is reported for both.
+
+Run from the repository root:
+    python -m benchmarks.tail_latency [--candidates 60]
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import time
+
+from benchmarks.fake_llm_server import FakeLLMServer, configure_environment
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--candidates", type=int, default=60)
+parser.add_argument("--slow-fraction", type=float, default=0.1)
+parser.add_argument("--slow-latency", type=float, default=4.0)
+args = parser.parse_args()
+
+rng = random.Random(3)
+
+
+def heavy_tail(body):
+    # The hedge model (mistral-small) is served by the same endpoint but is never slow
+    if body.get("model") == "mistral-large-latest" and rng.random() < args.slow_fraction:
+        return args.slow_latency
+    return 0.2
+
+
+server = FakeLLMServer(latencies={"google": 0.3, "mistral": heavy_tail}).start()
+configure_environment(server)
+os.environ.setdefault("LLM_HEDGE_AFTER", "0.6")
+os.environ.setdefault("LLM_CALL_TIMEOUT", "3")
+os.environ.setdefault("LLM_CANDIDATE_BUDGET", "2.5")
+os.environ.setdefault("LLM_SYNTHESIS_TIMEOUT", "1")
+
+import llm_analyzer  # noqa: E402
+from llm_tool import close_clients  # noqa: E402
+from main import load_activity_log  # noqa: E402
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+async def run(activity_log):
+    timings = []
+    for i in range(args.candidates):
+        # Vary the prompt so every request really goes out
+        start = time.perf_counter()
+        await llm_analyzer.analyze_proctoring_log(activity_log + [{"activityDescription": f"run {i}"}])
+        timings.append(time.perf_counter() - start)
+    await close_clients()
+    return timings
+
+
+if __name__ == "__main__":
+    activity_log = load_activity_log(1)
+
+    hedged = (llm_analyzer.HEDGE_AFTER, llm_analyzer.CANDIDATE_BUDGET, llm_analyzer.CALL_TIMEOUT)
+    llm_analyzer.HEDGE_AFTER, llm_analyzer.CANDIDATE_BUDGET, llm_analyzer.CALL_TIMEOUT = 0, 3600, 3600
+    baseline = asyncio.run(run(activity_log))
+
+    llm_analyzer.HEDGE_AFTER, llm_analyzer.CANDIDATE_BUDGET, llm_analyzer.CALL_TIMEOUT = hedged
+    bounded = asyncio.run(run(activity_log))
+
+    print(f"{args.candidates} candidates, {args.slow_fraction:.0%} of Mistral calls take {args.slow_latency}s")
+    for label, timings in (("wait for all", baseline), ("hedged + deadline", bounded)):
+        print(f"  {label:<18} p50={statistics.median(timings):.2f}s "
+              f"p99={percentile(timings, 0.99):.2f}s max={max(timings):.2f}s")
+    print(f"  budget: {llm_analyzer.CANDIDATE_BUDGET}s, hedge after {llm_analyzer.HEDGE_AFTER}s")
+    server.stop()
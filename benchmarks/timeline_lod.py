@@ -0,0 +1,71 @@
+"""
+Activity timeline render time vs. log length, exact vs. level-of-detail.
+
+Builds synthetic logs (mostly gaze events plus a few high-suspicion ones)
+and renders the details-page timeline to PNG the way the dashboard does,
+once with every event plotted ("exact", the old behavior) and once with
+the level-of-detail binning, plus a zoomed 10-minute view.
+
+Run from the repository root:
+    python -m benchmarks.timeline_lod [--events 1000 10000 100000]
+"""
+import argparse
+import functools
+import io
+import random
+import time
+
+parser = argparse.ArgumentParser()
+parser.add_argument("--events", type=int, nargs="+", default=[1000, 10000, 100000])
+args = parser.parse_args()
+
+ACTIVITIES = (
+    ["Candidate looking right"] * 40 + ["Candidate iris looking left"] * 30 + ["Candidate looking down"] * 20
+    + ["Window focus changed"] * 6 + ["Display change detected"] * 3 + ["Browser window swapped"]
+)
+
+
+def synthetic_log(n, duration=3 * 3600):
+    rng = random.Random(n)
+    seconds = sorted(rng.randrange(duration) for _ in range(n))
+    return [
+        {
+            "activityDescription": rng.choice(ACTIVITIES),
+            "timeStampInVideo": f"{s // 3600:02d}:{s // 60 % 60:02d}:{s % 60:02d}",
+            "count": 1
+        }
+        for s in seconds
+    ]
+
+
+def render(build):
+    import matplotlib.pyplot as plt
+
+    start = time.perf_counter()
+    fig = build()
+    image = io.BytesIO()
+    fig.savefig(image, format="png", bbox_inches="tight", dpi=200)
+    plt.close(fig)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    import matplotlib
+    matplotlib.use("Agg")
+
+    # Importing the dashboard runs its main page once in Streamlit's bare mode
+    import app
+    from activity_timeline import timeline_view
+    from feature_store import compute_features
+
+    lod_view = app.timeline_view
+    exact_view = functools.partial(timeline_view, max_events=float("inf"))
+
+    for n in args.events:
+        features = compute_features(synthetic_log(n))
+        app.timeline_view = exact_view
+        exact = render(lambda: app.timeline_figure(features))
+        app.timeline_view = lod_view
+        lod = render(lambda: app.timeline_figure(features))
+        zoom = render(lambda: app.timeline_figure(features, 3600, 4200))
+        print(f"  {n:>7} events  exact {exact * 1000:8.1f} ms  lod {lod * 1000:7.1f} ms  zoom 10min {zoom * 1000:7.1f} ms")
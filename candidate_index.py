@@ -0,0 +1,113 @@
+"""
+In-memory indexes over candidate summaries for the dashboard grid.
+
+Built once per processed_candidates.json and shared by every session:
+
+- status -> candidate positions
+- lowercased name n-grams (1 to 3 characters) -> candidate positions, so a
+  search intersects a few posting sets instead of scanning every name
+- candidate positions presorted by score and by name
+- id -> candidate, for the details page
+
+A filtered, sorted page is then a mask over a presorted array plus a slice.
+"""
+import numpy as np
+
+NGRAM = 3
+
+SORT_ORDERS = {
+    "Default": "file",
+    "Score (high to low)": "score_desc",
+    "Score (low to high)": "score_asc",
+    "Name": "name",
+}
+
+
+def _ngrams(text, n):
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+class CandidateIndex:
+    def __init__(self, candidates):
+        self.candidates = candidates
+        self.names = [str(c.get('name', '')).lower() for c in candidates]
+        self.by_id = {c.get('id'): c for c in reversed(candidates)}
+
+        self.by_status = {}
+        for position, candidate in enumerate(candidates):
+            self.by_status.setdefault(candidate.get('status'), []).append(position)
+        self.by_status = {status: np.array(positions, dtype=np.int64) for status, positions in self.by_status.items()}
+
+        self.ngrams = {}
+        for position, name in enumerate(self.names):
+            for n in range(1, NGRAM + 1):
+                for gram in _ngrams(name, n):
+                    self.ngrams.setdefault(gram, []).append(position)
+        self.ngrams = {gram: np.array(positions, dtype=np.int64) for gram, positions in self.ngrams.items()}
+
+        scores = np.array([c.get('overall_score', 0) or 0 for c in candidates], dtype=np.float64)
+        # Stable sorts so ties keep the file order
+        self.orders = {
+            "file": np.arange(len(candidates), dtype=np.int64),
+            "score_desc": np.argsort(-scores, kind="stable"),
+            "score_asc": np.argsort(scores, kind="stable"),
+            "name": np.array(sorted(range(len(candidates)), key=self.names.__getitem__), dtype=np.int64),
+        }
+
+    def __len__(self):
+        return len(self.candidates)
+
+    def get(self, candidate_id):
+        return self.by_id.get(candidate_id)
+
+    def status_count(self, status):
+        return len(self.by_status.get(status, ()))
+
+    def _search(self, term):
+        """Sorted positions whose lowercased name contains `term`"""
+        term = term.lower()
+        if len(term) <= NGRAM:
+            return self.ngrams.get(term, np.empty(0, dtype=np.int64))
+
+        # Every trigram of the term must occur in the name; verify the survivors
+        postings = [self.ngrams.get(gram) for gram in _ngrams(term, NGRAM)]
+        if any(posting is None for posting in postings):
+            return np.empty(0, dtype=np.int64)
+        postings.sort(key=len)
+        positions = postings[0]
+        for posting in postings[1:]:
+            positions = np.intersect1d(positions, posting, assume_unique=True)
+            if len(positions) == 0:
+                break
+        return np.array([p for p in positions.tolist() if term in self.names[p]], dtype=np.int64)
+
+    def query(self, status=None, search="", sort="file", page=1, page_size=24):
+        """
+        One page of candidates matching the filters.
+
+        Args:
+            status: Risk status to keep, or None / 'All' for every status
+            search: Case-insensitive substring of the name
+            sort: Key of `orders` ("file", "score_desc", "score_asc" or "name")
+            page: 1-based page number, clamped to the available pages
+            page_size: Candidates per page
+
+        Returns:
+            Tuple of (total matches, page number used, candidates on the page)
+        """
+        order = self.orders[sort]
+        mask = None
+        if status and status != 'All':
+            mask = np.zeros(len(self.candidates), dtype=bool)
+            mask[self.by_status.get(status, [])] = True
+        if search:
+            matches = np.zeros(len(self.candidates), dtype=bool)
+            matches[self._search(search)] = True
+            mask = matches if mask is None else mask & matches
+
+        selected = order if mask is None else order[mask[order]]
+        total = len(selected)
+        pages = max(1, -(-total // page_size))
+        page = min(max(1, page), pages)
+        start = (page - 1) * page_size
+        return total, page, [self.candidates[p] for p in selected[start:start + page_size].tolist()]
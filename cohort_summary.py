@@ -0,0 +1,124 @@
+"""
+Cohort-level aggregates of processed_candidates.json.
+
+The scoring run writes a small summary next to the results file (status
+counts, score histograms per analyzer, per-exam and per-date breakdowns)
+so the dashboard overview doesn't rescan every candidate. All aggregates
+are sums, so an incremental run subtracts the old result of each
+rescored candidate and adds the new one instead of rebuilding.
+"""
+import json
+import os
+
+from util import atomic_write, get_score_status
+
+# Bump when the summary layout changes so old files are rebuilt
+SUMMARY_VERSION = 1
+
+STATUSES = ['High Risk', 'Medium Risk', 'Low Risk', 'No Risk']
+
+# Histogram bins of width 10 over 0-100; 100 falls in the last bin
+SCORE_BINS = list(range(0, 101, 10))
+
+ANALYZERS = {
+    "overall": lambda result: result.get('overall_score', 0),
+    "ai": lambda result: result.get('ai_based_proctoring', {}).get('score', 0),
+    "algorithm": lambda result: result.get('algorithm_based_proctoring', {}).get('score', 0),
+    "ml": lambda result: result.get('ml_based_proctoring', {}).get('score', 0)
+}
+
+def summary_path(results_path):
+    """processed_candidates.json -> processed_candidates_summary.json"""
+    stem, _ = os.path.splitext(results_path)
+    return f"{stem}_summary.json"
+
+def empty_summary():
+    return {
+        "version": SUMMARY_VERSION,
+        "source_sha256": None,
+        "candidates": 0,
+        "status_counts": {status: 0 for status in STATUSES},
+        "score_bins": SCORE_BINS,
+        "scores": {
+            name: {"count": 0, "sum": 0, "histogram": [0] * (len(SCORE_BINS) - 1)}
+            for name in ANALYZERS
+        },
+        "exams": {},
+        "dates": {}
+    }
+
+def _score_bin(score):
+    return min(max(int(score // 10), 0), len(SCORE_BINS) - 2)
+
+def _add_group(groups, key, status, score, sign):
+    group = groups.setdefault(key, {"candidates": 0, "score_sum": 0, "status_counts": {s: 0 for s in STATUSES}})
+    group["candidates"] += sign
+    group["score_sum"] = round(group["score_sum"] + sign * score, 2)
+    group["status_counts"][status] += sign
+    if group["candidates"] == 0:
+        del groups[key]
+
+def add_result(summary, result, sign=1):
+    """Add one candidate's result to the summary (sign=-1 removes it)"""
+    overall = result.get('overall_score', 0) or 0
+    # Same status rule as load_candidates, which recomputes it from the stored score
+    status = get_score_status(overall)
+
+    summary["candidates"] += sign
+    summary["status_counts"][status] += sign
+    for name, get_score in ANALYZERS.items():
+        score = get_score(result) or 0
+        stats = summary["scores"][name]
+        stats["count"] += sign
+        stats["sum"] = round(stats["sum"] + sign * score, 2)
+        stats["histogram"][_score_bin(score)] += sign
+
+    _add_group(summary["exams"], result.get('exam_name', 'Unknown Exam'), status, overall, sign)
+    _add_group(summary["dates"], result.get('exam_date', '2025-03-09'), status, overall, sign)
+
+def build_summary(results):
+    summary = empty_summary()
+    for result in results:
+        add_result(summary, result)
+    return summary
+
+def update_summary(summary, previous_results, results):
+    """
+    Move a summary of `previous_results` to one of `results`.
+
+    Only candidates whose result was added, changed or dropped are touched.
+    """
+    previous_by_id = {result.get('id'): result for result in previous_results}
+    current_by_id = {result.get('id'): result for result in results}
+    for candidate_id, previous in previous_by_id.items():
+        if current_by_id.get(candidate_id) != previous:
+            add_result(summary, previous, sign=-1)
+    for candidate_id, current in current_by_id.items():
+        if previous_by_id.get(candidate_id) != current:
+            add_result(summary, current)
+    return summary
+
+def load_summary(path, source_sha256=None):
+    """
+    Summary stored at `path`, or None if it is missing, unreadable, from an
+    older layout or (when `source_sha256` is given) built from other results.
+    """
+    try:
+        with open(path, 'r') as file:
+            summary = json.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception as e:
+        print(f"Error loading {path}: {e}")
+        return None
+    if summary.get("version") != SUMMARY_VERSION:
+        return None
+    if source_sha256 is not None and summary.get("source_sha256") != source_sha256:
+        return None
+    return summary
+
+def save_summary(summary, path, source_sha256):
+    """Write via a temp file and rename, tagged with the hash of the results it describes"""
+    summary["source_sha256"] = source_sha256
+    with atomic_write(path) as file:
+        json.dump(summary, file, indent=2)
@@ -0,0 +1,210 @@
+"""
+Columnar, memory-mapped store for candidate activity logs.
+
+All logs are ingested once into flat NumPy columns (one .npy file each):
+
+    seconds   int32  timestamp in video, MISSING_SECONDS when NaN/unparseable
+    activity  int16  code into meta["activities"]
+    count     int32  event count
+    source    int8   code into meta["sources"] ("Video Proctoring", ...)
+    offsets   int64  candidate i owns rows offsets[i]:offsets[i+1]
+
+Columns are opened with mmap_mode="r", so loading a candidate is a dict
+lookup plus four array slices; nothing is parsed or copied.
+
+Build the store with:
+    python event_store.py --data-dir data
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import shutil
+
+import numpy as np
+
+# CandidateEvents and the timestamp parsers live in events.py; re-exported here
+from events import MISSING_SECONDS, CandidateEvents, iter_event_batches, parse_seconds, parse_timestamps, remap_codes
+from log_reader import iter_activity_log
+from util import DATA_DIR
+
+EVENT_STORE_DIR = os.getenv("EVENT_STORE_DIR", "event_store")
+STORE_FORMAT_VERSION = 1
+COLUMNS = ("seconds", "activity", "count", "source")
+COLUMN_DTYPES = {"seconds": np.int32, "activity": np.int16, "count": np.int32, "source": np.int8}
+
+
+def _write_npy(raw_path, path, dtype):
+    """Wrap a file of raw column values in a .npy header, streaming the data across"""
+    dtype = np.dtype(dtype)
+    with open(raw_path, 'rb') as raw, open(path, 'wb') as file:
+        np.lib.format.write_array_header_1_0(file, {
+            "descr": np.lib.format.dtype_to_descr(dtype),
+            "fortran_order": False,
+            "shape": (os.path.getsize(raw_path) // dtype.itemsize,)
+        })
+        shutil.copyfileobj(raw, file)
+    os.remove(raw_path)
+
+
+def build_event_store(data_dir=DATA_DIR, directory=EVENT_STORE_DIR):
+    """
+    Ingest every data/candidateN.json into a fresh columnar store.
+
+    Each log is streamed from disk with `log_reader.iter_activity_log`,
+    normalized in batches (the same defaults as `main.load_activity_log`)
+    and its codes are remapped onto store-wide vocabularies, so reading from
+    the store is a drop-in replacement for parsing the JSON. Batches are
+    appended to the column files as they are parsed, so memory does not
+    grow with the log length. The store is written to a temporary directory
+    and swapped in at the end.
+    """
+    candidate_paths = []
+    for path in glob.glob(os.path.join(data_dir, "candidate*.json")):
+        match = re.fullmatch(r"candidate(\d+)\.json", os.path.basename(path))
+        if match:
+            candidate_paths.append((int(match.group(1)), path))
+    candidate_paths.sort()
+
+    tmp_dir = directory.rstrip("/") + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    raw_paths = {name: os.path.join(tmp_dir, f"{name}.raw") for name in COLUMNS}
+    columns = {name: open(raw_paths[name], 'wb') for name in COLUMNS}
+
+    offsets = [0]
+    activities, activity_index = [], {}
+    sources, source_index = [], {}
+    files = {}
+
+    for candidate_id, path in candidate_paths:
+        try:
+            stat = os.stat(path)
+            n_events = 0
+            for batch in iter_event_batches(iter_activity_log(path)):
+                columns["seconds"].write(batch.seconds.astype(np.int32).tobytes())
+                columns["activity"].write(remap_codes(batch.activity, batch.activities, activities, activity_index, np.int16).tobytes())
+                columns["count"].write(batch.count.astype(np.int32).tobytes())
+                columns["source"].write(remap_codes(batch.source, batch.sources, sources, source_index, np.int8).tobytes())
+                n_events += len(batch)
+        except Exception as e:
+            print(f"Skipping candidate {candidate_id} in event store: {e}")
+            # Drop the batches already written for this candidate
+            for name, file in columns.items():
+                file.seek(offsets[-1] * np.dtype(COLUMN_DTYPES[name]).itemsize)
+                file.truncate()
+            continue
+
+        offsets.append(offsets[-1] + n_events)
+        files[str(candidate_id)] = {
+            "index": len(offsets) - 2,
+            "path": path,
+            "mtime_ns": stat.st_mtime_ns,
+            "size": stat.st_size
+        }
+
+    for name, file in columns.items():
+        file.close()
+        _write_npy(raw_paths[name], os.path.join(tmp_dir, f"{name}.npy"), COLUMN_DTYPES[name])
+    np.save(os.path.join(tmp_dir, "offsets.npy"), np.array(offsets, dtype=np.int64))
+    with open(os.path.join(tmp_dir, "meta.json"), 'w') as file:
+        json.dump({
+            "version": STORE_FORMAT_VERSION,
+            "activities": activities,
+            "sources": sources,
+            "candidates": files
+        }, file)
+
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+    return len(files), offsets[-1]
+
+
+class EventStore:
+    """Read-only, memory-mapped view of a store built by `build_event_store`"""
+
+    def __init__(self, directory=EVENT_STORE_DIR):
+        self.directory = directory
+        with open(os.path.join(directory, "meta.json"), 'r') as file:
+            meta = json.load(file)
+        if meta.get("version") != STORE_FORMAT_VERSION:
+            raise ValueError(f"Unsupported event store version {meta.get('version')}")
+        self.activities = meta["activities"]
+        self.sources = meta["sources"]
+        self.candidates = meta["candidates"]
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"))
+        self.columns = {name: self._load_column(name) for name in COLUMNS}
+
+    def _load_column(self, name):
+        path = os.path.join(self.directory, f"{name}.npy")
+        try:
+            return np.load(path, mmap_mode="r")
+        except ValueError:
+            # An empty column can't be memory-mapped
+            return np.load(path)
+
+    def __contains__(self, candidate_id):
+        return str(candidate_id) in self.candidates
+
+    def is_fresh(self, candidate_id):
+        """True when the source JSON hasn't changed since it was ingested"""
+        entry = self.candidates.get(str(candidate_id))
+        if entry is None:
+            return False
+        try:
+            stat = os.stat(entry["path"])
+        except OSError:
+            return False
+        return stat.st_mtime_ns == entry["mtime_ns"] and stat.st_size == entry["size"]
+
+    def events(self, candidate_id):
+        """Slice one candidate's rows out of the memory-mapped columns"""
+        index = self.candidates[str(candidate_id)]["index"]
+        start, end = int(self.offsets[index]), int(self.offsets[index + 1])
+        return CandidateEvents(
+            seconds=self.columns["seconds"][start:end],
+            activity=self.columns["activity"][start:end],
+            count=self.columns["count"][start:end],
+            source=self.columns["source"][start:end],
+            activities=self.activities,
+            sources=self.sources
+        )
+
+
+_store = None
+_store_mtime = None
+
+def open_event_store(directory=EVENT_STORE_DIR):
+    """Return the process-wide store, reopening it if it was rebuilt; None if absent"""
+    global _store, _store_mtime
+    try:
+        mtime = os.stat(os.path.join(directory, "meta.json")).st_mtime_ns
+    except OSError:
+        return None
+    if _store is None or _store.directory != directory or _store_mtime != mtime:
+        try:
+            _store = EventStore(directory)
+            _store_mtime = mtime
+        except Exception as e:
+            print(f"Error opening event store {directory}: {e}")
+            return None
+    return _store
+
+
+def load_candidate_events(candidate_id, directory=EVENT_STORE_DIR):
+    """Zero-copy events for a candidate, or None if the store is missing or stale"""
+    store = open_event_store(directory)
+    if store is None or not store.is_fresh(candidate_id):
+        return None
+    return store.events(candidate_id)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Ingest activity logs into the columnar event store")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--output", default=EVENT_STORE_DIR)
+    args = parser.parse_args()
+
+    n_candidates, n_events = build_event_store(args.data_dir, args.output)
+    print(f"Ingested {n_events} events for {n_candidates} candidates into {args.output}")
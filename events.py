@@ -0,0 +1,234 @@
+"""
+Canonical event normalization shared by every analyzer, the event store
+and the dashboard.
+
+A log (list of event dicts) is normalized in one pass into a structured
+NumPy array of EVENT_DTYPE, 11 bytes per event instead of a dict:
+
+    seconds   int32  timestamp in video, MISSING_SECONDS when NaN/unparseable
+    count     int32  event count
+    activity  int16  code into `activities` (first appearance order)
+    source    int8   code into `sources` ("Video Proctoring", ...)
+
+Field defaults follow `main.load_activity_log`. The timestamp is read from
+"timeStampInVideo", falling back to the "timestampInVideo" spelling some
+exports use, and every timestamp of a log is parsed at once. Streamed logs
+(any iterator of event dicts, e.g. `log_reader.iter_activity_log`) are
+normalized EVENT_BATCH_SIZE events at a time, so only one batch of dicts
+is alive at any point.
+"""
+from typing import List, NamedTuple
+
+import numpy as np
+
+MISSING_SECONDS = np.iinfo(np.int32).min
+
+EVENT_DTYPE = np.dtype([
+    ("seconds", np.int32),
+    ("count", np.int32),
+    ("activity", np.int16),
+    ("source", np.int8),
+])
+
+DEFAULT_TIMESTAMP = "00:00:00"
+DEFAULT_ACTIVITY = "Unknown"
+DEFAULT_SOURCE = "Extension Proctoring"
+
+EVENT_BATCH_SIZE = 8192  # event dicts normalized at once from a stream
+
+
+class CandidateEvents(NamedTuple):
+    """Columns of one candidate's events, from normalize_events or the event store"""
+    seconds: np.ndarray
+    activity: np.ndarray
+    count: np.ndarray
+    source: np.ndarray
+    activities: List[str]
+    sources: List[str]
+
+    def __len__(self):
+        return len(self.seconds)
+
+    def slice(self, rows):
+        """The events at `rows` (a slice or an index array), same vocabularies"""
+        # Not _replace: it checks len(), which counts events here
+        return CandidateEvents(
+            self.seconds[rows], self.activity[rows], self.count[rows], self.source[rows],
+            self.activities, self.sources
+        )
+
+    def to_records(self):
+        """Materialize the events in the same shape `load_activity_log` returns"""
+        timestamps = [
+            "NaN:NaN:NaN" if sec == MISSING_SECONDS else f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+            for sec in self.seconds.tolist()
+        ]
+        activities = self.activities
+        sources = self.sources
+        return [
+            {
+                "type": sources[source],
+                "timeStampInVideo": ts,
+                "activityDescription": activities[activity],
+                "count": count
+            }
+            for ts, activity, count, source in zip(
+                timestamps, self.activity.tolist(), self.count.tolist(), self.source.tolist()
+            )
+        ]
+
+
+def parse_seconds(ts):
+    """Parse "HH:MM:SS" into seconds, or MISSING_SECONDS if it can't be parsed"""
+    try:
+        h, m, s = map(int, ts.split(":"))
+        return h * 3600 + m * 60 + s
+    except Exception:
+        return MISSING_SECONDS
+
+
+def parse_timestamps(timestamps):
+    """
+    Vectorized `parse_seconds` over a sequence of timestamp strings.
+
+    Well-formed "HH:MM:SS" values are decoded straight from the string
+    buffer's code points; anything else falls back to `parse_seconds`.
+    """
+    values = np.asarray(timestamps, dtype=str)
+    n = len(values)
+    seconds = np.full(n, MISSING_SECONDS, dtype=np.int32)
+    if n == 0:
+        return seconds
+
+    width = values.dtype.itemsize // 4
+    fast = np.zeros(n, dtype=bool)
+    if width >= 8:
+        chars = values.view(np.uint32).reshape(n, width).astype(np.int32)
+        digits = chars[:, [0, 1, 3, 4, 6, 7]] - ord("0")
+        fast = (
+            (chars[:, 2] == ord(":"))
+            & (chars[:, 5] == ord(":"))
+            & ((digits >= 0) & (digits <= 9)).all(axis=1)
+        )
+        if width > 8:
+            fast &= (chars[:, 8:] == 0).all(axis=1)
+        seconds[fast] = (
+            (digits[fast, 0] * 10 + digits[fast, 1]) * 3600
+            + (digits[fast, 2] * 10 + digits[fast, 3]) * 60
+            + digits[fast, 4] * 10 + digits[fast, 5]
+        )
+
+    for i in np.flatnonzero(~fast):
+        seconds[i] = parse_seconds(str(values[i]))
+    return seconds
+
+
+def event_timestamp(entry):
+    """Raw timestamp string of an event dict, whichever key spelling it uses"""
+    if "timeStampInVideo" in entry:
+        return entry["timeStampInVideo"]
+    return entry.get("timestampInVideo", DEFAULT_TIMESTAMP)
+
+
+def event_seconds(entry):
+    """Seconds of a single event dict (MISSING_SECONDS when unparseable), for streaming use"""
+    return parse_seconds(event_timestamp(entry))
+
+
+def normalize_entry(entry):
+    """One event dict with every field present, as `main.load_activity_log` returns it"""
+    return {
+        "type": entry.get("type", DEFAULT_SOURCE),
+        "timeStampInVideo": event_timestamp(entry),
+        "activityDescription": entry.get("activityDescription", DEFAULT_ACTIVITY),
+        "count": entry.get("count", 1)
+    }
+
+
+def _codes(values):
+    """Intern `values` in order of first appearance: (codes, vocabulary)"""
+    vocabulary = list(dict.fromkeys(values))
+    index = {value: code for code, value in enumerate(vocabulary)}
+    return [index[value] for value in values], vocabulary
+
+
+def remap_codes(codes, values, vocabulary, index, dtype):
+    """
+    Map `codes` (into `values`) onto a shared vocabulary.
+
+    Values not in `vocabulary` yet are appended to it, and to its
+    value -> code `index`, in order.
+    """
+    mapping = []
+    for value in values:
+        code = index.get(value)
+        if code is None:
+            code = index[value] = len(vocabulary)
+            vocabulary.append(value)
+        mapping.append(code)
+    return np.array(mapping, dtype=dtype)[np.asarray(codes, dtype=np.int64)]
+
+
+def iter_event_batches(entries, batch_size=EVENT_BATCH_SIZE):
+    """Normalize an iterable of event dicts into CandidateEvents of at most `batch_size` events"""
+    batch = []
+    for entry in entries:
+        batch.append(entry)
+        if len(batch) == batch_size:
+            yield _normalize_batch(batch)
+            batch = []
+    if batch:
+        yield _normalize_batch(batch)
+
+
+def concat_events(batches):
+    """Join CandidateEvents into one, with vocabularies in order of first appearance"""
+    activities, activity_index = [], {}
+    sources, source_index = [], {}
+    parts = []
+    for batch in batches:
+        part = np.empty(len(batch), dtype=EVENT_DTYPE)
+        part["seconds"] = batch.seconds
+        part["count"] = batch.count
+        part["activity"] = remap_codes(batch.activity, batch.activities, activities, activity_index, np.int16)
+        part["source"] = remap_codes(batch.source, batch.sources, sources, source_index, np.int8)
+        parts.append(part)
+    events = np.concatenate(parts) if parts else np.empty(0, dtype=EVENT_DTYPE)
+    return _events(events, activities, sources)
+
+
+def normalize_events(activity_log):
+    """
+    Normalize a log into CandidateEvents backed by one EVENT_DTYPE array.
+
+    CandidateEvents (e.g. from the event store) are returned unchanged; an
+    iterator of event dicts is consumed in batches.
+    """
+    if isinstance(activity_log, CandidateEvents):
+        return activity_log
+    if not isinstance(activity_log, (list, tuple)):
+        return concat_events(iter_event_batches(activity_log))
+    return _normalize_batch(activity_log)
+
+
+def _events(events, activities, sources):
+    return CandidateEvents(
+        seconds=events["seconds"],
+        activity=events["activity"],
+        count=events["count"],
+        source=events["source"],
+        activities=activities,
+        sources=sources
+    )
+
+
+def _normalize_batch(activity_log):
+    activity, activities = _codes([entry.get("activityDescription", DEFAULT_ACTIVITY) for entry in activity_log])
+    source, sources = _codes([entry.get("type", DEFAULT_SOURCE) for entry in activity_log])
+
+    events = np.empty(len(activity_log), dtype=EVENT_DTYPE)
+    events["seconds"] = parse_timestamps([event_timestamp(entry) for entry in activity_log])
+    events["count"] = [entry.get("count", 1) for entry in activity_log]
+    events["activity"] = activity
+    events["source"] = source
+    return _events(events, activities, sources)
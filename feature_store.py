@@ -0,0 +1,289 @@
+"""
+Derived per-candidate features, computed once and shared by every analyzer.
+
+`candidate_features(activity_log)` parses a log into arrays (seconds,
+interned activity codes, counts) plus the aggregates the analyzers and the
+dashboard need: intervals between consecutive events, totals per
+activity, totals per exam phase and a per-minute histogram. Results are
+keyed by a hash of the log content and cached in an in-memory LRU backed
+by flat files under .feature_cache/, so a log is parsed once per content
+no matter how many analyzers (or runs) read it. The files are evicted
+least recently used first once they pass FEATURE_CACHE_MAX_BYTES, and
+dropped after FEATURE_CACHE_MAX_AGE seconds without a read.
+"""
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+from typing import List, NamedTuple
+
+import numpy as np
+from dotenv import load_dotenv
+
+from events import MISSING_SECONDS, CandidateEvents, normalize_events
+from util import atomic_write
+
+load_dotenv()
+
+FEATURE_CACHE_DIR = os.getenv("FEATURE_CACHE_DIR", ".feature_cache")  # empty disables the disk cache
+FEATURE_CACHE_SIZE = int(os.getenv("FEATURE_CACHE_SIZE", "256"))  # candidates kept in memory
+FEATURE_CACHE_MAX_BYTES = int(os.getenv("FEATURE_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+FEATURE_CACHE_MAX_AGE = float(os.getenv("FEATURE_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # seconds since last read
+
+# Bump when the features below change so cached files are ignored
+FEATURE_STORE_VERSION = 2
+
+# Exam phases of `phase_totals`; the last phase is the final 300 seconds
+PHASES = ("first_300s", "middle", "last_300s", "unknown_time")
+
+ARRAYS = ("seconds", "activity", "count", "intervals", "activity_totals", "phase_totals", "minute_histogram")
+
+
+class CandidateFeatures(NamedTuple):
+    """Parsed arrays and aggregates of one activity log"""
+    sha256: str
+    seconds: np.ndarray           # int32 per event, MISSING_SECONDS when unparseable
+    activity: np.ndarray          # int32 per event, code into `activities`
+    count: np.ndarray             # int64 per event
+    activities: List[str]         # descriptions in order of first appearance
+    intervals: np.ndarray         # seconds between consecutive events with valid timestamps
+    activity_totals: np.ndarray   # summed count per activity
+    phase_totals: np.ndarray      # summed count per PHASES entry
+    minute_histogram: np.ndarray  # summed count per (activity, exam minute)
+
+    def __len__(self):
+        return len(self.seconds)
+
+    def activity_counts(self):
+        """{description: total count}, like format_activity_log's activity_counts"""
+        return dict(zip(self.activities, self.activity_totals.tolist()))
+
+    def phase_counts(self):
+        return dict(zip(PHASES, self.phase_totals.tolist()))
+
+
+def log_sha256(activity_log):
+    """Content hash of a log, for records or an event store slice"""
+    digest = hashlib.sha256()
+    if isinstance(activity_log, CandidateEvents):
+        digest.update(b"events")
+        used = np.unique(np.asarray(activity_log.activity))
+        digest.update(json.dumps([activity_log.activities[code] for code in used.tolist()]).encode("utf-8"))
+        for column in (activity_log.seconds, activity_log.activity, activity_log.count):
+            digest.update(np.ascontiguousarray(column).tobytes())
+    else:
+        digest.update(b"records")
+        digest.update(json.dumps(activity_log, separators=(",", ":")).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def compute_features(activity_log, sha256=None):
+    """Parse a log into CandidateFeatures; no caching"""
+    events = normalize_events(activity_log)
+    seconds = np.asarray(events.seconds, dtype=np.int32)
+    count = np.asarray(events.count, dtype=np.int64)
+    # Re-intern the codes in order of first appearance (store codes are global)
+    codes, first, inverse = np.unique(np.asarray(events.activity), return_index=True, return_inverse=True)
+    order = np.argsort(first)
+    rank = np.empty(len(order), dtype=np.int32)
+    rank[order] = np.arange(len(order), dtype=np.int32)
+    activity = rank[inverse].astype(np.int32)
+    activities = [events.activities[code] for code in codes[order].tolist()]
+
+    valid = seconds != MISSING_SECONDS
+    both_valid = valid[1:] & valid[:-1]
+    intervals = (seconds[1:].astype(np.int64) - seconds[:-1])[both_valid]
+
+    activity_totals = np.bincount(activity, weights=count, minlength=len(activities)).astype(np.int64)
+
+    phase = np.full(len(seconds), 3, dtype=np.int64)
+    minute_histogram = np.zeros((len(activities), 0), dtype=np.int64)
+    if valid.any():
+        valid_seconds = seconds[valid]
+        end = int(valid_seconds.max())
+        phase[valid] = np.where(valid_seconds < 300, 0, np.where(valid_seconds >= end - 300, 2, 1))
+        minutes = np.maximum(valid_seconds, 0) // 60
+        minute_histogram = np.zeros((len(activities), int(minutes.max()) + 1), dtype=np.int64)
+        np.add.at(minute_histogram, (activity[valid], minutes), count[valid])
+    phase_totals = np.bincount(phase, weights=count, minlength=len(PHASES)).astype(np.int64)
+
+    return CandidateFeatures(
+        sha256=sha256 or log_sha256(activity_log),
+        seconds=seconds,
+        activity=activity,
+        count=count,
+        activities=activities,
+        intervals=intervals,
+        activity_totals=activity_totals,
+        phase_totals=phase_totals,
+        minute_histogram=minute_histogram
+    )
+
+
+class FeatureStore:
+    """
+    Content-addressed cache of CandidateFeatures.
+
+    Lookups hit an in-memory LRU of `max_entries` candidates first, then
+    the files in `directory` (when set); misses are computed and written
+    to both. A file is one JSON header line (version, activities, array
+    shapes) followed by the arrays as raw int64, read back in one go.
+    A read refreshes the file's mtime, so eviction (past `max_bytes`, or
+    unread for `max_age` seconds) drops the least recently used first.
+    """
+
+    def __init__(self, directory=FEATURE_CACHE_DIR, max_entries=FEATURE_CACHE_SIZE,
+                 max_bytes=FEATURE_CACHE_MAX_BYTES, max_age=FEATURE_CACHE_MAX_AGE):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.memory = OrderedDict()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = None  # bytes on disk, computed lazily on first write
+
+    def _path(self, sha256):
+        return os.path.join(self.directory, sha256[:2], f"{sha256}.features")
+
+    def _read(self, sha256):
+        path = self._path(sha256)
+        try:
+            with open(path, "rb") as file:
+                header = json.loads(file.readline())
+                if header.get("version") != FEATURE_STORE_VERSION:
+                    return None
+                data = np.frombuffer(file.read(), dtype=np.int64)
+            os.utime(path)
+        except (OSError, ValueError):
+            return None
+
+        arrays = {}
+        offset = 0
+        for name in ARRAYS:
+            shape = header["shapes"][name]
+            size = int(np.prod(shape))
+            arrays[name] = data[offset:offset + size].reshape(shape)
+            offset += size
+        # Narrow columns are stored widened; restore their dtypes
+        arrays["seconds"] = arrays["seconds"].astype(np.int32)
+        arrays["activity"] = arrays["activity"].astype(np.int32)
+        return CandidateFeatures(sha256=sha256, activities=header["activities"], **arrays)
+
+    def _write(self, features):
+        path = self._path(features.sha256)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with atomic_write(path, "wb") as file:
+                header = {
+                    "version": FEATURE_STORE_VERSION,
+                    "activities": features.activities,
+                    "shapes": {name: list(getattr(features, name).shape) for name in ARRAYS}
+                }
+                file.write(json.dumps(header).encode("utf-8") + b"\n")
+                for name in ARRAYS:
+                    file.write(np.ascontiguousarray(getattr(features, name), dtype=np.int64).tobytes())
+        except OSError as e:
+            print(f"Error writing feature cache entry {features.sha256}: {e}")
+            return
+
+        if self._size is None:
+            # First write of this process: also sweeps files unread for max_age
+            self.evict()
+        else:
+            self._size += os.path.getsize(path)
+            if self._size > self.max_bytes:
+                self.evict()
+
+    def _entries(self):
+        entries = []
+        if not self.directory or not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self.evictions += 1
+        if self._size is not None:
+            self._size -= size
+        # Drop the shard directory once it is empty
+        try:
+            os.rmdir(os.path.dirname(path))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop files unread for max_age, then the least recently used until under max_bytes"""
+        now = time.time()
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        for mtime, path, size in entries:
+            if now - mtime > self.max_age or self._size > self.max_bytes:
+                self._remove(path)
+            else:
+                break
+
+    def _remember(self, features):
+        self.memory[features.sha256] = features
+        self.memory.move_to_end(features.sha256)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+
+    def get(self, activity_log):
+        """Features of a log (records, a stream of records or CandidateEvents), computing them at most once"""
+        if isinstance(activity_log, CandidateFeatures):
+            return activity_log
+        if not isinstance(activity_log, (list, tuple, CandidateEvents)):
+            # A stream can only be read once: normalize it before hashing
+            activity_log = normalize_events(activity_log)
+        sha256 = log_sha256(activity_log)
+
+        features = self.memory.get(sha256)
+        if features is not None:
+            self.memory_hits += 1
+            self.memory.move_to_end(sha256)
+            return features
+
+        features = self._read(sha256) if self.directory else None
+        if features is not None:
+            self.disk_hits += 1
+        else:
+            self.misses += 1
+            features = compute_features(activity_log, sha256)
+            if self.directory:
+                self._write(features)
+        self._remember(features)
+        return features
+
+    def stats(self):
+        return {
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "in_memory": len(self.memory)
+        }
+
+
+# Shared store used by main_output and the dashboard
+FEATURE_STORE = FeatureStore()
+
+
+def candidate_features(activity_log):
+    """Cached CandidateFeatures for a log; passes CandidateFeatures through"""
+    return FEATURE_STORE.get(activity_log)
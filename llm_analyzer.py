@@ -3,9 +3,92 @@ import glob
 import json
 import os
 from fastapi import HTTPException
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, NamedTuple, Optional, Tuple
 
-from llm_tool import google_chat_completions, groq_chat_completions, mistral_chat_completions
+from events import MISSING_SECONDS, CandidateEvents
+from feature_store import CandidateFeatures, candidate_features, compute_features
+from llm_tool import (
+    CONTEXT_LIMITS,
+    RESPONSE_TOKEN_ESTIMATE,
+    estimate_tokens,
+    google_chat_completions,
+    groq_chat_completions,
+    mistral_chat_completions
+)
+from util import get_score_status
+
+# Bump when the input/synthesis prompts change (the system prompt is hashed separately)
+PROMPT_VERSION = "2"
+
+# "full" embeds the raw JSON log; "compact" uses encode_compact_log
+PROMPT_MODE = os.getenv("LLM_PROMPT_MODE", "full")
+
+# Providers queried for every log (or every window of a long log)
+ANALYSIS_PROVIDERS = {
+    "google": google_chat_completions,
+    # "groq": groq_chat_completions,
+    "mistral": mistral_chat_completions,
+}
+
+# Faster secondary model per provider, raced against a primary that is slow to answer
+HEDGE_PROVIDERS = {
+    "google": (mistral_chat_completions, "mistral-small-latest"),
+    "mistral": (google_chat_completions, "gemini-2.0-flash"),
+}
+
+# Latency controls (seconds). The whole LLM analysis of a candidate, synthesis
+# included, finishes within LLM_CANDIDATE_BUDGET (per window for logs analyzed
+# in windows).
+CANDIDATE_BUDGET = float(os.getenv("LLM_CANDIDATE_BUDGET", "120"))
+CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
+SYNTHESIS_TIMEOUT = float(os.getenv("LLM_SYNTHESIS_TIMEOUT", "30"))
+HEDGE_AFTER = float(os.getenv("LLM_HEDGE_AFTER", "20"))  # 0 disables hedging
+# Stop waiting once this many valid responses arrived (0 = all providers)
+MIN_RESPONSES = int(os.getenv("LLM_MIN_RESPONSES", "0"))
+
+# When the models already agree the synthesis call is skipped and the result is
+# built locally. Policies: "spread" (scores within LLM_CONSENSUS_SPREAD points),
+# "band" (same util.get_score_status risk band), "both", or "off".
+CONSENSUS_POLICY = os.getenv("LLM_CONSENSUS_POLICY", "both")
+CONSENSUS_SPREAD = int(os.getenv("LLM_CONSENSUS_SPREAD", "10"))
+
+# How each candidate's responses were combined in this process
+SYNTHESIS_STATS = {"consensus": 0, "synthesized": 0, "fallback": 0, "no_response": 0}
+
+# Optional cap on system + input prompt tokens; logs above it are analyzed in windows
+MAX_PROMPT_TOKENS = int(os.getenv("LLM_MAX_PROMPT_TOKENS", "0"))
+WINDOW_CONCURRENCY = int(os.getenv("LLM_WINDOW_CONCURRENCY", "4"))
+
+# Multi-candidate requests: cap on the packed input prompt (system prompt excluded)
+BATCH_TOKEN_BUDGET = int(os.getenv("LLM_BATCH_TOKEN_BUDGET", "8000"))
+
+# How batched requests went in this process
+BATCH_STATS = {"requests": 0, "candidates": 0, "single_fallbacks": 0}
+
+# Kept verbatim with timestamps in compact prompts
+HIGH_SUSPICION_ACTIVITIES = {
+    "Browser window swapped",
+    "Cell phone detected",
+    "Copy",
+    "Cut",
+    "Paste",
+    "Tab change detected",
+    "Window change detected",
+    "Laptop detected",
+    "No face detected",
+}
+
+# Bucketed per minute in compact prompts
+LOW_SUSPICION_ACTIVITIES = {
+    "Candidate looking right",
+    "Candidate looking down",
+    "Candidate looking up",
+    "Candidate iris looking left",
+    "Candidate iris looking right",
+}
+
+# Upper bounds (seconds) of the interval histogram buckets in compact prompts
+INTERVAL_BUCKETS = [0, 5, 30, 60, 300]
 
 def create_system_prompt():
     return """
@@ -92,56 +175,137 @@ Scoring Guidelines:
 Focus on identifying patterns that clearly deviate from normal test-taking behavior while accounting for natural human behaviors and time-based contexts.
 """
 
-def format_activity_log(activity_log):
-    """Format the activity log for better analysis by including derived metrics"""
-    # Convert timestamps to seconds for temporal analysis
-    events_with_seconds = []
-    for entry in activity_log:
-        ts = entry.get("timeStampInVideo", "")
-        desc = entry.get("activityDescription", "")
-        count = entry.get("count", 1)
-        
-        seconds = None
-        if ts != "NaN:NaN:NaN" and ":" in ts:
-            try:
-                h, m, s = map(int, ts.split(":"))
-                seconds = h*3600 + m*60 + s
-            except:
-                pass
-                
-        events_with_seconds.append({
-            "timestamp": ts,
-            "seconds": seconds,
-            "description": desc,
+def format_activity_log(activity_log, features=None):
+    """
+    Format the activity log for better analysis by including derived metrics
+
+    Timestamps, intervals and activity counts come from the shared feature
+    store; pass `features` when they were already looked up, or computed
+    with `compute_features` for a part of a log (a window or batch section)
+    that shouldn't take a place in the store.
+    """
+    features = features or candidate_features(activity_log)
+
+    # Seconds per event from the parsed timestamps (None when unparseable)
+    activities = features.activities
+    events_with_seconds = [
+        {
+            "timestamp": entry.get("timeStampInVideo", ""),
+            "seconds": None if seconds == MISSING_SECONDS else seconds,
+            "description": activities[activity],
             "count": count
-        })
-    
-    # Calculate time intervals between events
-    intervals = []
-    for i in range(1, len(events_with_seconds)):
-        if events_with_seconds[i]["seconds"] is not None and events_with_seconds[i-1]["seconds"] is not None:
-            interval = events_with_seconds[i]["seconds"] - events_with_seconds[i-1]["seconds"]
-            intervals.append(interval)
-    
-    # Count activity types
-    activity_counts = {}
-    for event in activity_log:
-        desc = event.get("activityDescription", "")
-        count = event.get("count", 1)
-        if desc in activity_counts:
-            activity_counts[desc] += count
-        else:
-            activity_counts[desc] = count
-    
+        }
+        for entry, seconds, activity, count in zip(
+            activity_log, features.seconds.tolist(), features.activity.tolist(), features.count.tolist()
+        )
+    ]
+
     return {
         "raw_log": activity_log,
         "events_with_seconds": events_with_seconds,
-        "intervals": intervals,
-        "activity_counts": activity_counts
+        "intervals": features.intervals.tolist(),
+        "activity_counts": features.activity_counts()
     }
 
-def create_input_prompt(formatted_log):
-    """Creates a detailed prompt for the LLM analysis"""
+def _format_seconds(seconds):
+    if seconds is None:
+        return "NaN:NaN:NaN"
+    return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+
+def interval_histogram(intervals):
+    """Summarize inter-event intervals as counts per INTERVAL_BUCKETS range"""
+    labels = []
+    for i, upper in enumerate(INTERVAL_BUCKETS):
+        lower = INTERVAL_BUCKETS[i - 1] + 1 if i else None
+        labels.append(f"{lower}-{upper}s" if lower is not None else f"<={upper}s")
+    labels.append(f">{INTERVAL_BUCKETS[-1]}s")
+
+    histogram = dict.fromkeys(labels, 0)
+    for interval in intervals:
+        for label, upper in zip(labels, INTERVAL_BUCKETS):
+            if interval <= upper:
+                histogram[label] += 1
+                break
+        else:
+            histogram[labels[-1]] += 1
+    return histogram
+
+def encode_compact_log(formatted_log):
+    """
+    Token-efficient text encoding of a formatted activity log.
+
+    - High-suspicion events are kept verbatim with their timestamps; exact
+      repeats at the same second are merged into one line with a total count.
+    - Other non-gaze events are run-length collapsed into
+      "start-end description xTOTAL (N entries)" lines.
+    - Low-suspicion gaze events are bucketed per minute.
+    """
+    lines = []
+    run = None  # [start, end, description, total count, entries]
+
+    def flush():
+        if run is None:
+            return
+        start, end, desc, total, entries = run
+        if entries == 1:
+            lines.append(f"{_format_seconds(start)} {desc} x{total}")
+        else:
+            lines.append(f"{_format_seconds(start)}-{_format_seconds(end)} {desc} x{total} ({entries} entries)")
+
+    gaze_per_minute = {}
+    for event in formatted_log["events_with_seconds"]:
+        desc = event["description"]
+        seconds = event["seconds"]
+        count = event["count"]
+
+        if desc in LOW_SUSPICION_ACTIVITIES:
+            minute = "?" if seconds is None else seconds // 60
+            bucket = gaze_per_minute.setdefault(minute, {})
+            short = desc.replace("Candidate ", "")
+            bucket[short] = bucket.get(short, 0) + count
+            continue
+
+        high = desc in HIGH_SUSPICION_ACTIVITIES
+        if run is not None and run[2] == desc and (not high or run[1] == seconds):
+            run[1] = seconds
+            run[3] += count
+            run[4] += 1
+            continue
+        flush()
+        run = [seconds, seconds, desc, count, 1]
+    flush()
+
+    gaze_lines = []
+    for minute, bucket in gaze_per_minute.items():
+        counts = ", ".join(f"{name} {total}" for name, total in bucket.items())
+        gaze_lines.append(f"m{minute}: {counts}")
+
+    return (
+        "Suspicious/other events (HH:MM:SS description xCOUNT):\n"
+        + ("\n".join(lines) or "none")
+        + "\n\nGaze events per exam minute (m<minute>: activity count):\n"
+        + ("\n".join(gaze_lines) or "none")
+    )
+
+# Closing instructions of every single-candidate input prompt
+ANALYSIS_INSTRUCTIONS = """Based on the log content and these statistics, determine the likelihood of cheating.
+Consider the number, timing, and patterns of window changes and focus changes, paying particular attention to activity *outside* the first 300 seconds (5 minutes) and the last 300 seconds of the exam.
+Remember that "looking right" is generally normal behavior and should only be considered suspicious if combined with other indicators.
+Return your analysis in the required JSON format with 'score' and 'analysis' fields.
+"""
+
+def create_input_prompt(formatted_log, compact=None):
+    """
+    Creates a detailed prompt for the LLM analysis
+
+    With `compact` (default: LLM_PROMPT_MODE == "compact") the raw JSON log and
+    the full interval list are replaced by `encode_compact_log` and a histogram.
+    """
+    if compact is None:
+        compact = PROMPT_MODE == "compact"
+    if compact:
+        return create_compact_input_prompt(formatted_log)
+
     raw_log = json.dumps(formatted_log["raw_log"], indent=2)
     
     # Calculate statistics
@@ -160,33 +324,184 @@ Statistics:
 - Time intervals between events (seconds): {formatted_log["intervals"]}
 - Average interval: {avg_interval:.1f} seconds
 
-Based on the log content and these statistics, determine the likelihood of cheating.
-Consider the number, timing, and patterns of window changes and focus changes, paying particular attention to activity *outside* the first 300 seconds (5 minutes) and the last 300 seconds of the exam.
-Remember that "looking right" is generally normal behavior and should only be considered suspicious if combined with other indicators.
-Return your analysis in the required JSON format with 'score' and 'analysis' fields.
-"""
+{ANALYSIS_INSTRUCTIONS}"""
+
+def create_compact_input_prompt(formatted_log):
+    """Compact counterpart of `create_input_prompt`"""
+    total_events = sum(formatted_log["activity_counts"].values())
+    intervals = formatted_log["intervals"]
+    avg_interval = sum(intervals) / len(intervals) if intervals else 0
+    histogram = ", ".join(f"{label}: {n}" for label, n in interval_histogram(intervals).items())
+
+    return f"""
+Please analyze this proctoring activity log to detect potential cheating.
+High-suspicion events are listed individually; repeated events are collapsed and normal gaze events are counted per minute.
+
+{encode_compact_log(formatted_log)}
+
+Statistics:
+- Total events: {total_events}
+- Activity counts: {formatted_log["activity_counts"]}
+- Time intervals between events (histogram): {histogram}
+- Average interval: {avg_interval:.1f} seconds
+
+{ANALYSIS_INSTRUCTIONS}"""
+
+def _parse_response(response):
+    """Parsed {"score", "analysis"} dict from a raw LLM response, or None"""
+    if not isinstance(response, str):
+        return None
+    try:
+        parsed = json.loads(response)
+    except ValueError:
+        return None
+    if isinstance(parsed, dict) and "score" in parsed and "analysis" in parsed:
+        return parsed
+    return None
+
+async def _admitted_call(completion, prompt, system_prompt, admitted, **kwargs):
+    """
+    Run a completion with CALL_TIMEOUT counted from when its provider's rate
+    limiter admits the request (sets `admitted`), not from the call, so time
+    spent queued behind the quota is not mistaken for a slow provider.
+    """
+    call = asyncio.ensure_future(completion(prompt, system_prompt, admitted=admitted, **kwargs))
+    waiter = asyncio.ensure_future(admitted.wait())
+    try:
+        await asyncio.wait({call, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        return await asyncio.wait_for(call, CALL_TIMEOUT)
+    finally:
+        waiter.cancel()
+        call.cancel()
+
+async def _hedged_completion(provider, prompt, system_prompt, validate=_parse_response):
+    """
+    Call a provider with a per-call timeout. If it hasn't answered HEDGE_AFTER
+    seconds after its rate limiter admitted it, race a duplicate request to its
+    secondary model and return the first valid response (per `validate`, which
+    also decides which answers the LLM cache keeps); the loser is cancelled.
+    """
+    admitted = asyncio.Event()
+    primary = asyncio.create_task(
+        _admitted_call(ANALYSIS_PROVIDERS[provider], prompt, system_prompt, admitted, validate=validate)
+    )
+    hedge = HEDGE_PROVIDERS.get(provider)
+    if not hedge or not HEDGE_AFTER or HEDGE_AFTER >= CALL_TIMEOUT:
+        return await primary
+
+    completion, model = hedge
+    tasks = {primary}
+    waiter = asyncio.ensure_future(admitted.wait())
+    last = None
+    try:
+        # The hedge timer starts once the primary has left the rate limiter
+        await asyncio.wait({primary, waiter}, return_when=asyncio.FIRST_COMPLETED)
+        done, _ = await asyncio.wait(tasks, timeout=HEDGE_AFTER)
+        if done:
+            last = primary.exception() or primary.result()
+            if validate(last) is not None:
+                return last
+            tasks = set()
+
+        tasks.add(asyncio.create_task(
+            _admitted_call(completion, prompt, system_prompt, asyncio.Event(), model=model, validate=validate)
+        ))
+        while tasks:
+            done, tasks = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                last = task.exception() or task.result()
+                if validate(last) is not None:
+                    return last
+    finally:
+        # Also reached when the caller cancels us (deadline or early exit)
+        waiter.cancel()
+        for task in tasks:
+            task.cancel()
+    if isinstance(last, BaseException):
+        raise last
+    return last
+
+async def _fan_out(prompt, system_prompt, deadline, validate=_parse_response):
+    """
+    Query every analysis provider concurrently until `deadline` (loop time).
+
+    Returns early, cancelling the stragglers, once MIN_RESPONSES valid
+    responses (per `validate`) arrived. Responses (or exceptions) are returned in provider
+    order, with a TimeoutError for providers that didn't answer in time.
+    """
+    loop = asyncio.get_running_loop()
+    tasks = {
+        asyncio.create_task(_hedged_completion(provider, prompt, system_prompt, validate)): index
+        for index, provider in enumerate(ANALYSIS_PROVIDERS)
+    }
+    needed = MIN_RESPONSES or len(tasks)
+    results = {}
+    valid = 0
+    pending = set(tasks)
+    try:
+        while pending and valid < needed:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            done, pending = await asyncio.wait(pending, timeout=remaining, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                result = task.exception() or task.result()
+                results[tasks[task]] = result
+                if validate(result) is not None:
+                    valid += 1
+    finally:
+        for task in pending:
+            task.cancel()
+    return [
+        results.get(index, asyncio.TimeoutError(f"{provider} did not answer before the deadline"))
+        for index, provider in enumerate(ANALYSIS_PROVIDERS)
+    ]
+
+def responses_agree(scores, policy=None, spread=None):
+    """True when the scores agree closely enough under the consensus policy"""
+    policy = policy or CONSENSUS_POLICY
+    spread = CONSENSUS_SPREAD if spread is None else spread
+    if policy == "off" or len(scores) < 2:
+        return False
+    within_spread = max(scores) - min(scores) <= spread
+    same_band = len({get_score_status(score) for score in scores}) == 1
+    if policy == "spread":
+        return within_spread
+    if policy == "band":
+        return same_band
+    return within_spread and same_band
 
-async def process_llm_responses(responses):
+def synthesis_stats():
+    """Copy of SYNTHESIS_STATS plus the share of synthesis calls saved"""
+    stats = dict(SYNTHESIS_STATS)
+    combined = stats["consensus"] + stats["synthesized"] + stats["fallback"]
+    stats["calls_saved"] = f"{stats['consensus'] / combined:.0%}" if combined else "0%"
+    return stats
+
+async def process_llm_responses(responses, timeout=None):
     """
     Processes responses from multiple LLMs and uses a final LLM call 
     to synthesize the most accurate analysis
+
+    `timeout` bounds the synthesis call; when it expires the local fallback
+    below is used. When the models agree (see `responses_agree`) no
+    synthesis call is made at all. When no model answered, the zero score
+    is marked "degraded" so callers don't store it as a real result.
     """
     valid_responses = []
     
     # Validate and collect responses from all models
     for response in responses:
-        if isinstance(response, str):
-            try:
-                parsed = json.loads(response)
-                if isinstance(parsed, dict) and "score" in parsed and "analysis" in parsed:
-                    valid_responses.append(parsed)
-            except:
-                continue
+        parsed = _parse_response(response)
+        if parsed is not None:
+            valid_responses.append(parsed)
     
     if not valid_responses:
+        SYNTHESIS_STATS["no_response"] += 1
         return {
             "score": 0,
-            "analysis": "Error: Unable to analyze proctoring log with any LLM."
+            "analysis": "Error: Unable to analyze proctoring log with any LLM.",
+            "degraded": True
         }
         
     # for r in valid_responses:
@@ -195,6 +510,15 @@ async def process_llm_responses(responses):
     # Calculate initial average score
     total_score = sum(r["score"] for r in valid_responses)
     avg_score = round(total_score / len(valid_responses))
+
+    # Consensus: use the average and the analysis closest to it
+    if responses_agree([r["score"] for r in valid_responses]):
+        SYNTHESIS_STATS["consensus"] += 1
+        closest = min(valid_responses, key=lambda r: abs(r["score"] - avg_score))
+        return {
+            "score": avg_score,
+            "analysis": closest["analysis"]
+        }
     
     # Format all previous analyses for meta-review
     model_analyses = "\n".join([
@@ -221,6 +545,12 @@ Return ONLY a JSON object with:
 2. "score": A refined final score from 0-100
 """
 
+    # Fallback to highest-score analysis if meta-analysis fails
+    primary_analysis = max(valid_responses, key=lambda x: x["score"])["analysis"]
+    return await _synthesize(final_analysis_prompt, {"score": avg_score, "analysis": primary_analysis}, timeout)
+
+async def _synthesize(final_analysis_prompt, fallback, timeout=None):
+    """Final LLM call combining several analyses; `fallback` is used when it fails or times out"""
     # System prompt for final analysis
     system_prompt = """
 You are a meta-analyzer of AI proctoring assessments. Your task is to synthesize multiple AI analyses 
@@ -232,59 +562,477 @@ Return only a valid JSON with an "analysis" field (1-2 sentences) and a "score"
 
     try:
         # Call the final LLM (using Google's model which excels at synthesis tasks)
-        final_response = await google_chat_completions(
-            input=final_analysis_prompt,
-            system_prompt=system_prompt,
-            model="gemini-2.0-flash-thinking-exp-01-21"
+        final_response = await asyncio.wait_for(
+            google_chat_completions(
+                input=final_analysis_prompt,
+                system_prompt=system_prompt,
+                model="gemini-2.0-flash-thinking-exp-01-21",
+                validate=_parse_response
+            ),
+            timeout
         )
         
         # Parse and return the final synthesized analysis
         final_result = json.loads(final_response)
+        SYNTHESIS_STATS["synthesized"] += 1
         return {
-            "score": final_result.get("score", avg_score),
+            "score": final_result.get("score", fallback["score"]),
             "analysis": final_result.get("analysis", "Unable to generate final analysis")
         }
-    except Exception as e:
-        # Fallback to highest-score analysis if meta-analysis fails
-        primary_analysis = max(valid_responses, key=lambda x: x["score"])["analysis"]
-        return {
-            "score": avg_score,
-            "analysis": primary_analysis
-        }
+    except Exception:
+        SYNTHESIS_STATS["fallback"] += 1
+        return fallback
+
+class LLMPlan(NamedTuple):
+    """Prompts for one log, built by `prepare_llm_analysis` and sent by `run_llm_analysis`"""
+    system_prompt: str
+    prompts: List[str]  # one prompt, or one per window of a long log
+    spans: Optional[List[Tuple[str, str]]]  # first and last timestamp per window; None for a single prompt
+
+def prepare_llm_analysis(
+    activity_log: List[Dict[str, Any]],
+    compact: Optional[bool] = None,
+    features: Optional[CandidateFeatures] = None
+) -> LLMPlan:
+    """
+    The CPU-bound half of `analyze_proctoring_log`: format the log and build
+    its prompt, or one prompt per time window when it is over the token
+    budget. The plan is plain strings, so this can run in a worker process.
+    """
+    # Looked up before materializing, under the same key as main_output's lookup
+    features = features or candidate_features(activity_log)
+
+    # Columnar slices from the event store are materialized only for the prompt
+    if isinstance(activity_log, CandidateEvents):
+        activity_log = activity_log.to_records()
+
+    # Format the activity log for easier analysis
+    formatted_log = format_activity_log(activity_log, features)
+    
+    # Create enhanced system prompt
+    system_prompt = create_system_prompt()
+    
+    # Create the input prompt with formatted log and analysis instructions
+    input_prompt = create_input_prompt(formatted_log, compact=compact)
+
+    # Logs too long for one request are analyzed window by window
+    token_budget = prompt_token_budget()
+    if estimate_tokens(system_prompt) + estimate_tokens(input_prompt) > token_budget:
+        return plan_log_windows(activity_log, token_budget, compact=compact)
+    return LLMPlan(system_prompt, [input_prompt], None)
+
+async def run_llm_analysis(
+    plan: LLMPlan,
+    concurrency: Optional[int] = None,
+    finish_by: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    The network half of `analyze_proctoring_log`: send a plan's prompts to
+    every provider and combine the answers into {"score", "analysis"}.
 
-async def analyze_proctoring_log(activity_log: List[Dict[str, Any]]) -> Dict[str, Any]:
+    A single prompt, synthesis included, finishes within LLM_CANDIDATE_BUDGET
+    (or by `finish_by`, loop time). Window plans are run as described in
+    `analyze_proctoring_log_chunked`.
+    """
+    loop = asyncio.get_running_loop()
+    if plan.spans is None:
+        if finish_by is None:
+            finish_by = loop.time() + CANDIDATE_BUDGET
+
+        # Get predictions from all LLM services concurrently, leaving time for synthesis
+        responses = await _fan_out(plan.prompts[0], plan.system_prompt, finish_by - SYNTHESIS_TIMEOUT)
+
+        # Process valid responses and combine results
+        return await process_llm_responses(
+            responses, timeout=max(0.0, min(SYNTHESIS_TIMEOUT, finish_by - loop.time()))
+        )
+
+    semaphore = asyncio.Semaphore(concurrency or WINDOW_CONCURRENCY)
+
+    async def analyze_window(prompt):
+        async with semaphore:
+            deadline = loop.time() + CANDIDATE_BUDGET - SYNTHESIS_TIMEOUT
+            if finish_by is not None:
+                deadline = min(deadline, finish_by - SYNTHESIS_TIMEOUT)
+            return await _fan_out(prompt, plan.system_prompt, deadline)
+
+    window_responses = await asyncio.gather(*(analyze_window(prompt) for prompt in plan.prompts))
+
+    timeout = SYNTHESIS_TIMEOUT
+    if finish_by is not None:
+        timeout = max(0.0, min(timeout, finish_by - loop.time()))
+    return await reduce_window_responses(plan.spans, window_responses, timeout=timeout)
+
+async def analyze_proctoring_log(
+    activity_log: List[Dict[str, Any]],
+    compact: Optional[bool] = None,
+    features: Optional[CandidateFeatures] = None
+) -> Dict[str, Any]:
     """
     Analyzes proctoring logs using multiple LLMs and combines their assessments
     for more reliable cheating detection.
     
     Args:
-        activity_log: List of dictionaries with proctoring events
+        activity_log: List of dictionaries with proctoring events, or a
+            CandidateEvents slice from the event store
+        compact: Use the compact prompt encoding (default: LLM_PROMPT_MODE)
+        features: The log's CandidateFeatures, if already looked up
         
     Returns:
         Dictionary with analysis and score
     """
-    # Format the activity log for easier analysis
-    formatted_log = format_activity_log(activity_log)
-    
-    # Create enhanced system prompt
-    system_prompt = create_system_prompt()
-    
-    # Create the input prompt with formatted log and analysis instructions
-    input_prompt = create_input_prompt(formatted_log)
-    # Get predictions from all three LLM services concurrently
-    tasks = [
-        google_chat_completions(input_prompt, system_prompt),
-        # groq_chat_completions(input_prompt, system_prompt),
-        mistral_chat_completions(input_prompt, system_prompt)
+    return await run_llm_analysis(prepare_llm_analysis(activity_log, compact=compact, features=features))
+
+def _batch_section(candidate_id, activity_log, compact):
+    """One candidate's log and statistics, without the closing instructions"""
+    # Uncached: the store holds whole candidate logs, keyed by their event store form
+    body = create_input_prompt(format_activity_log(activity_log, compute_features(activity_log)), compact=compact)
+    return f"=== Candidate {candidate_id} ===\n{body.removesuffix(ANALYSIS_INSTRUCTIONS).strip()}\n"
+
+def create_batch_input_prompt(sections):
+    """Input prompt for several candidates, answered as one JSON object keyed by id"""
+    ids = ", ".join(f'"{candidate_id}"' for candidate_id in sections)
+    logs = "\n".join(sections.values())
+    # Same guidance as a single-candidate prompt, but a keyed answer format
+    guidance = ANALYSIS_INSTRUCTIONS.splitlines()[:-1]
+    return f"""
+The following are the proctoring activity logs of {len(sections)} different candidates.
+Analyze each candidate independently; events of one candidate say nothing about another.
+
+{logs}
+{chr(10).join(guidance)}
+Return ONLY a JSON object with one key per candidate id ({ids}), each mapping to an object with 'score' and 'analysis' fields.
+"""
+
+def split_batch_response(response, candidate_ids):
+    """
+    Split a batched response into per-candidate raw responses.
+
+    Returns {candidate_id: JSON string of {"score", "analysis"}} for every id
+    that was answered validly, so each can go through `process_llm_responses`.
+    """
+    if not isinstance(response, str):
+        return {}
+    try:
+        parsed = json.loads(response)
+    except ValueError:
+        return {}
+    if not isinstance(parsed, dict):
+        return {}
+    answers = {}
+    for candidate_id in candidate_ids:
+        answer = parsed.get(str(candidate_id))
+        if isinstance(answer, dict) and "score" in answer and "analysis" in answer:
+            answers[candidate_id] = json.dumps(answer)
+    return answers
+
+def plan_llm_batches(activity_logs, max_candidates, token_budget=None, compact=None):
+    """
+    Group candidates into multi-candidate requests.
+
+    `activity_logs` maps candidate id to its log. Candidates are packed in
+    order while the batch's input prompt stays under `token_budget` (default
+    LLM_BATCH_TOKEN_BUDGET, capped by the provider context) and holds at most
+    `max_candidates`; a log too big to share a request gets a batch of its own.
+    """
+    token_budget = min(
+        token_budget or BATCH_TOKEN_BUDGET,
+        prompt_token_budget() - estimate_tokens(create_system_prompt())
+    )
+    overhead = estimate_tokens(create_batch_input_prompt({}))
+
+    batches = []
+    current, used = [], overhead
+    for candidate_id, activity_log in activity_logs.items():
+        if isinstance(activity_log, CandidateEvents):
+            activity_log = activity_log.to_records()
+        # The id is repeated once more in the closing instructions
+        cost = estimate_tokens(_batch_section(candidate_id, activity_log, compact)) + 4
+        if overhead + cost > token_budget:
+            batches.append([candidate_id])
+            continue
+        if current and (used + cost > token_budget or len(current) >= max_candidates):
+            batches.append(current)
+            current, used = [], overhead
+        current.append(candidate_id)
+        used += cost
+    if current:
+        batches.append(current)
+    return batches
+
+async def analyze_proctoring_logs_batched(
+    activity_logs: Dict[Any, List[Dict[str, Any]]],
+    compact: Optional[bool] = None
+) -> Dict[Any, Dict[str, Any]]:
+    """
+    Analyze several candidates with one request per provider.
+
+    The logs share a single prompt (and a single copy of the system prompt),
+    and the providers answer with a JSON object keyed by candidate id. Each
+    candidate's answers are then combined by `process_llm_responses` as
+    usual; candidates no provider answered for fall back to
+    `analyze_proctoring_log`. Size the batches with `plan_llm_batches`.
+
+    Returns:
+        Dictionary of candidate id to {"score", "analysis"}
+    """
+    activity_logs = {
+        candidate_id: log.to_records() if isinstance(log, CandidateEvents) else log
+        for candidate_id, log in activity_logs.items()
+    }
+    if len(activity_logs) == 1:
+        (candidate_id, activity_log), = activity_logs.items()
+        return {candidate_id: await analyze_proctoring_log(activity_log, compact=compact)}
+
+    loop = asyncio.get_running_loop()
+    finish_by = loop.time() + CANDIDATE_BUDGET
+    candidate_ids = list(activity_logs)
+    prompt = create_batch_input_prompt({
+        candidate_id: _batch_section(candidate_id, activity_log, compact)
+        for candidate_id, activity_log in activity_logs.items()
+    })
+    BATCH_STATS["requests"] += 1
+    BATCH_STATS["candidates"] += len(candidate_ids)
+
+    responses = await _fan_out(
+        prompt, create_system_prompt(), finish_by - SYNTHESIS_TIMEOUT,
+        validate=lambda response: split_batch_response(response, candidate_ids) or None
+    )
+    answers = [split_batch_response(response, candidate_ids) for response in responses]
+
+    answered = [
+        candidate_id for candidate_id in candidate_ids
+        if any(candidate_id in provider_answers for provider_answers in answers)
     ]
-    
-    # Wait for all responses
-    responses = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Process valid responses and combine results
-    result = await process_llm_responses(responses)
+    missing = [candidate_id for candidate_id in candidate_ids if candidate_id not in answered]
+    BATCH_STATS["single_fallbacks"] += len(missing)
+
+    timeout = max(0.0, min(SYNTHESIS_TIMEOUT, finish_by - loop.time()))
+    combined = await asyncio.gather(*(
+        process_llm_responses(
+            [provider_answers.get(candidate_id) for provider_answers in answers], timeout=timeout
+        )
+        for candidate_id in answered
+    ))
+    fallbacks = await asyncio.gather(*(
+        analyze_proctoring_log(activity_logs[candidate_id], compact=compact) for candidate_id in missing
+    ))
+
+    results = dict(zip(answered, combined))
+    results.update(zip(missing, fallbacks))
+    return {candidate_id: results[candidate_id] for candidate_id in candidate_ids}
+
+def prompt_token_budget():
+    """Largest system + input prompt (in tokens) every analysis provider accepts"""
+    budget = min(CONTEXT_LIMITS[provider] for provider in ANALYSIS_PROVIDERS) - RESPONSE_TOKEN_ESTIMATE
+    if MAX_PROMPT_TOKENS:
+        budget = min(budget, MAX_PROMPT_TOKENS)
+    return budget
+
+def _window_span(window):
+    """First and last timestamp of a window, as written in the log"""
+    return (
+        window[0].get("timeStampInVideo", "NaN:NaN:NaN"),
+        window[-1].get("timeStampInVideo", "NaN:NaN:NaN")
+    )
+
+def _window_header(index, total, window):
+    start, end = _window_span(window)
+    return (
+        f"This is window {index} of {total} of a long exam log, covering {start} to {end}. "
+        f"Score only the activity in this window.\n"
+    )
+
+def _window_prompt(window, index, total, compact):
+    # Uncached: windows (and the trial windows of split_log_windows) are not candidates
+    formatted_log = format_activity_log(window, compute_features(window))
+    return _window_header(index, total, window) + create_input_prompt(formatted_log, compact=compact)
+
+def split_log_windows(activity_log, token_budget, compact=None):
+    """
+    Split a log into consecutive time windows whose prompts fit `token_budget`.
+
+    Each window is sized against its real prompt in the active mode: the
+    longest prefix of the remaining events whose measured prompt fits. The
+    search starts from the previous window's length and extrapolates or
+    interpolates from the measured token counts (prompts grow about linearly
+    with the events), falling back to bisection when that converges slowly.
+    Every window is measured again with its final header, and halved if it
+    no longer fits, so no provider is ever sent more than `token_budget`
+    tokens (system prompt included).
+    """
+    system_tokens = estimate_tokens(create_system_prompt())
+    overhead = system_tokens + estimate_tokens(_window_prompt([{"timeStampInVideo": "00:00:00"}], 999, 999, compact))
+    if overhead >= token_budget:
+        raise ValueError(f"Token budget {token_budget} is smaller than the prompt overhead ({overhead})")
+
+    def prompt_tokens(window, index=999, total=999):
+        return system_tokens + estimate_tokens(_window_prompt(window, index, total, compact))
+
+    windows = []
+    start = 0
+    size = 1
+    while start < len(activity_log):
+        remaining = len(activity_log) - start
+        # Longest length known to fit and shortest known not to, with their token counts
+        fits, fits_tokens = 0, overhead
+        too_big, too_big_tokens = None, None
+        size = min(size, remaining)
+        bisect = False
+        while True:
+            tokens = prompt_tokens(activity_log[start:start + size])
+            previous_gap = None if too_big is None else too_big - fits
+            if tokens <= token_budget:
+                fits, fits_tokens = size, tokens
+            else:
+                too_big, too_big_tokens = size, tokens
+            if fits == remaining or (too_big is not None and too_big - fits <= 1):
+                break
+
+            if too_big is None:
+                # Extrapolate at the per-event rate so far, growing at most 2x
+                rate = max(fits_tokens - overhead, 1) / fits
+                size = fits + int((token_budget - fits_tokens) / rate)
+                size = min(remaining, 2 * fits, max(fits + 1, size))
+            elif bisect:
+                size = (fits + too_big) // 2
+                bisect = False
+            else:
+                size = fits + int((token_budget - fits_tokens) * (too_big - fits) / (too_big_tokens - fits_tokens))
+                size = min(too_big - 1, max(fits + 1, size))
+                # Bisect next time if the last probe didn't halve the interval
+                bisect = previous_gap is not None and 2 * (too_big - fits) > previous_gap
+        if fits == 0:
+            raise ValueError(f"A single log event needs {tokens} tokens, over the budget of {token_budget}")
+        windows.append(activity_log[start:start + fits])
+        start += fits
+        size = fits
+
+    fitted = []
+    pending = windows[::-1]
+    while pending:
+        window = pending.pop()
+        tokens = prompt_tokens(window, len(windows), len(windows))
+        if tokens <= token_budget:
+            fitted.append(window)
+        elif len(window) == 1:
+            raise ValueError(f"A single log event needs {tokens} tokens, over the budget of {token_budget}")
+        else:
+            middle = len(window) // 2
+            pending.extend([window[middle:], window[:middle]])
+    return fitted
+
+async def reduce_window_responses(spans, window_responses, timeout=None):
+    """
+    Combine the per-window provider responses of a long log into one result.
+
+    Each window's providers are averaged like a short log's; the windows are
+    then reduced with max, since cheating in one part of the exam is not
+    diluted by honest stretches elsewhere. The synthesis prompt is told its
+    inputs are consecutive time windows of one exam, and the fallback keeps
+    the score and analysis of the same (most suspicious) window. Windows no
+    provider answered are listed under "coverage" and noted in the analysis,
+    and the result is marked "degraded".
+    """
+    analyzed = []  # (label, score, analysis, provider lines) per answered window
+    missing = []
+    for i, ((start, end), provider_responses) in enumerate(zip(spans, window_responses), start=1):
+        label = f"Window {i}/{len(spans)} ({start}-{end})"
+        parsed = {
+            provider: result
+            for provider, result in zip(ANALYSIS_PROVIDERS, map(_parse_response, provider_responses))
+            if result is not None
+        }
+        if not parsed:
+            missing.append(label)
+            continue
+        score = round(sum(r["score"] for r in parsed.values()) / len(parsed))
+        closest = min(parsed.values(), key=lambda r: abs(r["score"] - score))
+        lines = [f"{label}, {provider}: Score = {r['score']}, Analysis = \"{r['analysis']}\"" for provider, r in parsed.items()]
+        analyzed.append((label, score, closest["analysis"], lines))
+
+    coverage = {"windows": len(spans), "analyzed": len(analyzed), "missing": missing}
+    if not analyzed:
+        SYNTHESIS_STATS["no_response"] += 1
+        return {
+            "score": 0,
+            "analysis": "Error: Unable to analyze proctoring log with any LLM.",
+            "coverage": coverage,
+            "degraded": True
+        }
+
+    scores = [score for _, score, _, _ in analyzed]
+    _, top_score, top_analysis, _ = max(analyzed, key=lambda window: window[1])
+    if responses_agree(scores):
+        SYNTHESIS_STATS["consensus"] += 1
+        result = {"score": top_score, "analysis": top_analysis}
+    else:
+        window_analyses = "\n".join(line for _, _, _, lines in analyzed for line in lines)
+        final_analysis_prompt = f"""
+Review these analyses of ONE exam proctoring activity log. The log was too long for a single
+request, so it was split into consecutive time windows and each window was analyzed separately
+by one or more AI models:
+
+{window_analyses}
+
+Your task is to synthesize these window analyses into a single definitive assessment of the whole exam.
+Consider:
+1. Each window covers a different part of the exam; they are not competing opinions about the same events
+2. Suspicious activity in any one window counts for the whole exam and must not be averaged away by
+   quiet windows; the per-window scores are {scores} and the most suspicious window scored {top_score}
+3. Patterns that repeat across windows (e.g. regular tab switches throughout the exam)
+4. Windows whose models disagree, which deserve less weight than consistent findings
+
+Return ONLY a JSON object with:
+1. "analysis": A brief (2-3 sentences) final analysis that captures the most important insights
+2. "score": A refined final score from 0-100
+"""
+        result = await _synthesize(final_analysis_prompt, {"score": top_score, "analysis": top_analysis}, timeout)
+
+    if missing:
+        listed = ", ".join(missing[:3]) + (f" and {len(missing) - 3} more" if len(missing) > 3 else "")
+        result["analysis"] = (
+            f"{result['analysis']} (Partial analysis: {len(missing)} of {len(spans)} log windows "
+            f"got no LLM answer in time: {listed}.)"
+        )
+        result["degraded"] = True
+    result["coverage"] = coverage
     return result
 
+def plan_log_windows(activity_log, token_budget=None, compact=None):
+    """LLMPlan with one prompt per time window of `activity_log` (see `split_log_windows`)"""
+    windows = split_log_windows(activity_log, token_budget or prompt_token_budget(), compact=compact)
+    return LLMPlan(
+        create_system_prompt(),
+        [_window_prompt(window, i, len(windows), compact) for i, window in enumerate(windows, start=1)],
+        [_window_span(window) for window in windows]
+    )
+
+async def analyze_proctoring_log_chunked(
+    activity_log: List[Dict[str, Any]],
+    token_budget: Optional[int] = None,
+    concurrency: Optional[int] = None,
+    compact: Optional[bool] = None,
+    finish_by: Optional[float] = None
+) -> Dict[str, Any]:
+    """
+    Map-reduce analysis for logs too long for a single request.
+
+    The log is split into time windows under `token_budget`, each window is
+    sent to every provider (at most `concurrency` windows in flight), and
+    the per-window results are reduced by `reduce_window_responses`.
+
+    Every window gets the per-candidate budget (LLM_CANDIDATE_BUDGET, less
+    the synthesis time) from when it starts, so the total scales with the
+    number of windows instead of starving the last ones. `finish_by` (loop
+    time) optionally caps the whole analysis; windows still unanswered then
+    are reported as missing in the result's "coverage".
+    """
+    if isinstance(activity_log, CandidateEvents):
+        activity_log = activity_log.to_records()
+    plan = plan_log_windows(activity_log, token_budget, compact=compact)
+    return await run_llm_analysis(plan, concurrency=concurrency, finish_by=finish_by)
+
 # Example usage
 # if __name__ == "__main__":
 #     # Get all JSON files matching the pattern "candidate*.json" in the "data" directory
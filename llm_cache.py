@@ -0,0 +1,138 @@
+import hashlib
+import json
+import os
+import time
+
+from dotenv import load_dotenv
+
+from util import atomic_write
+
+load_dotenv()
+
+CACHE_DIR = os.getenv("LLM_CACHE_DIR", ".llm_cache")
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE", str(30 * 24 * 3600)))  # seconds
+CACHE_BYPASS = os.getenv("LLM_CACHE_BYPASS", "0") == "1"
+
+
+class LLMCache:
+    """
+    Content-addressed on-disk cache for LLM responses.
+
+    Entries are keyed by the model name plus a hash of the system prompt,
+    input prompt and temperature, and stored one JSON file per key. Entries
+    older than `max_age` seconds are treated as misses, and the oldest
+    entries are evicted once the cache grows past `max_bytes`. With
+    `bypass` set, lookups always miss but fresh responses are still stored.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=CACHE_MAX_BYTES, max_age=CACHE_MAX_AGE, bypass=CACHE_BYPASS):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._size = None  # bytes on disk, computed lazily on first write
+
+    @staticmethod
+    def key(model, system_prompt, input, temperature=None):
+        """Build the cache key for one completion request"""
+        digest = hashlib.sha256(
+            json.dumps([system_prompt, input, temperature]).encode("utf-8")
+        ).hexdigest()
+        safe_model = "".join(c if c.isalnum() or c in "-._" else "_" for c in model)
+        return f"{safe_model}-{digest}"
+
+    def _path(self, key):
+        digest = key.rsplit("-", 1)[-1]
+        return os.path.join(self.directory, digest[:2], key + ".json")
+
+    def get(self, key):
+        """Return the cached response for `key`, or None on a miss"""
+        if self.bypass:
+            self.misses += 1
+            return None
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                self._remove(path)
+                self.misses += 1
+                return None
+            with open(path, "r", encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry.get("response")
+
+    def set(self, key, response):
+        """Store a response atomically and evict old entries if over budget"""
+        path = self._path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with atomic_write(path, "w", encoding="utf-8") as file:
+                json.dump({"key": key, "created": time.time(), "response": response}, file)
+        except OSError as e:
+            print(f"Error writing LLM cache entry {key}: {e}")
+            return
+        self.writes += 1
+
+        if self._size is None:
+            self._size = sum(size for _, _, size in self._entries())
+        else:
+            self._size += os.path.getsize(path)
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.directory):
+            return entries
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, path, stat.st_size))
+        return entries
+
+    def _remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        self.evictions += 1
+        if self._size is not None:
+            self._size -= size
+
+    def evict(self):
+        """Drop expired entries, then the oldest ones until under max_bytes"""
+        now = time.time()
+        entries = sorted(self._entries())
+        self._size = sum(size for _, _, size in entries)
+        for mtime, path, size in entries:
+            if now - mtime > self.max_age or self._size > self.max_bytes:
+                self._remove(path)
+            else:
+                break
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+
+# Shared cache used by llm_tool
+LLM_CACHE = LLMCache()
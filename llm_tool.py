@@ -1,9 +1,14 @@
 import asyncio
+import json
 import os
+import re
 from fastapi import HTTPException
-from openai import OpenAI
+from openai import AsyncOpenAI
 from dotenv import load_dotenv
 
+from llm_cache import LLM_CACHE
+from rate_limiter import RateLimiter
+
 # Load environment variables from .env file
 load_dotenv()
 
@@ -12,18 +17,123 @@ GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 GROQ_API_KEY = os.getenv("GROQ_API_KEY")
 MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY")
 
+# OpenAI-compatible endpoints, overridable to point at a proxy or a local fake
+GOOGLE_BASE_URL = os.getenv("GOOGLE_BASE_URL", "https://generativelanguage.googleapis.com/v1beta/openai/")
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com/openai/v1")
+MISTRAL_BASE_URL = os.getenv("MISTRAL_BASE_URL", "https://api.mistral.ai/v1")
+
+# Per-provider quotas (requests / tokens per minute), overridable from .env
+RATE_LIMITS = {
+    "google": RateLimiter(
+        requests_per_minute=int(os.getenv("GOOGLE_RPM", "10")),
+        tokens_per_minute=int(os.getenv("GOOGLE_TPM", "1000000"))
+    ),
+    "groq": RateLimiter(
+        requests_per_minute=int(os.getenv("GROQ_RPM", "30")),
+        tokens_per_minute=int(os.getenv("GROQ_TPM", "6000"))
+    ),
+    "mistral": RateLimiter(
+        requests_per_minute=int(os.getenv("MISTRAL_RPM", "60")),
+        tokens_per_minute=int(os.getenv("MISTRAL_TPM", "500000"))
+    ),
+}
+
+# Maximum input tokens each provider accepts for the models used here
+CONTEXT_LIMITS = {
+    "google": int(os.getenv("GOOGLE_CONTEXT_TOKENS", "1000000")),
+    "groq": int(os.getenv("GROQ_CONTEXT_TOKENS", "128000")),
+    "mistral": int(os.getenv("MISTRAL_CONTEXT_TOKENS", "128000")),
+}
+
+# Rough allowance for the JSON answer when charging the token budget
+RESPONSE_TOKEN_ESTIMATE = 500
+
+# Word pieces, punctuation marks and indentation runs each start a new token
+_TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]|\s{2,}")
+
+def estimate_tokens(text):
+    """Approximate BPE token count (no tokenizer dependency) for budgeting"""
+    return sum(1 + (len(piece) - 1) // 4 for piece in _TOKEN_PATTERN.findall(text))
+
+def _cache_response(cache_key, content, validate=None):
+    """
+    Only cache answers `validate` accepts (returns non-None for), so an error
+    object or an answer missing fields is retried next run instead of being
+    replayed. Without a validator any parseable JSON is cached.
+    """
+    if validate is not None:
+        if validate(content) is None:
+            return
+    else:
+        try:
+            json.loads(content)
+        except (TypeError, ValueError):
+            return
+    LLM_CACHE.set(cache_key, content)
+
+# One pooled async client per provider. The SDK's default HTTP client keeps
+# connections alive, so reusing it avoids a TCP/TLS handshake per call.
+_clients = {}
+_clients_loop = None
+
+def _get_client(provider):
+    """Return the shared AsyncOpenAI client for a provider on the running loop"""
+    global _clients_loop
+    loop = asyncio.get_running_loop()
+    if loop is not _clients_loop:
+        # Pooled connections are bound to the loop that opened them, so a new
+        # loop (e.g. another asyncio.run) gets fresh clients.
+        _clients.clear()
+        _clients_loop = loop
+    client = _clients.get(provider)
+    if client is None:
+        if provider == "google":
+            client = AsyncOpenAI(base_url=GOOGLE_BASE_URL, api_key=GOOGLE_API_KEY)
+        elif provider == "groq":
+            client = AsyncOpenAI(base_url=GROQ_BASE_URL, api_key=GROQ_API_KEY)
+        elif provider == "mistral":
+            client = AsyncOpenAI(base_url=MISTRAL_BASE_URL, api_key=MISTRAL_API_KEY)
+        else:
+            raise ValueError(f"Unknown LLM provider: {provider}")
+        _clients[provider] = client
+    return client
+
+async def close_clients():
+    """
+    Close the pooled clients of the running loop.
+
+    Call this before an event loop that used the clients ends (e.g. at the
+    end of the coroutine passed to asyncio.run); otherwise their connections
+    are closed later from a different loop.
+    """
+    global _clients_loop
+    clients = list(_clients.values())
+    _clients.clear()
+    _clients_loop = None
+    for client in clients:
+        await client.close()
+
 async def google_chat_completions(
     input: str,
     system_prompt: str = "",
-    model: str = "gemini-2.0-pro-exp-02-05"
+    model: str = "gemini-2.0-pro-exp-02-05",
+    admitted: asyncio.Event = None,
+    validate=None
 ):
+    cache_key = LLM_CACHE.key(model, system_prompt, input, 0.6)
+    cached = LLM_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    await RATE_LIMITS["google"].acquire(
+        estimate_tokens(system_prompt) + estimate_tokens(input) + RESPONSE_TOKEN_ESTIMATE
+    )
+    if admitted is not None:
+        admitted.set()
     try:
-        google_client = OpenAI(
-            base_url="https://generativelanguage.googleapis.com/v1beta/openai/",
-            api_key=GOOGLE_API_KEY
-        )
-        
-        response = google_client.chat.completions.create(
+        google_client = _get_client("google")
+
+        response = await google_client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -32,22 +142,33 @@ async def google_chat_completions(
             temperature=0.6,
             response_format={ "type": "json_object" }
         )
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        _cache_response(cache_key, content, validate)
+        return content
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 async def groq_chat_completions(
     input: str,
     system_prompt: str = "",
-    model: str = "deepseek-r1-distill-llama-70b-specdec"
+    model: str = "deepseek-r1-distill-llama-70b-specdec",
+    admitted: asyncio.Event = None,
+    validate=None
 ):
+    cache_key = LLM_CACHE.key(model, system_prompt, input, None)
+    cached = LLM_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    await RATE_LIMITS["groq"].acquire(
+        estimate_tokens(system_prompt) + estimate_tokens(input) + RESPONSE_TOKEN_ESTIMATE
+    )
+    if admitted is not None:
+        admitted.set()
     try:
-        groq_client = OpenAI(
-            api_key=GROQ_API_KEY,
-            base_url="https://api.groq.com/openai/v1",
-        )
-        
-        response = groq_client.chat.completions.create(
+        groq_client = _get_client("groq")
+
+        response = await groq_client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -55,7 +176,9 @@ async def groq_chat_completions(
             ],
             response_format={ "type": "json_object" }
         )
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        _cache_response(cache_key, content, validate)
+        return content
     except Exception as e:
         print(e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -63,15 +186,24 @@ async def groq_chat_completions(
 async def mistral_chat_completions(
     input: str,
     system_prompt: str = "",
-    model: str = "mistral-large-latest"
+    model: str = "mistral-large-latest",
+    admitted: asyncio.Event = None,
+    validate=None
 ):
+    cache_key = LLM_CACHE.key(model, system_prompt, input, 0.6)
+    cached = LLM_CACHE.get(cache_key)
+    if cached is not None:
+        return cached
+
+    await RATE_LIMITS["mistral"].acquire(
+        estimate_tokens(system_prompt) + estimate_tokens(input) + RESPONSE_TOKEN_ESTIMATE
+    )
+    if admitted is not None:
+        admitted.set()
     try:
-        client = OpenAI(
-            api_key=MISTRAL_API_KEY,
-            base_url="https://api.mistral.ai/v1"
-        )
-        
-        response = client.chat.completions.create(
+        client = _get_client("mistral")
+
+        response = await client.chat.completions.create(
             model=model,
             messages=[
                 {"role": "system", "content": system_prompt},
@@ -80,7 +212,9 @@ async def mistral_chat_completions(
             temperature=0.6,
             response_format={ "type": "json_object" }
         )
-        return response.choices[0].message.content
+        content = response.choices[0].message.content
+        _cache_response(cache_key, content, validate)
+        return content
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
     
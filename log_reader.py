@@ -0,0 +1,172 @@
+"""
+Incremental reader for activity log files.
+
+`iter_activity_log(path)` yields the events of a candidateN.json one at a
+time, normalized like `main.load_activity_log`, while reading the file in
+LOG_CHUNK_SIZE chunks. Only one chunk and one event are held at a time,
+however long the log is. The "activityLog" array is streamed element by
+element; any other top-level value is decoded whole.
+
+With `repair=True` the reader also accepts the damage valid_data.py fixes:
+a missing opening brace, a bare activityLog key, and a file that ends
+early (missing closing brackets/braces, or a trailing comma after the
+array).
+"""
+import json
+import re
+
+from events import normalize_entry
+
+LOG_CHUNK_SIZE = 1 << 16  # characters read at a time
+LOG_KEY = "activityLog"
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_COMMA = re.compile(r"[ \t\n\r]*,[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
+
+class _Buffer:
+    """Text of a file read in chunks and consumed from the front"""
+
+    def __init__(self, file, chunk_size):
+        self.file = file
+        self.chunk_size = chunk_size
+        self.text = ""
+        self.pos = 0
+        self.consumed = 0  # characters dropped before `text`
+        self.eof = False
+
+    def fill(self):
+        """Append the next chunk (at least doubling a value that spans chunks); False at end of file"""
+        if self.eof:
+            return False
+        chunk = self.file.read(max(self.chunk_size, len(self.text) - self.pos))
+        if not chunk:
+            self.eof = True
+            return False
+        self.consumed += self.pos
+        self.text = self.text[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Next non-whitespace character without consuming it, "" at end of file"""
+        while True:
+            self.pos = _WHITESPACE.match(self.text, self.pos).end()
+            if self.pos < len(self.text):
+                return self.text[self.pos]
+            if not self.fill():
+                return ""
+
+    def take(self, char):
+        """Consume `char` if it is the next non-whitespace character"""
+        if self.peek() == char:
+            self.pos += 1
+            return True
+        return False
+
+    def startswith(self, prefix):
+        while len(self.text) - self.pos < len(prefix) and self.fill():
+            pass
+        return self.text.startswith(prefix, self.pos)
+
+    def value(self):
+        """Decode the next JSON value"""
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.text, self.pos)
+            except json.JSONDecodeError:
+                if self.fill():
+                    continue
+                self.error("Truncated or invalid value")
+            # A number or literal may continue in the next chunk
+            if end == len(self.text) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+    def error(self, message):
+        raise ValueError(f"{message} at char {self.consumed + self.pos}")
+
+
+def _iter_array(buffer, repair):
+    if not buffer.take("["):
+        buffer.error("Expecting '['")
+    if buffer.take("]") or (repair and buffer.peek() == ""):
+        return
+    while True:
+        # Fast path: a whole element and the comma after it are in the buffer
+        try:
+            value, end = _decoder.raw_decode(buffer.text, buffer.pos)
+            comma = _COMMA.match(buffer.text, end)
+        except json.JSONDecodeError:
+            comma = None
+        if comma is not None and comma.end() < len(buffer.text):
+            buffer.pos = comma.end()
+            yield value
+            continue
+
+        yield buffer.value()
+        if buffer.take(","):
+            buffer.peek()
+            continue
+        if buffer.take("]") or (repair and buffer.peek() == ""):
+            return
+        buffer.error("Expecting ',' or ']'")
+
+
+def iter_log_entries(file, repair=False, extra=None, chunk_size=LOG_CHUNK_SIZE):
+    """
+    Yield the raw entries of the "activityLog" array of an open text file.
+
+    Top-level values other than the log are stored in `extra` when given,
+    with a None placeholder under LOG_KEY to keep the order of the keys.
+    Raises ValueError when the file is not valid JSON (after the fixes
+    above, with `repair`).
+    """
+    buffer = _Buffer(file, chunk_size)
+    if not buffer.take("{") and not repair:
+        buffer.error("Expecting '{'")
+
+    key = None
+    while not buffer.take("}"):
+        if buffer.peek() == "":
+            if repair:
+                break
+            buffer.error("Expecting '}'")
+        if key is not None:
+            if not buffer.take(","):
+                buffer.error("Expecting ',' delimiter")
+            # A comma left after the log at the end of the file
+            if repair and key == LOG_KEY and buffer.peek() in ("}", ""):
+                continue
+
+        if repair and buffer.startswith(LOG_KEY):
+            key = LOG_KEY
+            buffer.pos += len(LOG_KEY)
+        else:
+            key = buffer.value() if buffer.peek() == '"' else None
+            if not isinstance(key, str):
+                buffer.error("Expecting property name")
+        if not buffer.take(":"):
+            buffer.error("Expecting ':' delimiter")
+
+        if key == LOG_KEY:
+            if extra is not None:
+                extra[LOG_KEY] = None
+            yield from _iter_array(buffer, repair)
+        else:
+            value = buffer.value()
+            if extra is not None:
+                extra[key] = value
+
+    if buffer.peek() != "":
+        buffer.error("Extra data")
+
+
+def iter_activity_log(path, repair=False, chunk_size=LOG_CHUNK_SIZE):
+    """Yield the normalized events of a log file one at a time"""
+    with open(path, 'r', encoding='utf-8-sig') as file:
+        for entry in iter_log_entries(file, repair=repair, chunk_size=chunk_size):
+            yield normalize_entry(entry)
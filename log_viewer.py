@@ -0,0 +1,82 @@
+"""
+Server-side paging and filtering of a candidate's raw activity log.
+
+The details page used to send the whole log to the browser twice (table
+and JSON) on every rerun. A LogView is built once per log and cached. It
+keeps the log as compact event columns, each rerun filters by activity,
+source and time range with vectorized masks, and only the requested
+page is turned back into rows for Streamlit.
+"""
+import numpy as np
+import pandas as pd
+
+from events import MISSING_SECONDS, normalize_events
+
+LOG_PAGE_SIZES = [50, 100, 250]
+
+COLUMNS = ["type", "timeStampInVideo", "activityDescription", "count"]
+
+
+class LogView:
+    def __init__(self, activity_log, features):
+        """
+        `activity_log` is a list of event dicts or CandidateEvents; `features`
+        are the CandidateFeatures of the same log, in the same row order.
+        """
+        self.events = normalize_events(activity_log)
+        self.seconds = features.seconds
+        self.activities = features.activities
+        self.activity = features.activity
+
+        # Only the sources present in this log (store vocabularies are global)
+        codes, self.source = np.unique(np.asarray(self.events.source), return_inverse=True)
+        self.sources = [self.events.sources[code] for code in codes.tolist()]
+
+    def __len__(self):
+        return len(self.events)
+
+    def time_range(self):
+        """(first, last) valid second of the log, or None if no row has a timestamp"""
+        seconds = self.seconds[self.seconds != MISSING_SECONDS]
+        if len(seconds) == 0:
+            return None
+        return int(seconds.min()), int(seconds.max())
+
+    def query(self, activities=None, sources=None, start=None, end=None, page=1, page_size=100):
+        """
+        One page of log rows matching the filters.
+
+        Args:
+            activities: Activity descriptions to keep, or None for all
+            sources: Sources ("Video Proctoring", ...) to keep, or None for all
+            start, end: Time range in seconds (inclusive); rows without a
+                timestamp are dropped once either is set
+            page: 1-based page number, clamped to the available pages
+            page_size: Rows per page
+
+        Returns:
+            Tuple of (total matches, page number used, DataFrame of the page,
+            records of the page)
+        """
+        mask = np.ones(len(self.events), dtype=bool)
+        # Filters are looked up per vocabulary entry, then broadcast to rows by code
+        if activities is not None:
+            activities = set(activities)
+            mask &= np.array([activity in activities for activity in self.activities], dtype=bool)[self.activity]
+        if sources is not None:
+            sources = set(sources)
+            mask &= np.array([source in sources for source in self.sources], dtype=bool)[self.source]
+        if start is not None or end is not None:
+            mask &= self.seconds != MISSING_SECONDS
+            if start is not None:
+                mask &= self.seconds >= start
+            if end is not None:
+                mask &= self.seconds <= end
+
+        positions = np.flatnonzero(mask)
+        total = len(positions)
+        pages = max(1, -(-total // page_size))
+        page = min(max(1, page), pages)
+        rows = positions[(page - 1) * page_size:page * page_size]
+        records = self.events.slice(rows).to_records()
+        return total, page, pd.DataFrame(records, index=rows, columns=COLUMNS), records
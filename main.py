@@ -1,23 +1,58 @@
+import argparse
 import asyncio
+import hashlib
 import json
-from time import sleep
 
 from algorithm_analyzer import analyze_algorithm_based_proctoring
+from event_store import load_candidate_events
+from events import normalize_events
+from feature_store import candidate_features
 from llm_analyzer import analyze_proctoring_log
-from ml_analyzer import analyze_ml_based_proctoring
-from util import get_score_color, get_score_status
+from llm_tool import close_clients
+from log_reader import iter_activity_log
+from ml_analyzer import analyze_ml_based_proctoring, load_model_package
+from util import activity_log_path, atomic_write, get_score_color, get_score_status
 
 def main_output(candidate_data, activity_log):
+    async def run():
+        try:
+            return await main_output_async(candidate_data, activity_log)
+        finally:
+            await close_clients()
+
+    return asyncio.run(run())
+
+def analyze_locally(activity_log):
+    """
+    The CPU-bound part of main_output: features, algorithm and ML results.
+
+    Arguments and results pickle cheaply (use CandidateEvents for the log),
+    so this can run in a worker process.
+    """
+    # Timestamps, counts and intervals are parsed once and shared by all three analyzers
+    features = candidate_features(activity_log)
+    return features, analyze_algorithm_based_proctoring(features), analyze_ml_based_proctoring(features)
+
+async def main_output_async(candidate_data, activity_log, ai_based_proctoring=None, local_results=None):
+    """
+    Score one candidate; safe to run many of these concurrently on one loop.
+
+    `ai_based_proctoring` skips the LLM analysis when it was already done,
+    e.g. in a multi-candidate request, and `local_results` skips
+    `analyze_locally` when it already ran elsewhere (the scoring service's
+    worker pool). Results the LLM analysis couldn't fully produce, or that
+    fell back to zeros on an error, carry "degraded": True.
+    """
     try:
-        ai_based_proctoring = asyncio.run(analyze_proctoring_log(activity_log))
-        algorithm_based_proctoring = analyze_algorithm_based_proctoring(activity_log)
-        ml_based_proctoring = analyze_ml_based_proctoring(activity_log)
+        features, algorithm_based_proctoring, ml_based_proctoring = local_results or analyze_locally(activity_log)
+        if ai_based_proctoring is None:
+            ai_based_proctoring = await analyze_proctoring_log(activity_log, features=features)
         
         if ml_based_proctoring.get('score', 0) > 0:
             final_score = 0.3 * algorithm_based_proctoring.get('score', 0) + 0.45 * ai_based_proctoring.get('score', 0) + 0.25 * ml_based_proctoring.get('score', 0)
         else:
             final_score = 0.4 * algorithm_based_proctoring.get('score', 0) + 0.6 * ai_based_proctoring.get('score', 0)
-        return {
+        result = {
             "id": candidate_data.get('id'),
             "name": candidate_data.get('name', 'Unknown Candidate'),
             "status": get_score_status(final_score),
@@ -30,6 +65,9 @@ def main_output(candidate_data, activity_log):
             "algorithm_based_proctoring": algorithm_based_proctoring,
             "ml_based_proctoring": ml_based_proctoring
         }
+        if ai_based_proctoring.get('degraded'):
+            result["degraded"] = True
+        return result
     except Exception as e: 
         print(f"Error analyzing proctoring: {e}")
         ai_based_proctoring = {
@@ -56,12 +94,13 @@ def main_output(candidate_data, activity_log):
             "exam_date": candidate_data.get('exam_date', '2025-03-09'),
             "ai_based_proctoring": ai_based_proctoring,
             "algorithm_based_proctoring": algorithm_based_proctoring,
-            "ml_based_proctoring": ml_based_proctoring
+            "ml_based_proctoring": ml_based_proctoring,
+            "degraded": True
         }
 
-def load_candidates():
+def load_candidates(path='processed_candidates.json'):
     try:
-        with open('processed_candidates.json', 'r') as file:
+        with open(path, 'r') as file:
             candidates = json.load(file)
         
         processed_candidates = []
@@ -96,36 +135,61 @@ def load_candidates():
     
 def load_activity_log(candidate_id):
     """Load real activity log from data directory"""
+    # Prefer the columnar event store when it holds an up-to-date copy
+    events = load_candidate_events(candidate_id)
+    if events is not None:
+        return events.to_records()
+    return read_activity_log(candidate_id, list)
+
+def load_events(candidate_id):
+    """Activity log as compact CandidateEvents: a zero-copy slice of the event store when fresh, else the parsed JSON"""
+    events = load_candidate_events(candidate_id)
+    if events is None:
+        events = read_activity_log(candidate_id, normalize_events)
+    return events
+
+def read_activity_log(candidate_id, consume):
+    """
+    Stream a candidate's JSON log into `consume` (e.g. list or normalize_events).
+
+    Events are read and normalized one at a time, so only what `consume`
+    keeps is held in memory. Returns consume([]) if the file is missing or
+    invalid.
+    """
     try:
-        file_path = f"data/candidate{candidate_id}.json"
-        with open(file_path, 'r') as file:
-            data = json.load(file)
-            
-        # Extract activity log from the loaded data
-        activity_log = data.get('activityLog', [])
-        
-        # Ensure each log entry has required fields
-        processed_logs = []
-        for log in activity_log:
-            processed_logs.append({
-                "type": log.get("type", "Extension Proctoring"),
-                "timeStampInVideo": log.get("timeStampInVideo", "00:00:00"),
-                "activityDescription": log.get("activityDescription", "Unknown"),
-                "count": log.get("count", 1)
-            })
-            
-        return processed_logs
+        return consume(iter_activity_log(activity_log_path(candidate_id)))
     except FileNotFoundError:
         print(f"Activity log file not found for candidate {candidate_id}")
-        return []
-    except json.JSONDecodeError:
-        print(f"Invalid JSON in activity log file for candidate {candidate_id}")
-        return []
+    except ValueError as e:
+        print(f"Invalid JSON in activity log file for candidate {candidate_id}: {e}")
     except Exception as e:
         print(f"Error loading activity log for candidate {candidate_id}: {e}")
-        return []
+    return consume([])
     
 if __name__ == "__main__":
+    from batch_scorer import score_candidates
+    from cohort_summary import build_summary, load_summary, save_summary, summary_path, update_summary
+    from scoring_manifest import (
+        ML_SCORES_FILE, build_manifest, find_stale_candidates, load_manifest, merge_results, save_manifest
+    )
+
+    parser = argparse.ArgumentParser(description="Score all candidates in candidates.json")
+    parser.add_argument("--concurrency", type=int, default=8,
+                        help="Number of candidates scored at the same time")
+    parser.add_argument("--report-interval", type=float, default=10.0,
+                        help="Seconds between progress reports")
+    parser.add_argument("--batch-size", type=int, default=1,
+                        help="Pack up to this many short logs into one LLM request")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Ignore cached LLM responses (fresh responses are still stored)")
+    parser.add_argument("--incremental", action="store_true",
+                        help="Only rescore candidates whose log, metadata or analyzer versions changed")
+    args = parser.parse_args()
+
+    if args.no_cache:
+        from llm_cache import LLM_CACHE
+        LLM_CACHE.bypass = True
+
     # Load candidates from candidates.json
     candidates = []
     try:
@@ -135,44 +199,76 @@ if __name__ == "__main__":
         print(f"Error loading candidates.json: {e}")
         candidates = []
 
-    # Load ML scores
+    # ML scores are computed live when a trained model is present; otherwise
+    # fall back to the precomputed ML_SCORES_FILE (ml_based_proctoring.json)
     ml_scores = {}
-    try:
-        with open('ml_based_proctoring.json', 'r') as file:
-            ml_data = json.load(file)
-            ml_scores = {item['id']: item['score'] for item in ml_data['candidates']}
-    except Exception as e:
-        print(f"Error loading ml_scores.json: {e}")
-        ml_scores = {}
+    if load_model_package() is None:
+        try:
+            with open(ML_SCORES_FILE, 'r') as file:
+                ml_data = json.load(file)
+                ml_scores = {item['id']: item['score'] for item in ml_data['candidates']}
+        except Exception as e:
+            print(f"Error loading ml_scores.json: {e}")
+            ml_scores = {}
 
-    # Process each candidate and store results
-    results = []
-    for candidate in candidates:
+    output_file = 'processed_candidates.json'
+    manifest = load_manifest()
+
+    # In incremental mode, reuse stored results for unchanged candidates
+    previous_results = []
+    previous_sha256 = None
+    if args.incremental:
         try:
-            candidate_id = candidate['id']
-            
-            # Load activity log for the candidate
-            activity_log = load_activity_log(candidate_id)
-
-            # Process candidate data through main_output
-            result = main_output(candidate, activity_log)
-            
-            result["ml_based_proctoring"]["score"] = ml_scores.get(candidate_id, 0)
-            
-            results.append(result)
-            
-            print(f"Processed candidate {candidate_id}: {candidate.get('name', 'Unknown')}")
-            print(result)
-            sleep(60)  # Sleep for 1 second to avoid rate limiting
+            with open(output_file, 'rb') as file:
+                raw = file.read()
+            previous_results = json.loads(raw)
+            previous_sha256 = hashlib.sha256(raw).hexdigest()
+        except FileNotFoundError:
+            previous_results = []
         except Exception as e:
-            print(f"Error processing candidate {candidate.get('id')}: {e}")
-            continue
+            print(f"Error loading {output_file}, rescoring everyone: {e}")
+            previous_results = []
+
+    stale, fingerprints = find_stale_candidates(
+        candidates, manifest, scored_ids=[result.get('id') for result in previous_results]
+    )
+    to_score = stale if args.incremental else candidates
+    print(f"Scoring {len(to_score)} of {len(candidates)} candidates")
+
+    # Process candidates concurrently; provider rate limits pace the run
+    new_results = asyncio.run(score_candidates(
+        to_score,
+        ml_scores=ml_scores,
+        concurrency=args.concurrency,
+        report_interval=args.report_interval,
+        batch_size=args.batch_size
+    ))
+    results = merge_results(candidates, previous_results, new_results)
+
+    # Fresh results plus untouched up-to-date ones are current; failures and
+    # degraded results (LLM unavailable, analysis error) are retried next run
+    stale_ids = {candidate['id'] for candidate in to_score}
+    up_to_date_ids = {result.get('id') for result in new_results if not result.get('degraded')}
+    up_to_date_ids |= {
+        result.get('id') for result in previous_results
+        if result.get('id') not in stale_ids and not result.get('degraded')
+    }
+
+    # Cohort aggregates for the dashboard: only rescored candidates are
+    # applied when the stored summary matches the previous results
+    summary = load_summary(summary_path(output_file), previous_sha256) if previous_sha256 else None
+    if summary is not None:
+        summary = update_summary(summary, previous_results, results)
+    else:
+        summary = build_summary(results)
 
     # Save results to output file
     try:
-        output_file = 'processed_candidates.json'
-        with open(output_file, 'w') as file:
-            json.dump(results, file, indent=2)
+        payload = json.dumps(results, indent=2)
+        with atomic_write(output_file) as file:
+            file.write(payload)
+        save_manifest(build_manifest(fingerprints, up_to_date_ids))
+        save_summary(summary, summary_path(output_file), hashlib.sha256(payload.encode("utf-8")).hexdigest())
         print(f"Results saved to {output_file}")
     except Exception as e:
-        print(f"Error saving results: {e}")
\ No newline at end of file
+        print(f"Error saving results: {e}")
@@ -1,5 +1,130 @@
+"""
+Isolation Forest + PCA + KMeans scoring from ml_algorithms.ipynb.
+
+Each event becomes a (seconds, count, description code) row. Rows are
+scaled, projected with PCA, tagged with their KMeans cluster and scored by
+the Isolation Forest; a candidate's ML score is the share of anomalous
+events, 0-100.
+
+The model package (`enhanced_model.pkl`, written by ml_training.py or the
+notebook's offline training) is loaded lazily, once per process.
+"""
+import os
+
+import numpy as np
+
+from events import MISSING_SECONDS, normalize_events
+from feature_store import CandidateFeatures
+
+# Bump when the ML scoring changes
+ML_VERSION = "1"
+
+# Bump when create_features changes; models trained on other features are rejected
+FEATURE_VERSION = "1"
+
+MODEL_PATH = os.getenv("ML_MODEL_PATH", "enhanced_model.pkl")
+
+# Timestamp used by the notebook for events whose time can't be parsed
+UNPARSEABLE_SECONDS = 3600
+
+_model_package = None
+_model_key = None
+
+def load_model_package(path=MODEL_PATH):
+    """Return the process-wide model package, reloading it if the file changed; None if absent"""
+    global _model_package, _model_key
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    if _model_key != key:
+        try:
+            import joblib
+            package = joblib.load(path)
+        except Exception as e:
+            print(f"Error loading ML model {path}: {e}")
+            return None
+        if package.get('scaler') is None:
+            # The notebook saves an empty package when it had no training data
+            print(f"ML model {path} was trained without data, ML scores disabled")
+            package = None
+        elif package.get('version', {}).get('feature_version', FEATURE_VERSION) != FEATURE_VERSION:
+            print(f"ML model {path} was trained on other features, retrain with ml_training.py")
+            package = None
+        _model_package, _model_key = package, key
+    return _model_package
+
+def model_version():
+    """Feature version and training data hash of the active model, for the scoring manifest"""
+    package = load_model_package()
+    if package is None:
+        return "none"
+    version = package.get('version')
+    if not version:
+        return "unversioned"
+    return f"{version['feature_version']}-{version['data_sha256'][:12]}"
+
+def create_features(activity_log):
+    """
+    Feature matrix of one log: seconds, count and description code per event.
+
+    Descriptions are coded by their sorted position among the candidate's own
+    descriptions, exactly like the notebook's per-log LabelEncoder.
+    """
+    if isinstance(activity_log, CandidateFeatures):
+        # Sorted position of each of the candidate's descriptions
+        order = sorted(range(len(activity_log.activities)), key=activity_log.activities.__getitem__)
+        rank = np.empty(len(order), dtype=np.int64)
+        rank[order] = np.arange(len(order))
+        seconds = np.where(activity_log.seconds == MISSING_SECONDS, UNPARSEABLE_SECONDS, activity_log.seconds)
+        return np.column_stack([seconds, activity_log.count, rank[activity_log.activity]]).astype(np.float64)
+
+    events = normalize_events(activity_log)
+    seconds = np.where(events.seconds == MISSING_SECONDS, UNPARSEABLE_SECONDS, events.seconds)
+    counts = np.asarray(events.count)
+    descriptions = np.asarray(events.activities, dtype=object)[np.asarray(events.activity)]
+    descriptions = descriptions.astype(str) if len(descriptions) else np.array([], dtype=str)
+
+    if len(descriptions) == 0:
+        return np.empty((0, 3))
+    _, codes = np.unique(descriptions, return_inverse=True)
+    return np.column_stack([seconds, counts, codes]).astype(np.float64)
+
+def score_many(logs, model_package=None):
+    """
+    ML scores (0-100) for many logs with one stacked model pass.
+
+    All candidates' feature matrices are stacked and pushed through the
+    scaler, PCA, KMeans and Isolation Forest once, then the anomaly flags
+    are summed back per candidate. Empty logs score 0.
+
+    Returns:
+        List of scores in the order of `logs`, or None if no model is available
+    """
+    model_package = model_package or load_model_package()
+    if model_package is None:
+        return None
+
+    features = [create_features(log) for log in logs]
+    sizes = np.array([len(f) for f in features])
+    if sizes.sum() == 0:
+        return [0] * len(features)
+
+    stacked = np.vstack([f for f in features if len(f)])
+    reduced = model_package['pca'].transform(model_package['scaler'].transform(stacked))
+    clusters = model_package['kmeans'].predict(reduced)
+    enhanced = np.hstack([reduced, clusters.reshape(-1, 1)])
+    anomalies = model_package['isolation_forest'].decision_function(enhanced) < 0
+
+    offsets = np.concatenate([[0], np.cumsum(sizes[sizes > 0])[:-1]])
+    per_candidate = np.zeros(len(features))
+    per_candidate[sizes > 0] = np.add.reduceat(anomalies.astype(np.float64), offsets) / sizes[sizes > 0]
+    return [int(round(score * 100)) for score in per_candidate]
+
 def analyze_ml_based_proctoring(activity_log):
     """Analyze ML based proctoring"""
+    scores = score_many([activity_log])
     return {
-        'score': 0
-    }
\ No newline at end of file
+        'score': scores[0] if scores else 0
+    }
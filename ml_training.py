@@ -0,0 +1,177 @@
+"""
+Offline training for ml_analyzer.py (the notebook's Isolation Forest + PCA + KMeans).
+
+Feature extraction runs in a process pool across the data files; matrices
+are copied, in candidate order, into one preallocated array. Every model
+is saved as a versioned artifact named after the feature version and a
+hash of the training data, so retraining on the same files is a no-op and
+any model can be traced back to its inputs:
+
+    models/enhanced_model-<feature version>-<data hash>.pkl
+
+The new artifact is then copied to ML_MODEL_PATH for ml_analyzer to use.
+
+    python ml_training.py --workers 8 [--ids 1-40]
+"""
+import argparse
+import glob
+import hashlib
+import os
+import re
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from events import normalize_events
+from log_reader import LOG_CHUNK_SIZE, iter_activity_log
+from ml_analyzer import FEATURE_VERSION, MODEL_PATH, create_features
+from util import DATA_DIR, atomic_write
+
+MODELS_DIR = os.getenv("ML_MODELS_DIR", "models")
+
+# Initial buffer size per byte of JSON; the buffer grows if a cohort is denser
+ROWS_PER_BYTE = 1 / 100
+
+def training_files(data_dir=DATA_DIR, ids=None):
+    """(candidate id, path) of every candidateN.json, sorted by id"""
+    files = []
+    for path in glob.glob(os.path.join(data_dir, "candidate*.json")):
+        match = re.fullmatch(r"candidate(\d+)\.json", os.path.basename(path))
+        if match and (ids is None or int(match.group(1)) in ids):
+            files.append((int(match.group(1)), path))
+    return sorted(files)
+
+def parse_ids(spec):
+    """Parse "1-40,45" into a set of ids"""
+    ids = set()
+    for part in spec.split(","):
+        start, _, end = part.partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+    return ids
+
+def extract_file(path):
+    """Worker: (sha256 of the file, feature matrix) for one activity log, both streamed from disk"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(LOG_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    try:
+        events = normalize_events(iter_activity_log(path))
+    except Exception as e:
+        print(f"Skipping {path}: {e}")
+        events = normalize_events([])
+    return digest.hexdigest(), create_features(events)
+
+def extract_features(files, workers=None, chunksize=8):
+    """
+    Feature matrices of all files stacked into one array, in file order.
+
+    Returns:
+        Tuple of (features, sha256 of the training data)
+    """
+    capacity = max(1, int(sum(os.path.getsize(path) for _, path in files) * ROWS_PER_BYTE))
+    features = np.empty((capacity, 3))
+    rows = 0
+
+    digest = hashlib.sha256(f"features:{FEATURE_VERSION}".encode("utf-8"))
+    paths = [path for _, path in files]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for path, (file_sha256, matrix) in zip(paths, pool.map(extract_file, paths, chunksize=chunksize)):
+            digest.update(f"{os.path.basename(path)}:{file_sha256}\n".encode("utf-8"))
+            if rows + len(matrix) > len(features):
+                grown = np.empty((max(2 * len(features), rows + len(matrix)), 3))
+                grown[:rows] = features[:rows]
+                features = grown
+            features[rows:rows + len(matrix)] = matrix
+            rows += len(matrix)
+    return features[:rows], digest.hexdigest()
+
+def fit_model_package(features, n_clusters=3, n_jobs=None):
+    """Fit scaler, PCA (95% variance), KMeans and Isolation Forest like the notebook"""
+    from sklearn.cluster import KMeans
+    from sklearn.decomposition import PCA
+    from sklearn.ensemble import IsolationForest
+    from sklearn.preprocessing import StandardScaler
+
+    scaler = StandardScaler()
+    pca = PCA(n_components=0.95)
+    reduced = pca.fit_transform(scaler.fit_transform(features))
+    kmeans = KMeans(n_clusters=min(n_clusters, len(features)), random_state=42)
+    clusters = kmeans.fit_predict(reduced)
+    iso_model = IsolationForest(random_state=42, contamination='auto', n_jobs=n_jobs)
+    iso_model.fit(np.hstack([reduced, clusters.reshape(-1, 1)]))
+    return {
+        'isolation_forest': iso_model,
+        'scaler': scaler,
+        'pca': pca,
+        'kmeans': kmeans
+    }
+
+def save_artifact(package, path):
+    """Dump via a temp file and rename so readers never see a partial model"""
+    import joblib
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with atomic_write(path, 'wb') as file:
+        joblib.dump(package, file)
+
+def train(data_dir=DATA_DIR, models_dir=MODELS_DIR, ids=None, workers=None, force=False):
+    """
+    Train on every log in `data_dir` (optionally only `ids`).
+
+    Returns:
+        Path of the versioned artifact
+    """
+    files = training_files(data_dir, ids)
+    if not files:
+        raise ValueError(f"No candidate*.json files found in {data_dir}")
+
+    start = time.perf_counter()
+    features, data_sha256 = extract_features(files, workers)
+    print(f"Extracted {len(features)} events from {len(files)} files in {time.perf_counter() - start:.2f}s")
+    if len(features) == 0:
+        raise ValueError("No activity found in the training data")
+
+    path = os.path.join(models_dir, f"enhanced_model-{FEATURE_VERSION}-{data_sha256[:12]}.pkl")
+    if os.path.exists(path) and not force:
+        print(f"{path} already trained on this data")
+        return path
+
+    import sklearn
+
+    start = time.perf_counter()
+    package = fit_model_package(features, n_jobs=workers)
+    package['version'] = {
+        'feature_version': FEATURE_VERSION,
+        'data_sha256': data_sha256,
+        'files': len(files),
+        'events': len(features),
+        'sklearn': sklearn.__version__,
+        'trained_at': time.strftime("%Y-%m-%dT%H:%M:%S")
+    }
+    save_artifact(package, path)
+    print(f"Trained {path} in {time.perf_counter() - start:.2f}s")
+    return path
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the ML proctoring model")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--models-dir", default=MODELS_DIR)
+    parser.add_argument("--ids", help='Candidate ids to train on, e.g. "1-40" (default: all)')
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Feature extraction processes (default: CPU count)")
+    parser.add_argument("--output", default=MODEL_PATH,
+                        help="Where ml_analyzer loads the model from")
+    parser.add_argument("--no-activate", action="store_true",
+                        help="Only write the versioned artifact, leave --output untouched")
+    parser.add_argument("--force", action="store_true",
+                        help="Retrain even if an artifact for this data already exists")
+    args = parser.parse_args()
+
+    artifact = train(args.data_dir, args.models_dir, parse_ids(args.ids) if args.ids else None, args.workers, args.force)
+    if not args.no_activate:
+        with open(artifact, 'rb') as source, atomic_write(args.output, 'wb') as target:
+            shutil.copyfileobj(source, target)
+        print(f"Activated {artifact} as {args.output}")
@@ -0,0 +1,71 @@
+import asyncio
+import time
+
+
+class RateLimiter:
+    """
+    Async token-bucket limiter enforcing a requests-per-minute and a
+    tokens-per-minute budget at the same time.
+
+    Callers reserve capacity up front and then sleep until the reservation
+    is due, so the bucket may go negative. No lock is needed because the
+    reservation itself never awaits, which also keeps the limiter usable
+    across separate `asyncio.run` calls.
+    """
+
+    def __init__(self, requests_per_minute=None, tokens_per_minute=None, period=60.0):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.period = period
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(
+                self.requests_per_minute,
+                self._requests + elapsed * self.requests_per_minute / self.period
+            )
+        if self.tokens_per_minute:
+            self._tokens = min(
+                self.tokens_per_minute,
+                self._tokens + elapsed * self.tokens_per_minute / self.period
+            )
+
+    def reserve(self, tokens=0):
+        """Reserve one request and `tokens` tokens, returning the seconds to wait"""
+        self._refill(time.monotonic())
+        wait = 0.0
+        if self.requests_per_minute:
+            self._requests -= 1
+            if self._requests < 0:
+                wait = max(wait, -self._requests * self.period / self.requests_per_minute)
+        if self.tokens_per_minute:
+            # A single request larger than the whole budget can never fit, so
+            # charge it the full bucket instead of blocking forever.
+            self._tokens -= min(tokens, self.tokens_per_minute)
+            if self._tokens < 0:
+                wait = max(wait, -self._tokens * self.period / self.tokens_per_minute)
+        return wait
+
+    def release(self, tokens=0):
+        """Give back a reservation made by `reserve` that was never used"""
+        self._refill(time.monotonic())
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + 1)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + min(tokens, self.tokens_per_minute))
+
+    async def acquire(self, tokens=0):
+        """Wait until a request of `tokens` tokens fits in the budget"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                # Cancelled before sending (hedge loser, deadline): free the slot
+                self.release(tokens)
+                raise
@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+
+from algorithm_analyzer import ALGORITHM_VERSION
+from llm_analyzer import CONSENSUS_POLICY, CONSENSUS_SPREAD, PROMPT_MODE, PROMPT_VERSION, create_system_prompt
+from ml_analyzer import ML_VERSION, model_version
+from util import activity_log_path, atomic_write
+
+MANIFEST_FILE = 'scoring_manifest.json'
+
+# Precomputed ML scores, used by main.py when there is no trained model
+ML_SCORES_FILE = 'ml_based_proctoring.json'
+
+def analyzer_versions():
+    """Versions that invalidate every stored score when they change"""
+    versions = {
+        "algorithm": ALGORITHM_VERSION,
+        "ml": ML_VERSION,
+        "ml_model": model_version(),
+        "prompt": PROMPT_VERSION,
+        "prompt_mode": PROMPT_MODE,
+        "consensus": f"{CONSENSUS_POLICY}:{CONSENSUS_SPREAD}",
+        "system_prompt": hashlib.sha256(create_system_prompt().encode("utf-8")).hexdigest()[:16]
+    }
+    if versions["ml_model"] == "none":
+        # The ML scores come from ML_SCORES_FILE, so editing it rescores everyone
+        try:
+            versions["ml_scores"] = file_sha256(ML_SCORES_FILE)[:16]
+        except FileNotFoundError:
+            versions["ml_scores"] = "missing"
+    return versions
+
+def file_sha256(path, chunk_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def candidate_sha256(candidate):
+    """Hash of the candidate's metadata (name, exam, ...) from candidates.json"""
+    return hashlib.sha256(json.dumps(candidate, sort_keys=True).encode("utf-8")).hexdigest()
+
+def load_manifest(path=MANIFEST_FILE):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return {"versions": {}, "candidates": {}}
+    except Exception as e:
+        print(f"Error loading {path}, treating every candidate as stale: {e}")
+        return {"versions": {}, "candidates": {}}
+
+def save_manifest(manifest, path=MANIFEST_FILE):
+    """Write the manifest via a temp file and rename so a crash never truncates it"""
+    with atomic_write(path) as file:
+        json.dump(manifest, file, indent=2)
+
+def fingerprint(candidate, previous=None):
+    """
+    Fingerprint a candidate's activity log and metadata.
+
+    The log is only re-hashed when its mtime or size differ from `previous`,
+    so checking an unchanged cohort costs one stat() per candidate.
+    """
+    path = activity_log_path(candidate['id'])
+    entry = {"candidate_sha256": candidate_sha256(candidate), "path": path}
+    try:
+        stat = os.stat(path)
+    except OSError:
+        entry.update({"mtime": None, "size": None, "sha256": None})
+        return entry
+
+    entry.update({"mtime": stat.st_mtime, "size": stat.st_size})
+    if previous and previous.get("mtime") == stat.st_mtime and previous.get("size") == stat.st_size:
+        entry["sha256"] = previous.get("sha256")
+    else:
+        entry["sha256"] = file_sha256(path)
+    return entry
+
+def find_stale_candidates(candidates, manifest, scored_ids=()):
+    """
+    Decide which candidates need rescoring.
+
+    Args:
+        candidates: List of candidate dicts from candidates.json
+        manifest: Manifest from the previous run
+        scored_ids: Ids that have a result in the existing output file
+
+    Returns:
+        Tuple of (stale candidates, fresh fingerprints for every candidate)
+    """
+    versions_changed = manifest.get("versions") != analyzer_versions()
+    previous_entries = manifest.get("candidates", {})
+    scored_ids = set(scored_ids)
+
+    stale = []
+    fingerprints = {}
+    for candidate in candidates:
+        key = str(candidate['id'])
+        previous = previous_entries.get(key)
+        entry = fingerprint(candidate, previous)
+        fingerprints[key] = entry
+
+        if versions_changed or previous is None or candidate['id'] not in scored_ids:
+            stale.append(candidate)
+        elif entry["sha256"] != previous.get("sha256") or entry["candidate_sha256"] != previous.get("candidate_sha256"):
+            stale.append(candidate)
+    return stale, fingerprints
+
+def merge_results(candidates, previous_results, new_results):
+    """
+    Merge fresh results over previous ones, in candidates.json order.
+
+    A degraded fresh result never replaces a good previous one; the
+    candidate stays out of the manifest and is retried next run.
+    """
+    by_id = {result.get('id'): result for result in previous_results}
+    for result in new_results:
+        previous = by_id.get(result.get('id'))
+        if result.get('degraded') and previous is not None and not previous.get('degraded'):
+            continue
+        by_id[result.get('id')] = result
+    return [by_id[candidate['id']] for candidate in candidates if candidate['id'] in by_id]
+
+def build_manifest(fingerprints, up_to_date_ids):
+    """
+    Record fingerprints for candidates whose stored result is up to date.
+
+    Candidates that failed this run get no entry, so the next incremental
+    run retries them.
+    """
+    up_to_date_ids = {str(candidate_id) for candidate_id in up_to_date_ids}
+    entries = {key: entry for key, entry in fingerprints.items() if key in up_to_date_ids}
+    return {"versions": analyzer_versions(), "candidates": entries}
@@ -0,0 +1,227 @@
+"""
+HTTP scoring service: the fused `main_output` result for one activity log.
+
+    POST /score   {"candidate": {"id": 7, "name": ...}, "activityLog": [...]}
+    GET  /health  worker pool, admission and coalescing counters
+
+All CPU work runs in a pool of SERVICE_WORKERS processes: validating and
+hashing the request body, then normalization, features, the algorithm and
+ML analyzers and the LLM prompts. The event loop only moves bytes and waits
+on the LLM providers, so it stays free to admit and reject requests.
+Requests for the same log (by content hash) that overlap in time share one
+computation and differ only in the candidate fields of the response.
+
+Admission control keeps latency predictable under load: at most
+SERVICE_MAX_ACTIVE computations run at once and at most SERVICE_MAX_QUEUE
+wait for a slot. Anything beyond that, or anything still waiting after
+SERVICE_QUEUE_TIMEOUT seconds, gets 503 with a Retry-After header instead
+of queueing without bound. While the service is full, new requests are
+rejected before their body is parsed, even ones that could have shared a
+result.
+
+    python scoring_service.py --port 8000
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+from fastapi import FastAPI, HTTPException, Request
+from pydantic import BaseModel, ValidationError
+
+from events import normalize_events
+from feature_store import log_sha256
+from llm_analyzer import prepare_llm_analysis, run_llm_analysis
+from llm_tool import close_clients
+from main import analyze_locally, main_output_async
+from ml_analyzer import load_model_package
+
+load_dotenv()
+
+SERVICE_WORKERS = int(os.getenv("SERVICE_WORKERS", str(os.cpu_count() or 1)))
+SERVICE_MAX_ACTIVE = int(os.getenv("SERVICE_MAX_ACTIVE", "16"))      # logs scored at once
+SERVICE_MAX_QUEUE = int(os.getenv("SERVICE_MAX_QUEUE", "64"))        # logs waiting for a slot
+SERVICE_QUEUE_TIMEOUT = float(os.getenv("SERVICE_QUEUE_TIMEOUT", "30"))  # seconds
+SERVICE_MAX_EVENTS = int(os.getenv("SERVICE_MAX_EVENTS", "200000"))  # larger logs are rejected
+RETRY_AFTER = 5  # seconds, suggested to rejected clients
+
+
+class Overloaded(Exception):
+    pass
+
+
+class RejectedRequest(Exception):
+    """A /score body refused by the worker, with its (status code, detail)"""
+
+
+class AdmissionControl:
+    """At most `max_active` computations at a time and `max_queued` waiting; the rest are rejected"""
+
+    def __init__(self, max_active, max_queued, queue_timeout):
+        self.semaphore = asyncio.Semaphore(max_active)
+        self.max_queued = max_queued
+        self.queue_timeout = queue_timeout
+        self.active = 0
+        self.queued = 0
+        self.rejected = 0
+
+    def reject_if_full(self):
+        if self.semaphore.locked() and self.queued >= self.max_queued:
+            self.rejected += 1
+            raise Overloaded("scoring queue is full")
+
+    @asynccontextmanager
+    async def slot(self):
+        self.reject_if_full()
+        self.queued += 1
+        try:
+            await asyncio.wait_for(self.semaphore.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected += 1
+            raise Overloaded(f"no scoring slot within {self.queue_timeout}s")
+        finally:
+            self.queued -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self.semaphore.release()
+
+    def stats(self):
+        return {"active": self.active, "queued": self.queued, "rejected": self.rejected}
+
+
+class Coalescer:
+    """Runs one computation per key at a time; concurrent callers with the same key share its result"""
+
+    def __init__(self):
+        self.in_flight = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def run(self, key, compute):
+        task = self.in_flight.get(key)
+        if task is None:
+            self.computed += 1
+            task = asyncio.ensure_future(compute())
+            self.in_flight[key] = task
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # A caller that disconnects must not cancel the others' computation
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {"in_flight": len(self.in_flight), "computed": self.computed, "coalesced": self.coalesced}
+
+
+class ScoreRequest(BaseModel):
+    candidate: Dict[str, Any] = {}
+    activityLog: List[Dict[str, Any]]
+
+
+def parse_in_worker(body):
+    """
+    Worker process: validate a /score body and hash its log.
+
+    Returns the candidate fields, the log's content hash (the coalescing key)
+    and its compact events, which pickle back cheaply.
+    """
+    try:
+        request = ScoreRequest.model_validate_json(body)
+    except ValidationError as e:
+        errors = json.loads(e.json(include_url=False, include_input=False))
+        raise RejectedRequest(422, [{**error, "loc": ["body", *error["loc"]]} for error in errors])
+    if len(request.activityLog) > SERVICE_MAX_EVENTS:
+        raise RejectedRequest(413, f"Activity log has more than {SERVICE_MAX_EVENTS} events")
+    return request.candidate, log_sha256(request.activityLog), normalize_events(request.activityLog)
+
+
+def analyze_in_worker(events):
+    """Worker process: `analyze_locally` plus the LLM prompts for one log"""
+    local_results = analyze_locally(events)
+    return local_results, prepare_llm_analysis(events, features=local_results[0])
+
+
+def warm_up_worker():
+    """Import everything and load the ML model before the first request"""
+    load_model_package()
+    return os.getpid()
+
+
+admission = AdmissionControl(SERVICE_MAX_ACTIVE, SERVICE_MAX_QUEUE, SERVICE_QUEUE_TIMEOUT)
+coalescer = Coalescer()
+pool = None
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global pool
+    # Spawned, not forked: the server process already runs threads and an event loop
+    pool = ProcessPoolExecutor(max_workers=SERVICE_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*(loop.run_in_executor(pool, warm_up_worker) for _ in range(SERVICE_WORKERS)))
+    try:
+        yield
+    finally:
+        pool.shutdown(cancel_futures=True)
+        await close_clients()
+
+
+app = FastAPI(title="Video Proctoring Scoring", lifespan=lifespan)
+
+
+async def analyze_log(events):
+    """Everything main_output computes that doesn't depend on the candidate fields"""
+    async with admission.slot():
+        loop = asyncio.get_running_loop()
+        local_results, plan = await loop.run_in_executor(pool, analyze_in_worker, events)
+        ai_based_proctoring = await run_llm_analysis(plan)
+    return local_results, ai_based_proctoring
+
+
+# The body is read as bytes and validated in a worker; document its schema by hand
+SCORE_REQUEST_BODY = {
+    "required": True,
+    "content": {"application/json": {"schema": ScoreRequest.model_json_schema()}}
+}
+
+
+@app.post("/score", openapi_extra={"requestBody": SCORE_REQUEST_BODY})
+async def score(request: Request):
+    body = await request.body()
+    loop = asyncio.get_running_loop()
+    try:
+        # Already saturated: reject before spending a worker on parsing the body
+        admission.reject_if_full()
+        candidate, key, events = await loop.run_in_executor(pool, parse_in_worker, body)
+        local_results, ai_based_proctoring = await coalescer.run(key, lambda: analyze_log(events))
+    except RejectedRequest as e:
+        status_code, detail = e.args
+        raise HTTPException(status_code=status_code, detail=detail)
+    except Overloaded as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": str(RETRY_AFTER)})
+    return await main_output_async(candidate, events, ai_based_proctoring, local_results)
+
+
+@app.get("/health")
+async def health():
+    return {"status": "ok", "workers": SERVICE_WORKERS, **admission.stats(), **coalescer.stats()}
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Serve main_output scores over HTTP")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    uvicorn.run(app, host=args.host, port=args.port)
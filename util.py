@@ -1,3 +1,42 @@
+import os
+import secrets
+import shutil
+from contextlib import contextmanager
+
+DATA_DIR = "data"
+
+def activity_log_path(candidate_id):
+    """Path of a candidate's raw activity log"""
+    return f"{DATA_DIR}/candidate{candidate_id}.json"
+
+@contextmanager
+def atomic_write(path, mode='w', encoding=None, keep_mode=False):
+    """
+    Open a temp file next to `path` and rename it over `path` once the block
+    finishes, so readers never see a partial file. The file gets the usual
+    umask-based permissions, or those of the file it replaces with `keep_mode`.
+    """
+    directory = os.path.dirname(os.path.abspath(path))
+    while True:
+        tmp_path = os.path.join(directory, f"{os.path.basename(path)}.{secrets.token_hex(4)}.tmp")
+        try:
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666)
+            break
+        except FileExistsError:
+            continue
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as file:
+            yield file
+        if keep_mode and os.path.exists(path):
+            shutil.copymode(path, tmp_path)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+
 def get_score_color(score):
     """Get color based on score"""
     if score >= 80:
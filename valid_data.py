@@ -1,92 +1,167 @@
+"""
+Bulk repair of malformed candidateN.json files.
+
+Each file gets a quick check first: if its first and last bytes look like
+a complete object it is parsed (streamed, nothing kept) and skipped when
+valid. Anything else is repaired by streaming it through the lenient
+reader into a temp file next to it, renamed over the original only once
+fully written, so a crash never leaves a half-written log. Files are
+processed across a process pool and a summary report (counts, failures,
+throughput) is printed and optionally saved as JSON.
+
+    python valid_data.py --data-dir data --workers 8 [--report repair_report.json]
+"""
+import argparse
 import json
 import os
 import glob
 import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from log_reader import LOG_KEY, iter_log_entries
+from util import DATA_DIR, atomic_write
+
+END_BYTES = 64  # bytes read from each end of a file by the quick check
+
+_END = object()
+
+def indent_json(value, level):
+    """json.dumps(value, indent=4) as it appears nested `level` levels deep"""
+    return json.dumps(value, indent=4).replace('\n', '\n' + '    ' * level)
+
+def write_activity_log(file, entries, extra):
+    """
+    Write the object iter_log_entries read like json.dump(..., indent=4), one entry at a time.
+
+    `entries` is the reader itself and `extra` the dict it fills: the keys
+    before the log are known once the first entry is read, the rest once
+    the reader is exhausted.
+    """
+    entries = iter(entries)
+    first = next(entries, _END)
+    keys = list(extra)
+    before = keys[:keys.index(LOG_KEY)] if LOG_KEY in keys else keys
+
+    separator = '\n    '
+    file.write('{')
+    for key in before:
+        file.write(separator + json.dumps(key) + ': ' + indent_json(extra[key], 1))
+        separator = ',\n    '
+    if first is not _END:
+        file.write(separator + json.dumps(LOG_KEY) + ': [\n        ' + indent_json(first, 2))
+        for entry in entries:
+            file.write(',\n        ' + indent_json(entry, 2))
+        file.write('\n    ]')
+        separator = ',\n    '
+    elif LOG_KEY in extra:
+        file.write(separator + json.dumps(LOG_KEY) + ': []')
+        separator = ',\n    '
+    keys = list(extra)
+    for key in (keys[keys.index(LOG_KEY) + 1:] if LOG_KEY in keys else []):
+        file.write(separator + json.dumps(key) + ': ' + indent_json(extra[key], 1))
+    file.write('}' if separator == '\n    ' else '\n}')
+
+def ends_look_valid(path):
+    """Quick check: the file starts with '{' and ends with a '}' that doesn't follow a comma"""
+    with open(path, 'rb') as file:
+        head = file.read(END_BYTES)
+        file.seek(max(os.path.getsize(path) - END_BYTES, 0))
+        tail = file.read()
+    return (
+        head.lstrip(b'\xef\xbb\xbf \t\r\n').startswith(b'{')
+        and re.search(rb'[^,\s]\s*}\s*$', tail) is not None
+    )
+
+def is_valid_log(path):
+    """Parse the whole file strictly without keeping anything"""
+    try:
+        with open(path, 'r', encoding='utf-8-sig') as file:
+            for _ in iter_log_entries(file):
+                pass
+        return True
+    except (ValueError, UnicodeDecodeError):
+        return False
+
+def repair_file(path):
+    """
+    Worker: skip a valid log or rewrite a repaired one atomically.
+
+    Returns:
+        Dict with the path, its size, a status ("clean", "fixed" or
+        "failed") and the error for failures
+    """
+    result = {"path": path, "bytes": 0, "status": "failed", "error": None}
+    try:
+        result["bytes"] = os.path.getsize(path)
+        if ends_look_valid(path) and is_valid_log(path):
+            result["status"] = "clean"
+            return result
+
+        # Quotes a bare activityLog key, adds missing brackets/braces and drops
+        # a trailing comma, one event at a time
+        extra = {}
+        with open(path, 'r', encoding='utf-8-sig') as source, atomic_write(path, 'w', encoding='utf-8', keep_mode=True) as target:
+            write_activity_log(target, iter_log_entries(source, repair=True, extra=extra), extra)
+        result["status"] = "fixed"
+    except Exception as e:
+        result["error"] = str(e)
+    return result
+
+def fix_json_files(directory_path=DATA_DIR, workers=None, chunksize=8):
+    """
+    Check and repair every candidate*.json in `directory_path` across a process pool.
+
+    Returns:
+        Report dict: file counts per status, the failures, total bytes,
+        elapsed seconds and throughput
+    """
+    json_files = sorted(glob.glob(os.path.join(directory_path, "candidate*.json")))
+    counts = {"clean": 0, "fixed": 0, "failed": 0}
+    failures = []
+    total_bytes = 0
+
+    start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for result in pool.map(repair_file, json_files, chunksize=chunksize):
+            counts[result["status"]] += 1
+            total_bytes += result["bytes"]
+            if result["status"] == "failed":
+                failures.append({"path": result["path"], "error": result["error"]})
+                print(f"Error in file {result['path']}: {result['error']}")
+    elapsed = time.perf_counter() - start
+
+    return {
+        "directory": directory_path,
+        "files": len(json_files),
+        **counts,
+        "failures": failures,
+        "bytes": total_bytes,
+        "seconds": round(elapsed, 3),
+        "files_per_second": round(len(json_files) / elapsed, 1) if elapsed > 0 else None,
+        "mib_per_second": round(total_bytes / 2**20 / elapsed, 1) if elapsed > 0 else None
+    }
+
+def print_report(report):
+    print(
+        f"{report['files']} files in {report['directory']}: {report['clean']} already valid, "
+        f"{report['fixed']} fixed, {report['failed']} failed"
+    )
+    print(
+        f"{report['bytes'] / 2**20:.1f} MiB in {report['seconds']:.2f}s "
+        f"({report['files_per_second']} files/s, {report['mib_per_second']} MiB/s)"
+    )
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Repair malformed activity log files in place")
+    parser.add_argument("--data-dir", default=DATA_DIR)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Repair processes (default: CPU count)")
+    parser.add_argument("--report", help="Also write the summary report to this JSON file")
+    args = parser.parse_args()
 
-def fix_json_content(content):
-    # Remove any leading/trailing whitespace and invalid characters
-    content = content.strip()
-    content = content.replace('\ufeff', '')  # Remove BOM if present
-    
-    # Fix activityLog quotes
-    if content.startswith('activityLog'):
-        content = '"activityLog"' + content[len('activityLog'):]
-    elif content.startswith('"activityLog'):
-        pass  # Already has quotes
-    else:
-        print("Warning: Content doesn't start with 'activityLog'")
-    
-    # Count opening and closing square brackets
-    open_brackets = content.count('[')
-    close_brackets = content.count(']')
-    
-    # Add missing square brackets if needed
-    if open_brackets > close_brackets:
-        content = content + ']' * (open_brackets - close_brackets)
-    
-    # Remove comma after closing square bracket if present
-    content = re.sub(r'\],\s*$', ']', content)
-    content = re.sub(r'\],\s*}$', ']}', content)
-    
-    # Add opening brace if missing
-    if not content.startswith('{'):
-        content = '{' + content
-    
-    # Add closing brace if missing
-    if not content.endswith('}'):
-        content = content + '}'
-    
-    return content
-
-def fix_json_files(directory_path):
-    # Get all json files in the directory
-    json_files = glob.glob(os.path.join(directory_path, "candidate*.json"))
-    
-    for file_path in json_files:
-        try:
-            # Create backup
-            backup_path = file_path + '.backup'
-            with open(file_path, 'r', encoding='utf-8') as source:
-                with open(backup_path, 'w', encoding='utf-8') as target:
-                    target.write(source.read())
-            
-            # Read the content of the file
-            with open(file_path, 'r', encoding='utf-8') as file:
-                content = file.read()
-            
-            # Fix the JSON content
-            fixed_content = fix_json_content(content)
-            
-            try:
-                # Validate the JSON
-                json_data = json.loads(fixed_content)
-                
-                # Write the corrected JSON back to the file
-                with open(file_path, 'w', encoding='utf-8') as file:
-                    json.dump(json_data, file, indent=4)
-                
-                print(f"Successfully fixed {file_path}")
-                
-                # Remove backup if successful
-                os.remove(backup_path)
-                
-            except json.JSONDecodeError as e:
-                print(f"Error in file {file_path}: {str(e)}")
-                print("\nOriginal content (first 200 chars):")
-                print(content[:200])
-                print("\nFixed content attempt (first 200 chars):")
-                print(fixed_content[:200])
-                
-                # Restore from backup
-                os.replace(backup_path, file_path)
-                print(f"Restored original content from backup for {file_path}")
-                
-        except Exception as e:
-            print(f"Error processing {file_path}: {str(e)}")
-            if os.path.exists(backup_path):
-                os.replace(backup_path, file_path)
-                print(f"Restored original content from backup for {file_path}")
-
-# Usage
-directory_path = "data"  # Replace with your directory path
-fix_json_files(directory_path)
\ No newline at end of file
+    report = fix_json_files(args.data_dir, args.workers)
+    print_report(report)
+    if args.report:
+        with open(args.report, 'w') as file:
+            json.dump(report, file, indent=2)